@@ -0,0 +1,105 @@
+"""
+Measures the CPU cost of converting a stream of audio chunks.
+
+Compares the StreamingAudioConverter against the previous audioop path, which called
+audioop.ratecv with no state and audioop.lin2ulaw on every chunk. Also reports how far
+the per-chunk audioop output drifts from a one-shot conversion, which the stateful
+converter avoids by carrying its resampler position across chunks.
+
+Example usage: python playground/streaming/audio_converter_benchmark.py --chunk_ms 20 100
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from vocode.streaming.models.audio_encoding import AudioEncoding
+from vocode.streaming.utils.audio_converter import StreamingAudioConverter
+
+try:
+    import audioop
+except ImportError:  # removed in Python 3.13
+    audioop = None  # type: ignore[assignment]
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument("--input_sampling_rate", type=int, default=24000)
+parser.add_argument("--output_sampling_rate", type=int, default=8000)
+parser.add_argument(
+    "--output_encoding",
+    type=AudioEncoding,
+    default=AudioEncoding.MULAW,
+    choices=list(AudioEncoding),
+)
+parser.add_argument("--seconds", type=float, default=60)
+parser.add_argument("--chunk_ms", type=int, nargs="*", default=[20, 100, 1000])
+
+
+def convert_with_audioop(chunks, args) -> bytes:
+    output = bytearray()
+    for chunk in chunks:
+        if args.input_sampling_rate != args.output_sampling_rate:
+            chunk, _ = audioop.ratecv(
+                chunk, 2, 1, args.input_sampling_rate, args.output_sampling_rate, None
+            )
+        if args.output_encoding == AudioEncoding.MULAW:
+            chunk = audioop.lin2ulaw(chunk, 2)
+        output.extend(chunk)
+    return bytes(output)
+
+
+def convert_with_converter(chunks, args) -> bytes:
+    audio_converter = StreamingAudioConverter(
+        input_sampling_rate=args.input_sampling_rate,
+        output_sampling_rate=args.output_sampling_rate,
+        output_encoding=args.output_encoding,
+    )
+    output = bytearray()
+    for chunk in chunks:
+        output.extend(audio_converter.convert(chunk))
+    return bytes(output)
+
+
+def main():
+    args = parser.parse_args()
+    num_samples = int(args.seconds * args.input_sampling_rate)
+    # a sweep plus some noise, so that it's not trivially compressible
+    t = np.arange(num_samples) / args.input_sampling_rate
+    signal = 8000 * np.sin(2 * np.pi * (200 + 20 * t) * t)
+    signal += np.random.default_rng(0).normal(0, 500, num_samples)
+    audio = np.clip(signal, -32768, 32767).astype(np.int16).tobytes()
+    expected_size = len(
+        StreamingAudioConverter(
+            input_sampling_rate=args.input_sampling_rate,
+            output_sampling_rate=args.output_sampling_rate,
+            output_encoding=args.output_encoding,
+        ).convert(audio)
+    )
+
+    print(
+        f"{'chunk (ms)':>10} {'audioop cpu/s':>14} {'converter cpu/s':>16} {'audioop drift':>14} {'converter drift':>16}"
+    )
+    for chunk_ms in args.chunk_ms:
+        chunk_size = args.input_sampling_rate * chunk_ms // 1000 * 2
+        chunks = [audio[i : i + chunk_size] for i in range(0, len(audio), chunk_size)]
+
+        if audioop is not None:
+            start = time.process_time()
+            output = convert_with_audioop(chunks, args)
+            audioop_cpu = f"{(time.process_time() - start) / args.seconds:.5f}"
+            audioop_drift = str(len(output) - expected_size)
+        else:
+            audioop_cpu = audioop_drift = "n/a"
+
+        start = time.process_time()
+        output = convert_with_converter(chunks, args)
+        converter_cpu = (time.process_time() - start) / args.seconds
+        converter_drift = len(output) - expected_size
+
+        print(
+            f"{chunk_ms:>10} {audioop_cpu:>14} {converter_cpu:>16.5f} {audioop_drift:>14} {converter_drift:>16}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Measures the per-turn prompt evaluation time of a llama.cpp conversation as its history grows.
+
+The baseline evaluates the full prompt, with the whole history, from token zero every turn,
+like LlamacppAgent's ConversationChain. The session keeps the conversation in the KV cache
+and only evaluates each new human message, as LlamacppAgent does with reuse_kv_cache, so its
+prompt evaluation time should stay constant across turns.
+
+Requires llama-cpp-python and a local model.
+
+Example usage: python playground/streaming/llamacpp_kv_cache_benchmark.py --model_path llama-2-7b-chat.Q4_K_M.gguf
+"""
+
+import argparse
+import time
+
+from llama_cpp import Llama
+
+from vocode.streaming.agent.llamacpp_session import (
+    INCREMENTAL_PROMPT_FORMATS,
+    LlamacppSession,
+)
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument("--model_path", type=str, required=True)
+parser.add_argument("--num_turns", type=int, default=10)
+parser.add_argument("--n_ctx", type=int, default=4096)
+parser.add_argument("--n_threads", type=int, default=None)
+parser.add_argument("--max_tokens", type=int, default=32)
+
+PROMPT_PREAMBLE = "You are a receptionist at a dental clinic. Answer in one sentence."
+HUMAN_MESSAGES = [
+    "Hi, I'd like to book a cleaning.",
+    "Do you have anything next Tuesday morning?",
+    "What about Wednesday afternoon instead?",
+    "How long does a cleaning usually take?",
+    "Do you accept my insurance from work?",
+    "Is there parking close to the clinic?",
+    "Can I bring my daughter along for a checkup too?",
+    "What should I do if I need to cancel?",
+    "Do you send a reminder the day before?",
+    "Great, thanks for your help.",
+]
+
+
+def run_baseline(llama: Llama, args) -> None:
+    prompt_format = INCREMENTAL_PROMPT_FORMATS[None]
+    history = prompt_format.system.format(preamble=PROMPT_PREAMBLE)
+    for turn in range(args.num_turns):
+        human_message = HUMAN_MESSAGES[turn % len(HUMAN_MESSAGES)]
+        history += prompt_format.human.format(input=human_message)
+        tokens = llama.tokenize(history.encode("utf-8"))
+        llama.reset()
+        start_time = time.time()
+        llama.eval(tokens)
+        prompt_eval_seconds = time.time() - start_time
+        response = ""
+        for _ in range(args.max_tokens):
+            token = llama.sample()
+            if token == llama.token_eos():
+                break
+            llama.eval([token])
+            response += llama.detokenize([token]).decode("utf-8", errors="ignore")
+        response = response.split(prompt_format.stop)[0]
+        history += response + prompt_format.response_end
+        print(
+            f"  turn {turn + 1}: {len(tokens)} prompt tokens, {prompt_eval_seconds * 1000:.0f}ms"
+        )
+
+
+def run_session(llama: Llama, args) -> None:
+    llama.reset()
+    session = LlamacppSession(
+        llama,
+        INCREMENTAL_PROMPT_FORMATS[None],
+        PROMPT_PREAMBLE,
+        max_tokens=args.max_tokens,
+    )
+    for turn in range(args.num_turns):
+        num_tokens = len(session.tokens)
+        human_message = HUMAN_MESSAGES[turn % len(HUMAN_MESSAGES)]
+        generation = session.generate(human_message)
+        next(generation, None)
+        num_prompt_tokens = session.response_checkpoint - num_tokens  # type: ignore
+        "".join(generation)
+        print(
+            f"  turn {turn + 1}: {num_prompt_tokens} prompt tokens, {session.prompt_eval_seconds * 1000:.0f}ms"
+        )
+
+
+def main():
+    args = parser.parse_args()
+    llama = Llama(
+        model_path=args.model_path,
+        n_ctx=args.n_ctx,
+        n_threads=args.n_threads,
+        verbose=False,
+    )
+    print("full history every turn:")
+    run_baseline(llama, args)
+    print("KV cache reused across turns:")
+    run_session(llama, args)
+
+
+if __name__ == "__main__":
+    main()
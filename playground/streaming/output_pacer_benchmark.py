@@ -0,0 +1,115 @@
+"""
+Simulates many calls sending paced output audio from one event loop.
+
+Compares the previous approach, one asyncio.sleep(speech_length - elapsed - allowance)
+per chunk per call, against the shared OutputPacer. Reports the event loop lag, measured
+by a probe that repeatedly sleeps for 10ms, and how far each call's output has drifted
+from real time by the end, i.e. seconds of audio sent minus seconds elapsed.
+
+Example usage: python playground/streaming/output_pacer_benchmark.py --num_calls 500 --chunk_ms 20
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from vocode.streaming.utils.output_pacer import PacedOutputStream
+
+PROBE_INTERVAL_SECONDS = 0.01
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument("--num_calls", type=int, default=500)
+parser.add_argument("--seconds", type=float, default=10)
+parser.add_argument("--chunk_ms", type=int, default=20)
+parser.add_argument("--per_chunk_allowance_seconds", type=float, default=0.01)
+
+
+class FakeOutputDevice:
+    def __init__(self):
+        self.num_bytes = 0
+
+    def consume_nonblocking(self, chunk: bytes):
+        self.num_bytes += len(chunk)
+
+
+async def send_with_sleeps(args, chunk: bytes, start_delay: float) -> float:
+    await asyncio.sleep(start_delay)
+    output_device = FakeOutputDevice()
+    chunk_seconds = args.chunk_ms / 1000
+    start = time.monotonic()
+    seconds_sent = 0.0
+    while seconds_sent < args.seconds:
+        start_time = time.time()
+        output_device.consume_nonblocking(chunk)
+        seconds_sent += chunk_seconds
+        end_time = time.time()
+        await asyncio.sleep(
+            max(
+                chunk_seconds
+                - (end_time - start_time)
+                - args.per_chunk_allowance_seconds,
+                0,
+            )
+        )
+    return seconds_sent - (time.monotonic() - start)
+
+
+async def send_with_pacer(args, chunk: bytes, start_delay: float) -> float:
+    await asyncio.sleep(start_delay)
+    output_device = FakeOutputDevice()
+    output_stream = PacedOutputStream(lead_seconds=args.per_chunk_allowance_seconds)
+    chunk_seconds = args.chunk_ms / 1000
+    start = time.monotonic()
+    while output_stream.sent_seconds < args.seconds:
+        await output_stream.wait_for_next_chunk()
+        output_device.consume_nonblocking(chunk)
+        output_stream.mark_sent(chunk_seconds)
+    await output_stream.wait_for_next_chunk()
+    return output_stream.sent_seconds - (time.monotonic() - start)
+
+
+async def probe_event_loop_lag(lags: list):
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(PROBE_INTERVAL_SECONDS)
+        lags.append(loop.time() - start - PROBE_INTERVAL_SECONDS)
+
+
+async def run(args, send) -> None:
+    chunk = b"\xff" * (8 * args.chunk_ms)
+    lags: list = []
+    probe_task = asyncio.create_task(probe_event_loop_lag(lags))
+    # calls don't all start at the same time
+    start_delays = [random.uniform(0, 1) for _ in range(args.num_calls)]
+    drifts = await asyncio.gather(
+        *[send(args, chunk, start_delay) for start_delay in start_delays]
+    )
+    probe_task.cancel()
+    lags.sort()
+    print(
+        f"  loop lag p50 {lags[len(lags) // 2] * 1000:.1f}ms,"
+        f" p99 {lags[int(len(lags) * 0.99)] * 1000:.1f}ms,"
+        f" max {lags[-1] * 1000:.1f}ms"
+    )
+    print(
+        f"  audio ahead of real time at the end: mean {statistics.mean(drifts):.3f}s,"
+        f" max {max(drifts):.3f}s"
+    )
+
+
+async def main():
+    args = parser.parse_args()
+    print(
+        f"{args.num_calls} calls, {args.seconds}s of audio in {args.chunk_ms}ms chunks each"
+    )
+    print("asyncio.sleep per chunk:")
+    await run(args, send_with_sleeps)
+    print("shared output pacer:")
+    await run(args, send_with_pacer)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,82 @@
+"""
+Measures how long a fresh worker process takes to import StreamingConversation.
+
+Each measurement runs in a new interpreter, so that nothing is cached in sys.modules. torch
+should only be imported once VAD is enabled. Pass --vad_model_path, a local silero_vad.jit,
+to also measure loading the shared VAD model and creating per-conversation VAD state.
+
+Example usage: python playground/streaming/startup_benchmark.py --vad_model_path silero_vad.jit
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument("--runs", type=int, default=5)
+parser.add_argument("--vad_model_path", type=str, default=None)
+parser.add_argument("--num_conversations", type=int, default=100)
+
+IMPORT_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import vocode.streaming.streaming_conversation
+import_seconds = time.perf_counter() - start
+print(json.dumps({"import_seconds": import_seconds, "torch_imported": "torch" in sys.modules}))
+"""
+
+VAD_SCRIPT = """
+import json, sys, time
+import vocode.streaming.streaming_conversation
+from vocode.streaming.models.audio_encoding import AudioEncoding
+from vocode.streaming.models.transcriber import VADConfig
+from vocode.streaming.vad_utils import VADIterator
+vad_config = VADConfig(model_path=sys.argv[1])
+start = time.perf_counter()
+VADIterator(vad_config, sampling_rate=8000, audio_encoding=AudioEncoding.MULAW)
+first_seconds = time.perf_counter() - start
+start = time.perf_counter()
+for _ in range(int(sys.argv[2])):
+    VADIterator(vad_config, sampling_rate=8000, audio_encoding=AudioEncoding.MULAW)
+per_conversation_seconds = (time.perf_counter() - start) / int(sys.argv[2])
+print(json.dumps({"first_seconds": first_seconds, "per_conversation_seconds": per_conversation_seconds}))
+"""
+
+
+def run_script(script: str, *args: str) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", script, *args],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    args = parser.parse_args()
+
+    results = [run_script(IMPORT_SCRIPT) for _ in range(args.runs)]
+    import_seconds = [result["import_seconds"] for result in results]
+    print(
+        f"import vocode.streaming.streaming_conversation: median {statistics.median(import_seconds):.3f}s,"
+        f" torch imported: {any(result['torch_imported'] for result in results)}"
+    )
+
+    if args.vad_model_path:
+        results = [
+            run_script(VAD_SCRIPT, args.vad_model_path, str(args.num_conversations))
+            for _ in range(args.runs)
+        ]
+        print(
+            f"first VADIterator (loads torch and the model): median {statistics.median(result['first_seconds'] for result in results):.3f}s"
+        )
+        print(
+            f"each further VADIterator (shared model): median {statistics.median(result['per_conversation_seconds'] for result in results) * 1000:.3f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
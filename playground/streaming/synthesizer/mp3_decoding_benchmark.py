@@ -0,0 +1,138 @@
+"""
+Measures the CPU cost of turning a streamed mp3 response into output audio.
+
+Compares the MiniaudioWorker, which decodes the stream incrementally, against
+re-decoding the whole accumulated mp3 buffer on every network chunk. The CPU
+time per second of audio should stay flat for the worker as utterances get longer.
+
+Example usage: python playground/streaming/synthesizer/mp3_decoding_benchmark.py --repeats 1 4 16 64
+"""
+
+import argparse
+import asyncio
+import time
+
+from vocode.streaming.models.audio_encoding import AudioEncoding
+from vocode.streaming.models.synthesizer import SynthesizerConfig
+from vocode.streaming.synthesizer.miniaudio_worker import MiniaudioWorker
+from vocode.streaming.utils import convert_wav, get_chunk_size_per_second
+from vocode.streaming.utils.mp3_helper import decode_mp3
+
+DEFAULT_MP3_PATH = "tests/streaming/data/fake_audio.mp3"
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument("--mp3_path", type=str, default=DEFAULT_MP3_PATH)
+parser.add_argument(
+    "--repeats",
+    type=int,
+    nargs="*",
+    default=[1, 4, 16, 64],
+    help="Number of times the mp3 is concatenated to simulate longer utterances",
+)
+parser.add_argument("--network_chunk_size", type=int, default=1024)
+parser.add_argument("--sampling_rate", type=int, default=8000)
+parser.add_argument(
+    "--audio_encoding",
+    type=AudioEncoding,
+    default=AudioEncoding.MULAW,
+    choices=list(AudioEncoding),
+)
+
+
+def strip_mp3_header(mp3_bytes: bytes) -> bytes:
+    """Drops the ID3 tag and Xing/Info frame so that copies can be concatenated into one long stream"""
+    offset = 0
+    if mp3_bytes[:3] == b"ID3":
+        tag_size = 0
+        for byte in mp3_bytes[6:10]:
+            tag_size = (tag_size << 7) | byte
+        offset = 10 + tag_size
+    first_frame_end = offset + 4
+    while not (
+        mp3_bytes[first_frame_end] == 0xFF
+        and mp3_bytes[first_frame_end + 1] & 0xE0 == 0xE0
+    ):
+        first_frame_end += 1
+    first_frame = mp3_bytes[offset:first_frame_end]
+    if b"Xing" in first_frame or b"Info" in first_frame:
+        offset = first_frame_end
+    return mp3_bytes[offset:]
+
+
+def decode_by_redecoding(
+    synthesizer_config: SynthesizerConfig, mp3_bytes: bytes, network_chunk_size: int
+) -> int:
+    current_mp3_buffer = bytearray()
+    output_size = 0
+    for i in range(0, len(mp3_bytes), network_chunk_size):
+        current_mp3_buffer.extend(mp3_bytes[i : i + network_chunk_size])
+        output_bytes = convert_wav(
+            decode_mp3(bytes(current_mp3_buffer)),
+            output_sample_rate=synthesizer_config.sampling_rate,
+            output_encoding=synthesizer_config.audio_encoding,
+        )
+        output_size = len(output_bytes)
+    return output_size
+
+
+async def decode_with_worker(
+    synthesizer_config: SynthesizerConfig, mp3_bytes: bytes, network_chunk_size: int
+) -> int:
+    worker = MiniaudioWorker(
+        synthesizer_config,
+        get_chunk_size_per_second(
+            synthesizer_config.audio_encoding, synthesizer_config.sampling_rate
+        ),
+        asyncio.Queue(),
+        asyncio.Queue(),
+    )
+    worker.start()
+    for i in range(0, len(mp3_bytes), network_chunk_size):
+        worker.consume_nonblocking(mp3_bytes[i : i + network_chunk_size])
+    worker.consume_nonblocking(None)
+    output_size = 0
+    try:
+        while True:
+            chunk, is_last = await worker.output_queue.get()
+            output_size += len(chunk)
+            if is_last:
+                return output_size
+    finally:
+        worker.terminate()
+
+
+async def main():
+    args = parser.parse_args()
+    synthesizer_config = SynthesizerConfig(
+        sampling_rate=args.sampling_rate, audio_encoding=args.audio_encoding
+    )
+    bytes_per_second = get_chunk_size_per_second(
+        synthesizer_config.audio_encoding, synthesizer_config.sampling_rate
+    )
+    with open(args.mp3_path, "rb") as f:
+        mp3_bytes = strip_mp3_header(f.read())
+
+    print(
+        f"{'repeats':>8} {'audio (s)':>10} {'redecode cpu/s':>15} {'worker cpu/s':>13}"
+    )
+    for repeats in args.repeats:
+        utterance = mp3_bytes * repeats
+
+        start = time.process_time()
+        output_size = decode_by_redecoding(
+            synthesizer_config, utterance, args.network_chunk_size
+        )
+        redecode_cpu = time.process_time() - start
+        audio_seconds = output_size / bytes_per_second
+
+        start = time.process_time()
+        await decode_with_worker(synthesizer_config, utterance, args.network_chunk_size)
+        worker_cpu = time.process_time() - start
+
+        print(
+            f"{repeats:>8} {audio_seconds:>10.1f} {redecode_cpu / audio_seconds:>15.4f} {worker_cpu / audio_seconds:>13.4f}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
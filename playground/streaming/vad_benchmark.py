@@ -0,0 +1,129 @@
+"""
+Measures VAD throughput for many concurrent streams in one process.
+
+Each stream sends 20ms mu-law chunks, like a phone call. Compares running one inference
+per window for each stream against the shared VADScheduler, which batches the windows of
+all streams. Reports windows per CPU second, i.e. per core, and the wall time needed to
+process the audio.
+
+Example usage: python playground/streaming/vad_benchmark.py --vad_model_path silero_vad.jit --num_streams 10 100 500
+"""
+
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+from vocode.streaming.models.audio_encoding import AudioEncoding
+from vocode.streaming.models.transcriber import VADConfig
+from vocode.streaming.utils.audio_converter import linear16_to_mulaw
+from vocode.streaming.vad_utils import (
+    SILERO_VAD_WINDOW_SIZES,
+    BatchedVADWorker,
+    VADIterator,
+    VADScheduler,
+    get_silero_vad_model,
+)
+
+SAMPLING_RATE = 8000
+CHUNK_SIZE = SAMPLING_RATE // 50
+WINDOW_SIZE = SILERO_VAD_WINDOW_SIZES[SAMPLING_RATE]
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument("--vad_model_path", type=str, required=True)
+parser.add_argument("--num_streams", type=int, nargs="*", default=[10, 100, 500])
+parser.add_argument("--seconds", type=float, default=5)
+parser.add_argument("--batching_window_ms", type=float, default=10)
+parser.add_argument("--max_batch_size", type=int, default=256)
+
+
+def create_chunks(seconds: float) -> list:
+    # alternate between noise-like speech and silence every second
+    num_samples = int(seconds * SAMPLING_RATE)
+    t = np.arange(num_samples)
+    audio = np.random.default_rng(0).normal(0, 3000, num_samples)
+    audio *= (t // SAMPLING_RATE) % 2
+    mulaw_audio = linear16_to_mulaw(audio.astype(np.int16).tobytes())
+    return [
+        mulaw_audio[i : i + CHUNK_SIZE] for i in range(0, len(mulaw_audio), CHUNK_SIZE)
+    ]
+
+
+def run_unbatched(vad_config: VADConfig, chunks: list, num_streams: int) -> int:
+    vad_iterators = [
+        VADIterator(
+            vad_config, sampling_rate=SAMPLING_RATE, audio_encoding=AudioEncoding.MULAW
+        )
+        for _ in range(num_streams)
+    ]
+    for chunk in chunks:
+        for vad_iterator in vad_iterators:
+            vad_iterator.process(chunk)
+    return num_streams * len(chunks) * CHUNK_SIZE // WINDOW_SIZE
+
+
+async def run_batched(vad_config: VADConfig, chunks: list, num_streams: int) -> int:
+    assert vad_config.batching_window_ms is not None
+    scheduler = VADScheduler(
+        model=get_silero_vad_model(vad_config.model_path),
+        batching_window_seconds=vad_config.batching_window_ms / 1000,
+        max_batch_size=vad_config.max_batch_size,
+    )
+    vad_workers = [
+        BatchedVADWorker(
+            vad_iterator=VADIterator(
+                vad_config,
+                sampling_rate=SAMPLING_RATE,
+                audio_encoding=AudioEncoding.MULAW,
+            ),
+            scheduler=scheduler,
+            input_queue=asyncio.Queue(),
+            output_queue=asyncio.Queue(),
+        )
+        for _ in range(num_streams)
+    ]
+    for vad_worker in vad_workers:
+        vad_worker.start()
+        for chunk in chunks:
+            vad_worker.consume_nonblocking(chunk)
+    expected_num_windows = num_streams * len(chunks) * CHUNK_SIZE // WINDOW_SIZE
+    while scheduler.num_windows < expected_num_windows:
+        await asyncio.sleep(0.01)
+    for vad_worker in vad_workers:
+        vad_worker.terminate()
+    print(f"  average batch size: {scheduler.num_windows / scheduler.num_batches:.1f}")
+    return scheduler.num_windows
+
+
+async def main():
+    args = parser.parse_args()
+    vad_config = VADConfig(
+        model_path=args.vad_model_path,
+        batching_window_ms=args.batching_window_ms,
+        max_batch_size=args.max_batch_size,
+    )
+    # load the model before timing anything
+    get_silero_vad_model(vad_config.model_path)
+    chunks = create_chunks(args.seconds)
+
+    for num_streams in args.num_streams:
+        print(f"{num_streams} streams, {args.seconds}s of audio each")
+
+        start_cpu, start_wall = time.process_time(), time.perf_counter()
+        num_windows = run_unbatched(vad_config, chunks, num_streams)
+        cpu, wall = time.process_time() - start_cpu, time.perf_counter() - start_wall
+        print(
+            f"  unbatched: {num_windows / cpu:.0f} windows per cpu second, {wall:.2f}s wall"
+        )
+
+        start_cpu, start_wall = time.process_time(), time.perf_counter()
+        num_windows = await run_batched(vad_config, chunks, num_streams)
+        cpu, wall = time.process_time() - start_cpu, time.perf_counter() - start_wall
+        print(
+            f"  batched: {num_windows / cpu:.0f} windows per cpu second, {wall:.2f}s wall"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
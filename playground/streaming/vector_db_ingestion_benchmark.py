@@ -0,0 +1,143 @@
+"""
+Measures how long PineconeDB.add_texts takes to ingest a knowledge base.
+
+Runs against a local stand-in HTTP server for both the OpenAI embeddings endpoint and the
+Pinecone upsert endpoint, which adds a fixed latency per request and responds with 429 Too
+Many Requests to a fraction of them. Compares one text per embedding request without
+concurrency, like the previous implementation, against batched, concurrent ingestion.
+
+Example usage: python playground/streaming/vector_db_ingestion_benchmark.py --num_texts 5000
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+from aiohttp import web
+
+from vocode.streaming.models.vector_db import PineconeConfig
+from vocode.streaming.utils.openai_client import OpenAIClient
+from vocode.streaming.vector_db.pinecone import PineconeDB
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument("--num_texts", type=int, default=5000)
+parser.add_argument("--dimensions", type=int, default=1536)
+parser.add_argument("--embedding_latency_ms", type=float, default=150)
+parser.add_argument("--upsert_latency_ms", type=float, default=100)
+parser.add_argument("--rate_limit_probability", type=float, default=0.05)
+parser.add_argument("--embedding_batch_size", type=int, default=100)
+parser.add_argument("--upsert_batch_size", type=int, default=100)
+parser.add_argument("--max_concurrency", type=int, default=4)
+parser.add_argument(
+    "--skip_baseline",
+    action="store_true",
+    help="only run the batched ingestion, the baseline takes one round trip per text",
+)
+
+
+def create_app(args) -> web.Application:
+    async def rate_limited() -> web.Response:
+        return web.json_response(
+            {"error": {"message": "Rate limit reached", "type": "requests"}},
+            status=429,
+            headers={"Retry-After": "0.1"},
+        )
+
+    async def create_embeddings(request: web.Request) -> web.Response:
+        await asyncio.sleep(args.embedding_latency_ms / 1000)
+        if random.random() < args.rate_limit_probability:
+            return await rate_limited()
+        inputs = (await request.json())["input"]
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        return web.json_response(
+            {
+                "object": "list",
+                "data": [
+                    {
+                        "object": "embedding",
+                        "index": i,
+                        "embedding": [random.random()] * args.dimensions,
+                    }
+                    for i in range(len(inputs))
+                ],
+                "model": "text-embedding-ada-002",
+                "usage": {"prompt_tokens": 0, "total_tokens": 0},
+            }
+        )
+
+    async def upsert(request: web.Request) -> web.Response:
+        await asyncio.sleep(args.upsert_latency_ms / 1000)
+        if random.random() < args.rate_limit_probability:
+            return await rate_limited()
+        return web.json_response(
+            {"upsertedCount": len((await request.json())["vectors"])}
+        )
+
+    app = web.Application(client_max_size=1024**3)
+    app.router.add_post("/v1/embeddings", create_embeddings)
+    app.router.add_post("/vectors/upsert", upsert)
+    return app
+
+
+async def ingest(args, url: str, **add_texts_kwargs) -> float:
+    vector_db = PineconeDB(
+        PineconeConfig(index="benchmark", api_key="key", api_environment="local"),
+        openai_client=OpenAIClient(api_key="key", api_base=f"{url}/v1"),
+    )
+    vector_db.pinecone_url = url
+    texts = [f"Chunk {i} of the knowledge base" for i in range(args.num_texts)]
+    last_report_time = time.monotonic()
+
+    def report_progress(num_upserted: int, num_texts: int):
+        nonlocal last_report_time
+        if time.monotonic() - last_report_time > 1 or num_upserted == num_texts:
+            print(f"  {num_upserted}/{num_texts} upserted")
+            last_report_time = time.monotonic()
+
+    start = time.monotonic()
+    await vector_db.add_texts(texts, on_progress=report_progress, **add_texts_kwargs)
+    elapsed = time.monotonic() - start
+    await vector_db.tear_down()
+    await vector_db.openai_client.close()
+    return elapsed
+
+
+async def main():
+    args = parser.parse_args()
+    runner = web.AppRunner(create_app(args))
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]  # type: ignore
+    url = f"http://127.0.0.1:{port}"
+
+    print(f"Ingesting {args.num_texts} texts")
+    if not args.skip_baseline:
+        print("one text per embedding request, no concurrency:")
+        elapsed = await ingest(
+            args,
+            url,
+            embedding_batch_size=1,
+            upsert_batch_size=args.num_texts,
+            max_concurrency=1,
+        )
+        print(f"  {elapsed:.1f}s, {args.num_texts / elapsed:.0f} texts/s")
+    print(
+        f"batches of {args.embedding_batch_size} embeddings and {args.upsert_batch_size}"
+        f" upserts, {args.max_concurrency} concurrent requests:"
+    )
+    elapsed = await ingest(
+        args,
+        url,
+        embedding_batch_size=args.embedding_batch_size,
+        upsert_batch_size=args.upsert_batch_size,
+        max_concurrency=args.max_concurrency,
+    )
+    print(f"  {elapsed:.1f}s, {args.num_texts / elapsed:.0f} texts/s")
+    await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -16,6 +16,8 @@ from vocode.streaming.models.transcriber import *
 from vocode.streaming.models.agent import *
 from vocode.streaming.models.synthesizer import *
 from vocode.streaming.models.message import BaseMessage
+from vocode.streaming.utils.embedding_service import save_embedding_caches
+from vocode.streaming.utils.openai_client import close_openai_clients
 
 
 logging.basicConfig()
@@ -60,6 +62,8 @@ async def main():
     while conversation.is_active():
         chunk = await microphone_input.get_audio()
         conversation.receive_audio(chunk)
+    save_embedding_caches()
+    await close_openai_clients()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,52 @@
+import asyncio
+from typing import List
+
+import pytest
+
+from vocode.streaming.agent.bot_sentiment_analyser import (
+    BotSentiment,
+    BotSentimentTracker,
+)
+from vocode.streaming.models.events import Sender
+from vocode.streaming.models.synthesizer import SentimentConfig
+from vocode.streaming.models.transcript import Message
+
+
+class FakeBotSentimentAnalyser:
+    def __init__(self):
+        self.transcripts: List[str] = []
+        self.num_in_flight = 0
+        self.max_in_flight = 0
+
+    async def analyse(self, transcript: str) -> BotSentiment:
+        self.transcripts.append(transcript)
+        self.num_in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.num_in_flight)
+        await asyncio.sleep(0.05)
+        self.num_in_flight -= 1
+        return BotSentiment(emotion="friendly", degree=0.5)
+
+
+@pytest.mark.asyncio
+async def test_bot_sentiment_tracker_debounces_and_analyses_recent_messages():
+    bot_sentiment_analyser = FakeBotSentimentAnalyser()
+    bot_sentiments: List[BotSentiment] = []
+    tracker = BotSentimentTracker(
+        bot_sentiment_analyser,  # type: ignore
+        SentimentConfig(debounce_seconds=0.02, window_size=2),
+        on_bot_sentiment=bot_sentiments.append,
+    )
+    for text in ["Hi", "How can I help?", "What time is it?"]:
+        tracker.handle_message(Message(sender=Sender.HUMAN, text=text))
+    await asyncio.sleep(0.03)
+    # added while the first analysis is in flight
+    tracker.handle_message(Message(sender=Sender.BOT, text="It's noon."))
+    await asyncio.sleep(0.15)
+
+    assert bot_sentiment_analyser.transcripts == [
+        "HUMAN: How can I help?\nHUMAN: What time is it?",
+        "HUMAN: What time is it?\nBOT: It's noon.",
+    ]
+    assert bot_sentiment_analyser.max_in_flight == 1
+    assert len(bot_sentiments) == 2
+    tracker.terminate()
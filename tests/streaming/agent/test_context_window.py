@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from vocode.streaming.agent.context_window import (
+    TOKENS_PER_CHAT_MESSAGE,
+    ContextWindowManager,
+)
+from vocode.streaming.models.agent import ContextWindowConfig
+
+
+def count_words(text: str) -> int:
+    return len(text.split())
+
+
+def create_chat_messages(num_turns: int) -> list:
+    chat_messages = []
+    for i in range(num_turns):
+        chat_messages.append({"role": "user", "content": f"question number {i}"})
+        chat_messages.append({"role": "assistant", "content": f"answer number {i}"})
+    return chat_messages
+
+
+def test_context_window_keeps_preamble_and_recent_messages():
+    # room for the preamble, the reply priming and 4 messages of 3 words
+    context_window_manager = ContextWindowManager(
+        ContextWindowConfig(max_prompt_tokens=2 * TOKENS_PER_CHAT_MESSAGE + 30),
+        model_name="gpt-3.5-turbo",
+        count_tokens=count_words,
+    )
+    chat_messages = create_chat_messages(10)
+
+    messages = context_window_manager.get_chat_messages(
+        chat_messages, prompt_preamble="be nice"
+    )
+
+    assert messages == [{"role": "system", "content": "be nice"}] + chat_messages[-4:]
+    # only the messages that were kept are cached
+    assert len(context_window_manager.token_counts) == 5
+
+
+@pytest.mark.asyncio
+async def test_context_window_summarizes_truncated_messages():
+    summarized = []
+
+    async def create_summary(messages: list) -> str:
+        summarized.append(messages[-1]["content"])
+        return "the human asked some questions"
+
+    context_window_manager = ContextWindowManager(
+        ContextWindowConfig(max_prompt_tokens=30, summarize_truncated_messages=True),
+        model_name="gpt-3.5-turbo",
+        create_summary=create_summary,
+        count_tokens=count_words,
+    )
+    chat_messages = create_chat_messages(10)
+
+    context_window_manager.get_chat_messages(chat_messages)
+    await asyncio.sleep(0)
+    messages = context_window_manager.get_chat_messages(chat_messages)
+
+    assert summarized == [
+        "\n".join(
+            f"{chat_message['role']}: {chat_message['content']}"
+            for chat_message in chat_messages[
+                : context_window_manager.num_summarized_messages
+            ]
+        )
+    ]
+    assert messages[0] == {
+        "role": "system",
+        "content": "Summary of the earlier conversation: the human asked some questions",
+    }
+    assert messages[-1] == chat_messages[-1]
@@ -0,0 +1,63 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from openai.openai_object import OpenAIObject
+
+from vocode.streaming.agent.chat_gpt_agent import ChatGPTAgent
+from vocode.streaming.models.agent import ChatGPTAgentConfig
+from vocode.streaming.utils.openai_client import OpenAIClient
+
+
+def create_chat_completion(content: str) -> OpenAIObject:
+    return OpenAIObject.construct_from(
+        {"choices": [{"message": {"role": "assistant", "content": content}}]}
+    )
+
+
+async def create_chat_completion_slowly(**params) -> OpenAIObject:
+    await asyncio.sleep(0.1)
+    return create_chat_completion("Hi, how can I help?")
+
+
+@pytest.mark.asyncio
+async def test_first_response_is_precomputed_in_the_background():
+    openai_client = OpenAIClient(api_key="key")
+    with patch.object(
+        openai_client,
+        "create_chat_completion",
+        AsyncMock(side_effect=create_chat_completion_slowly),
+    ):
+        agent = ChatGPTAgent(
+            ChatGPTAgentConfig(
+                prompt_preamble="You are a receptionist",
+                expected_first_prompt="Hello",
+            ),
+            openai_client=openai_client,
+        )
+        assert agent.first_response_task is not None
+        assert not agent.first_response_task.done()
+        assert await agent.get_first_response() == "Hi, how can I help?"
+        assert await agent.get_first_response() is None
+
+
+@pytest.mark.asyncio
+async def test_first_response_is_shared_across_agents():
+    openai_client = OpenAIClient(api_key="key")
+    agent_config = ChatGPTAgentConfig(
+        prompt_preamble="You are a receptionist",
+        expected_first_prompt="Hello",
+        share_first_response=True,
+    )
+    with patch.object(
+        openai_client,
+        "create_chat_completion",
+        AsyncMock(side_effect=create_chat_completion_slowly),
+    ) as create:
+        agents = [
+            ChatGPTAgent(agent_config, openai_client=openai_client) for _ in range(3)
+        ]
+        for agent in agents:
+            assert await agent.get_first_response() == "Hi, how can I help?"
+            agent.terminate()
+        assert create.call_count == 1
@@ -0,0 +1,104 @@
+from typing import List, Optional
+
+from vocode.streaming.agent.llamacpp_session import (
+    INCREMENTAL_PROMPT_FORMATS,
+    LlamacppSession,
+)
+
+BOS = 1
+EOS = 2
+
+
+class FakeLlama:
+    """Tokenizes by byte and samples scripted responses, recording what is evaluated"""
+
+    def __init__(self, responses: List[str], n_ctx: int = 4096):
+        self.responses = responses
+        self._n_ctx = n_ctx
+        self.n_tokens = 0
+        self.evaluated_prompts: List[bytes] = []
+        self.response: Optional[bytes] = None
+
+    def n_ctx(self) -> int:
+        return self._n_ctx
+
+    def tokenize(self, text: bytes, add_bos: bool = True) -> List[int]:
+        return ([BOS] if add_bos else []) + [byte + 3 for byte in text]
+
+    def detokenize(self, tokens: List[int]) -> bytes:
+        return bytes(token - 3 for token in tokens if token > EOS)
+
+    def token_eos(self) -> int:
+        return EOS
+
+    def eval(self, tokens: List[int]):
+        if len(tokens) > 1:
+            self.evaluated_prompts.append(self.detokenize(tokens))
+            self.response = None
+        self.n_tokens += len(tokens)
+
+    def sample(self) -> int:
+        if self.response is None:
+            self.response = self.responses.pop(0).encode("utf-8")
+        if not self.response:
+            return EOS
+        token, self.response = self.response[0] + 3, self.response[1:]
+        return token
+
+
+def create_session(llama: FakeLlama) -> LlamacppSession:
+    return LlamacppSession(
+        llama,  # type: ignore
+        INCREMENTAL_PROMPT_FORMATS[None],
+        "You are a receptionist",
+    )
+
+
+def test_each_turn_only_evaluates_the_new_message():
+    llama = FakeLlama(["Hi, how can I help?", " We open at nine.", " Bye!"])
+    session = create_session(llama)
+    assert "".join(session.generate("Hello")) == "Hi, how can I help?"
+    assert "".join(session.generate("When do you open?")) == " We open at nine."
+    assert "".join(session.generate("Thanks")) == " Bye!"
+    assert llama.evaluated_prompts == [
+        b"System: You are a receptionist\nHuman: Hello\nAI:",
+        b"\nHuman: When do you open?\nAI:",
+        b"\nHuman: Thanks\nAI:",
+    ]
+    assert llama.n_tokens == len(session.tokens)
+
+
+def test_stop_sequence_is_not_kept_in_the_context():
+    llama = FakeLlama(["Sure.\nHuman: and", "Okay."])
+    session = create_session(llama)
+    assert "".join(session.generate("Hello")) == "Sure."
+    assert llama.n_tokens == session.response_checkpoint
+    session.generate("Thanks").__next__()
+    assert llama.evaluated_prompts[-1] == b"Sure.\nHuman: Thanks\nAI:"
+
+
+def test_cut_off_response_restores_the_context_before_the_response():
+    llama = FakeLlama(["We open at nine, and close at five.", "Okay."])
+    session = create_session(llama)
+    "".join(session.generate("When do you open?"))
+    session.cut_off_response("We open at nine,")
+    assert llama.n_tokens == session.response_checkpoint
+    "".join(session.generate("Thanks"))
+    assert llama.evaluated_prompts[-1] == b"We open at nine,\nHuman: Thanks\nAI:"
+    assert session.turns[0].endswith("We open at nine,\n")
+
+
+def test_full_context_is_rebuilt_from_recent_turns():
+    llama = FakeLlama(["Hi!", "Yes.", "No."], n_ctx=400)
+    session = LlamacppSession(
+        llama,  # type: ignore
+        INCREMENTAL_PROMPT_FORMATS[None],
+        "You are a receptionist",
+        max_tokens=100,
+    )
+    "".join(session.generate("Hello " * 20))
+    "".join(session.generate("Are you open? " * 10))
+    "".join(session.generate("Is it sunny?"))
+    assert llama.n_tokens == len(session.tokens) <= llama.n_ctx()
+    assert llama.evaluated_prompts[-2].startswith(b"System: You are a receptionist\n")
+    assert b"Hello" not in llama.evaluated_prompts[-2]
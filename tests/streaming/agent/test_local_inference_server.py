@@ -0,0 +1,175 @@
+import asyncio
+import threading
+from typing import Dict, List, Optional
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from vocode.streaming.agent import llamacpp_agent
+from vocode.streaming.agent.llamacpp_agent import LlamacppAgent
+from vocode.streaming.agent.local_inference_server import (
+    LocalInferenceServer,
+    LocalModel,
+    sample_token,
+)
+from vocode.streaming.models.agent import (
+    LlamacppAgentConfig,
+    LocalInferenceServerConfig,
+)
+
+
+class FakeModel(LocalModel):
+    """Responds to each prompt with its words in reverse, one word per decode step
+
+    Each word is a token, and a sequence starts with one more token.
+    """
+
+    def __init__(self, max_batch_size: int, max_prompt_tokens: Optional[int] = None):
+        self.max_batch_size = max_batch_size
+        self.max_prompt_tokens = max_prompt_tokens
+        self.responses: Dict[int, List[str]] = {}
+        self.decoded_batches: List[List[str]] = []
+        self.prompts: Dict[int, str] = {}
+        self.removed_prompts: List[str] = []
+        # set from the worker thread once every sequence has been removed
+        self.is_empty = threading.Event()
+
+    def count_tokens(self, text: str) -> int:
+        return len(text.split())
+
+    def add_sequence(self, sequence_id: int, prompt: str):
+        self.is_empty.clear()
+        self.prompts[sequence_id] = prompt
+        self.responses[sequence_id] = [f"{word} " for word in reversed(prompt.split())]
+        if (
+            self.max_prompt_tokens is not None
+            and self.count_tokens(prompt) + 1 > self.max_prompt_tokens
+        ):
+            raise ValueError("Prompt is too long")
+
+    def decode(self, sequence_ids: List[int]) -> List[Optional[bytes]]:
+        self.decoded_batches.append(
+            [self.prompts[sequence_id] for sequence_id in sequence_ids]
+        )
+        results: List[Optional[bytes]] = []
+        for sequence_id in sequence_ids:
+            words = self.responses[sequence_id]
+            results.append(words.pop(0).encode("utf-8") if words else None)
+        return results
+
+    def remove_sequence(self, sequence_id: int):
+        self.removed_prompts.append(self.prompts.pop(sequence_id))
+        del self.responses[sequence_id]
+        if not self.prompts:
+            self.is_empty.set()
+
+
+async def generate(server: LocalInferenceServer, prompt: str, **kwargs) -> str:
+    return "".join([token async for token in server.generate(prompt, **kwargs)])
+
+
+@pytest.mark.asyncio
+async def test_requests_join_the_batch_as_slots_free_up():
+    model = FakeModel(max_batch_size=2)
+    server = LocalInferenceServer(model)
+    responses = await asyncio.gather(
+        generate(server, "a b c d"),
+        generate(server, "e f"),
+        generate(server, "g h i"),
+    )
+    assert responses == ["d c b a ", "f e ", "i h g "]
+    assert max(len(batch) for batch in model.decoded_batches) == 2
+    # the third request took the second one's slot while the first was still decoding
+    assert ["a b c d", "g h i"] in model.decoded_batches
+    # the last sequence is removed on the step after its response ends
+    assert await asyncio.get_running_loop().run_in_executor(
+        None, model.is_empty.wait, 1
+    )
+    assert sorted(model.removed_prompts) == ["a b c d", "e f", "g h i"]
+    server.stop()
+
+
+@pytest.mark.asyncio
+async def test_stop_sequences_and_max_tokens_end_the_response():
+    server = LocalInferenceServer(FakeModel(max_batch_size=2))
+    assert await generate(server, "Human: c b a", stop=["Human:"]) == "a b c "
+    assert await generate(server, "d c b a", max_tokens=2) == "a b "
+    server.stop()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_request_stops_decoding():
+    model = FakeModel(max_batch_size=2)
+    server = LocalInferenceServer(model)
+    prompt = " ".join(str(i) for i in range(100000))
+
+    async def consume():
+        async for _ in server.generate(prompt, max_tokens=100000):
+            pass
+
+    task = asyncio.create_task(consume())
+    await asyncio.sleep(0.05)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert await generate(server, "b a") == "a b "
+    assert prompt in model.removed_prompts
+    assert len(model.decoded_batches) < 100000
+    server.stop()
+
+
+@pytest.mark.asyncio
+async def test_failing_sequence_only_fails_its_own_request():
+    model = FakeModel(max_batch_size=2, max_prompt_tokens=4)
+    server = LocalInferenceServer(model)
+    responses = await asyncio.gather(
+        generate(server, "a b c d e f"),
+        generate(server, "b a"),
+        return_exceptions=True,
+    )
+    assert isinstance(responses[0], ValueError)
+    assert responses[1] == "a b "
+    assert await generate(server, "d c b") == "b c d "
+    server.stop()
+
+
+@pytest.mark.asyncio
+async def test_llamacpp_agent_prompt_keeps_the_preamble_and_recent_turns():
+    model = FakeModel(max_batch_size=1, max_prompt_tokens=12)
+    with patch.object(
+        llamacpp_agent,
+        "get_local_inference_server",
+        lambda *args, **kwargs: LocalInferenceServer(model),
+    ):
+        agent = LlamacppAgent(
+            LlamacppAgentConfig(
+                prompt_preamble="Be brief",
+                local_inference_server_config=LocalInferenceServerConfig(),
+            )
+        )
+    agent.turns = [("Human: one\nAI:", " first"), ("Human: two\nAI:", " second")]
+
+    prompt = agent.get_local_inference_prompt("Human: three\nAI:")
+
+    assert prompt == ("System: Be brief\nHuman: two\nAI: second\nHuman: three\nAI:")
+    assert model.count_tokens(prompt) + 1 <= 12
+    assert agent.turns == [("Human: two\nAI:", " second")]
+
+
+def test_sample_token_is_greedy_without_temperature():
+    logits = np.array([0.1, 2.0, 0.5])
+    assert sample_token(logits, [], temp=0) == 1
+    assert sample_token(logits, [1], temp=0, repeat_penalty=100) == 2
+    assert sample_token(logits, [], top_k=1) == 1
+
+
+def test_llamacpp_agent_rejects_kv_cache_reuse_with_a_server():
+    with pytest.raises(ValueError):
+        LlamacppAgent(
+            LlamacppAgentConfig(
+                prompt_preamble="You are a receptionist",
+                reuse_kv_cache=True,
+                local_inference_server_config=LocalInferenceServerConfig(),
+            )
+        )
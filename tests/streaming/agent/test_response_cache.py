@@ -0,0 +1,145 @@
+import asyncio
+from typing import AsyncGenerator, List, Tuple
+
+import numpy as np
+import pytest
+
+from vocode.streaming.agent.base_agent import (
+    AgentResponseMessage,
+    RespondAgent,
+    TranscriptionAgentInput,
+)
+from vocode.streaming.agent.response_cache import ResponseCache
+from vocode.streaming.models.agent import EchoAgentConfig, ResponseCacheConfig
+from vocode.streaming.models.transcript import Transcript
+from vocode.streaming.transcriber.base_transcriber import Transcription
+
+VOCABULARY = ["what", "are", "your", "opening", "hours", "where", "is", "the", "office"]
+
+
+async def create_bag_of_words_embedding(text: str) -> np.ndarray:
+    words = text.split()
+    return np.array([float(words.count(word)) for word in VOCABULARY])
+
+
+class CountingAgent(RespondAgent[EchoAgentConfig]):
+    supports_response_cache = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.generated_for: List[str] = []
+
+    async def generate_response(
+        self,
+        human_input,
+        conversation_id: str,
+        is_interrupt: bool = False,
+    ) -> AsyncGenerator[Tuple[str, bool], None]:
+        self.generated_for.append(human_input)
+        yield f"Response to {human_input}.", True
+        yield "Anything else?", True
+
+
+async def respond(agent: CountingAgent, message: str) -> List[str]:
+    await agent.process(
+        agent.interruptible_event_factory.create_interruptible_event(
+            TranscriptionAgentInput(
+                transcription=Transcription(
+                    message=message, confidence=1.0, is_final=True
+                ),
+                conversation_id="conversation_id",
+                vonage_uuid=None,
+                twilio_sid=None,
+            )
+        )
+    )
+    responses = []
+    while not agent.output_queue.empty():
+        response = agent.output_queue.get_nowait().payload
+        assert isinstance(response, AgentResponseMessage)
+        responses.append(response.message.text)
+    return responses
+
+
+@pytest.mark.asyncio
+async def test_response_cache_is_shared_across_conversations():
+    response_cache_config = ResponseCacheConfig(similarity_threshold=0.85)
+    response_cache = ResponseCache(
+        response_cache_config, create_embedding=create_bag_of_words_embedding
+    )
+    agents = []
+    for _ in range(2):
+        agent = CountingAgent(
+            EchoAgentConfig(response_cache_config=response_cache_config)
+        )
+        agent.attach_transcript(Transcript())
+        agent.response_cache = response_cache
+        agents.append(agent)
+
+    first_responses = await respond(agents[0], "What are your opening hours?")
+    assert first_responses == [
+        "Response to What are your opening hours?.",
+        "Anything else?",
+    ]
+    assert await respond(agents[1], "what are your hours") == first_responses
+    assert agents[1].generated_for == []
+
+    assert await respond(agents[1], "Where is the office?") == [
+        "Response to Where is the office?.",
+        "Anything else?",
+    ]
+    assert agents[1].generated_for == ["Where is the office?"]
+
+
+@pytest.mark.asyncio
+async def test_response_cache_entries_expire_and_are_namespaced():
+    response_cache = ResponseCache(
+        ResponseCacheConfig(ttl_seconds=0),
+        create_embedding=create_bag_of_words_embedding,
+    )
+    lookup = await response_cache.lookup("namespace", "where is the office")
+    assert lookup.sentences is None
+    lookup.store(["Downtown."])
+
+    assert (
+        await response_cache.lookup("namespace", "where is the office")
+    ).sentences is None
+
+    response_cache.response_cache_config.ttl_seconds = 60
+    lookup = await response_cache.lookup("namespace", "where is the office")
+    lookup.store(["Downtown."])
+    assert (
+        await response_cache.lookup("namespace", "Where is the office?")
+    ).sentences == ["Downtown."]
+    assert (
+        await response_cache.lookup("other_namespace", "Where is the office?")
+    ).sentences is None
+
+
+@pytest.mark.asyncio
+async def test_response_cache_is_only_used_by_agents_that_support_it():
+    class StatefulAgent(CountingAgent):
+        supports_response_cache = False
+
+    agent = StatefulAgent(EchoAgentConfig(response_cache_config=ResponseCacheConfig()))
+    assert agent.response_cache is None
+
+
+@pytest.mark.asyncio
+async def test_slow_response_cache_lookup_falls_back_to_generating():
+    async def create_slow_embedding(text: str) -> np.ndarray:
+        await asyncio.sleep(1)
+        return await create_bag_of_words_embedding(text)
+
+    response_cache_config = ResponseCacheConfig(lookup_timeout_seconds=0.01)
+    agent = CountingAgent(EchoAgentConfig(response_cache_config=response_cache_config))
+    agent.attach_transcript(Transcript())
+    agent.response_cache = ResponseCache(
+        response_cache_config, create_embedding=create_slow_embedding
+    )
+
+    assert await respond(agent, "Where is the office?") == [
+        "Response to Where is the office?.",
+        "Anything else?",
+    ]
+    assert agent.generated_for == ["Where is the office?"]
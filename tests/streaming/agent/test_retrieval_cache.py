@@ -0,0 +1,81 @@
+import asyncio
+from typing import List
+
+import pytest
+from langchain.docstore.document import Document
+
+from vocode.streaming.agent.retrieval_cache import RetrievalCache
+from vocode.streaming.models.agent import RetrievalPrefetchConfig
+
+
+class FakeRetriever:
+    def __init__(self, latency_seconds: float = 0.05):
+        self.latency_seconds = latency_seconds
+        self.queries: List[str] = []
+
+    async def __call__(self, query: str):
+        self.queries.append(query)
+        await asyncio.sleep(self.latency_seconds)
+        return [(Document(page_content=query, metadata={"source": "faq"}), 0.9)]
+
+
+def create_retrieval_cache(retriever: FakeRetriever) -> RetrievalCache:
+    return RetrievalCache(
+        retriever,
+        RetrievalPrefetchConfig(stability_threshold_seconds=0.01, min_similarity=0.9),
+    )
+
+
+@pytest.mark.asyncio
+async def test_prefetched_retrieval_is_reused_by_the_final_query():
+    retriever = FakeRetriever()
+    retrieval_cache = create_retrieval_cache(retriever)
+    retrieval_cache.prefetch("HUMAN: What are your opening hours")
+    await asyncio.sleep(0.02)
+    docs_with_scores = await retrieval_cache.get("HUMAN: what are your opening hours?")
+    assert retriever.queries == ["HUMAN: What are your opening hours"]
+    assert docs_with_scores[0][0].page_content == "HUMAN: What are your opening hours"
+
+
+@pytest.mark.asyncio
+async def test_slightly_different_final_query_reuses_the_retrieval():
+    retriever = FakeRetriever()
+    retrieval_cache = create_retrieval_cache(retriever)
+    retrieval_cache.prefetch("HUMAN: What are your opening hour")
+    await asyncio.sleep(0.02)
+    await retrieval_cache.get("HUMAN: What are your opening hours")
+    assert len(retriever.queries) == 1
+
+
+@pytest.mark.asyncio
+async def test_unstable_interim_transcriptions_are_not_retrieved():
+    retriever = FakeRetriever()
+    retrieval_cache = create_retrieval_cache(retriever)
+    retrieval_cache.prefetch("HUMAN: What")
+    retrieval_cache.prefetch("HUMAN: What are")
+    await asyncio.sleep(0.02)
+    assert retriever.queries == ["HUMAN: What are"]
+    await retrieval_cache.get("HUMAN: Can I book a table for four tonight")
+    assert retriever.queries == [
+        "HUMAN: What are",
+        "HUMAN: Can I book a table for four tonight",
+    ]
+    retrieval_cache.terminate()
+
+
+@pytest.mark.asyncio
+async def test_failed_retrieval_is_not_reused():
+    calls = 0
+
+    async def retrieve(query: str):
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            raise RuntimeError("vector db unavailable")
+        return []
+
+    retrieval_cache = RetrievalCache(retrieve, RetrievalPrefetchConfig())
+    with pytest.raises(RuntimeError):
+        await retrieval_cache.get("HUMAN: What are your opening hours")
+    assert await retrieval_cache.get("HUMAN: What are your opening hours") == []
+    assert calls == 2
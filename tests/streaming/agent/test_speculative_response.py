@@ -0,0 +1,173 @@
+import asyncio
+from typing import AsyncGenerator, List, Tuple
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from openai.openai_object import OpenAIObject
+
+from vocode.streaming.agent.base_agent import (
+    AgentResponseMessage,
+    RespondAgent,
+    TranscriptionAgentInput,
+)
+from vocode.streaming.agent.chat_gpt_agent import ChatGPTAgent
+from vocode.streaming.agent.speculative_response import SpeculativeResponse
+from vocode.streaming.models.agent import (
+    ChatGPTAgentConfig,
+    EchoAgentConfig,
+    SpeculativeResponseConfig,
+)
+from vocode.streaming.models.transcript import Transcript
+from vocode.streaming.transcriber.base_transcriber import Transcription
+from vocode.streaming.utils.openai_client import OpenAIClient
+
+
+class TranscriptEchoAgent(RespondAgent[EchoAgentConfig]):
+    """Responds with the last human message of the transcript it sees"""
+
+    supports_speculative_responses = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.generated_for: List[str] = []
+
+    async def generate_response(
+        self,
+        human_input,
+        conversation_id: str,
+        is_interrupt: bool = False,
+    ) -> AsyncGenerator[Tuple[str, bool], None]:
+        self.generated_for.append(human_input)
+        assert self.transcript is not None
+        yield self.transcript.event_logs[-1].text, True
+
+
+def create_agent() -> TranscriptEchoAgent:
+    agent = TranscriptEchoAgent(
+        EchoAgentConfig(
+            speculative_response_config=SpeculativeResponseConfig(
+                stability_threshold_seconds=0.01
+            )
+        )
+    )
+    agent.attach_transcript(Transcript())
+    return agent
+
+
+async def respond_to_final_transcription(agent: RespondAgent, message: str):
+    await agent.process(
+        agent.interruptible_event_factory.create_interruptible_event(
+            TranscriptionAgentInput(
+                transcription=Transcription(
+                    message=message, confidence=1.0, is_final=True
+                ),
+                conversation_id="conversation_id",
+                vonage_uuid=None,
+                twilio_sid=None,
+            )
+        )
+    )
+    response = agent.output_queue.get_nowait().payload
+    assert isinstance(response, AgentResponseMessage)
+    return response.message.text
+
+
+@pytest.mark.asyncio
+async def test_speculative_response_is_released_on_matching_final_transcription():
+    agent = create_agent()
+    agent.handle_interim_transcription(
+        Transcription(message="what time is it", confidence=1.0, is_final=False),
+        conversation_id="conversation_id",
+    )
+    await asyncio.sleep(0.05)
+
+    # generated against a shadow transcript, the real one is untouched
+    assert agent.generated_for == ["what time is it"]
+    assert agent.transcript is not None and agent.transcript.event_logs == []
+
+    response = await respond_to_final_transcription(agent, "What time is it?")
+
+    assert response == "what time is it"
+    assert agent.generated_for == ["what time is it"]
+    assert agent.speculative_responder is not None
+    assert agent.speculative_responder.hits == 1
+
+
+@pytest.mark.asyncio
+async def test_speculative_response_is_cancelled_on_different_final_transcription():
+    agent = create_agent()
+    agent.handle_interim_transcription(
+        Transcription(message="what time", confidence=1.0, is_final=False),
+        conversation_id="conversation_id",
+    )
+    await asyncio.sleep(0.05)
+
+    response = await respond_to_final_transcription(agent, "What time do you close?")
+
+    assert response == "What time do you close?"
+    assert agent.generated_for == ["what time", "What time do you close?"]
+    assert agent.speculative_responder is not None
+    assert agent.speculative_responder.misses == 1
+
+
+@pytest.mark.asyncio
+async def test_speculative_response_is_cancelled_with_its_consumer():
+    class StallingAgent:
+        async def generate_response(self, human_input, **kwargs):
+            yield "one moment", True
+            await asyncio.Event().wait()
+
+    transcription = Transcription(message="hello", confidence=1.0, is_final=True)
+    speculative_response = SpeculativeResponse(transcription, "conversation_id")
+    speculative_response.task = asyncio.create_task(
+        speculative_response.generate(StallingAgent(), Transcript())  # type: ignore
+    )
+
+    async def consume():
+        async for _ in speculative_response.get_responses():
+            pass
+
+    consume_task = asyncio.create_task(consume())
+    await asyncio.sleep(0.01)
+    consume_task.cancel()
+    await asyncio.sleep(0.01)
+
+    assert speculative_response.task.cancelled()
+
+
+@pytest.mark.asyncio
+async def test_first_response_is_not_used_up_by_speculation():
+    openai_client = OpenAIClient(api_key="key")
+    with patch.object(
+        openai_client,
+        "create_chat_completion",
+        AsyncMock(
+            return_value=OpenAIObject.construct_from(
+                {"choices": [{"message": {"content": "Hi, how can I help?"}}]}
+            )
+        ),
+    ) as create_chat_completion:
+        agent = ChatGPTAgent(
+            ChatGPTAgentConfig(
+                prompt_preamble="You are a receptionist",
+                expected_first_prompt="Hello",
+                speculative_response_config=SpeculativeResponseConfig(
+                    stability_threshold_seconds=0.01
+                ),
+            ),
+            openai_client=openai_client,
+        )
+        agent.attach_transcript(Transcript())
+        agent.handle_interim_transcription(
+            Transcription(message="hello", confidence=1.0, is_final=False),
+            conversation_id="conversation_id",
+        )
+        await asyncio.sleep(0.05)
+
+        # the human kept talking, so a speculation would have been discarded
+        response = await respond_to_final_transcription(agent, "Hello there")
+
+        assert response == "Hi, how can I help?"
+        assert create_chat_completion.call_count == 1
+        assert agent.speculative_responder is not None
+        assert agent.speculative_responder.misses == 0
@@ -30,6 +30,7 @@ class TestSynthesizer(BaseSynthesizer):
         bot_sentiment: Optional[BotSentiment] = None,
     ) -> SynthesisResult:
         return self.create_synthesis_result_from_wav(
+            synthesizer_config=self.synthesizer_config,
             message=message,
             chunk_size=chunk_size,
             file=get_audio_path("fake_audio.wav"),
@@ -94,3 +94,26 @@ HUMAN: Send me an email you bot. My email is du@de.com
 ACTION_WORKER: params={'recipient_email': 'du@de.com', 'body': 'What up', 'subject': 'This is the bot'}
 ACTION_WORKER: action_type='action_nylas_send_email' response={'success': True}"""
     )
+
+
+def test_transcript_openai_chat_messages_are_updated_incrementally():
+    transcript = Transcript()
+    transcript.add_bot_message(text="Hi there!", conversation_id="123")
+    bot_message = Message(sender=Sender.BOT, text="")
+    transcript.add_message(bot_message, conversation_id="123")
+    transcript.update_message_text(bot_message, "How can I help?")
+    assert transcript.get_openai_chat_messages() == [
+        {"role": "assistant", "content": "Hi there! How can I help?"},
+    ]
+
+    transcript.update_last_bot_message_on_cut_off("How can-")
+    transcript.add_human_message(text="What's the weather?", conversation_id="123")
+    assert transcript.get_openai_chat_messages() == [
+        {"role": "assistant", "content": "Hi there! How can-"},
+        {"role": "user", "content": "What's the weather?"},
+    ]
+    # the same as converting the whole transcript from scratch
+    assert (
+        transcript.get_openai_chat_messages()
+        == Transcript(event_logs=transcript.event_logs).get_openai_chat_messages()
+    )
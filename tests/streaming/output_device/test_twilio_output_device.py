@@ -0,0 +1,41 @@
+import json
+
+import pytest
+
+from vocode.streaming.output_device.twilio_output_device import TwilioOutputDevice
+
+
+def get_sent_messages(output_device: TwilioOutputDevice) -> list:
+    messages = []
+    while not output_device.queue.empty():
+        messages.append(json.loads(output_device.queue.get_nowait()))
+    return messages
+
+
+@pytest.mark.asyncio
+async def test_twilio_output_device_tracks_playback_with_marks():
+    output_device = TwilioOutputDevice(stream_sid="stream_sid")
+    output_device.process_task.cancel()
+    for _ in range(5):
+        # 20ms of 8kHz mu-law
+        output_device.consume_nonblocking(b"\xff" * 160)
+
+    messages = get_sent_messages(output_device)
+    assert [message["event"] for message in messages] == ["media", "mark"] * 5
+    mark_names = [
+        message["mark"]["name"] for message in messages if message["event"] == "mark"
+    ]
+    assert output_device.get_playback_position() == 0
+
+    # marks are echoed in order, each one acknowledges every chunk before it
+    output_device.handle_mark(mark_names[1])
+    assert output_device.get_playback_position() == pytest.approx(0.04)
+
+    assert output_device.clear()
+    assert get_sent_messages(output_device) == [
+        {"event": "clear", "streamSid": "stream_sid"}
+    ]
+    # after a clear, Twilio echoes the marks of the dropped chunks right away
+    for mark_name in mark_names[2:]:
+        output_device.handle_mark(mark_name)
+    assert output_device.get_playback_position() == pytest.approx(0.04)
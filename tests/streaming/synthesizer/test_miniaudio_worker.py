@@ -0,0 +1,72 @@
+import asyncio
+from typing import List, Tuple
+
+import pytest
+from tests.streaming.data.loader import get_audio_path
+from vocode.streaming.models.audio_encoding import AudioEncoding
+from vocode.streaming.models.synthesizer import SynthesizerConfig
+from vocode.streaming.synthesizer.miniaudio_worker import MiniaudioWorker
+
+CHUNK_SIZE = 1024
+
+
+async def _decode_in_chunks(
+    worker: MiniaudioWorker, mp3_bytes: bytes, mp3_chunk_size: int
+) -> List[Tuple[bytes, bool]]:
+    for i in range(0, len(mp3_bytes), mp3_chunk_size):
+        worker.consume_nonblocking(mp3_bytes[i : i + mp3_chunk_size])
+    worker.consume_nonblocking(None)
+    output = []
+    while True:
+        chunk, is_last = await asyncio.wait_for(worker.output_queue.get(), 5)
+        output.append((chunk, is_last))
+        if is_last:
+            return output
+
+
+@pytest.mark.asyncio
+async def test_miniaudio_worker_decodes_incrementally():
+    with open(get_audio_path("fake_audio.mp3"), "rb") as f:
+        mp3_bytes = f.read()
+    worker = MiniaudioWorker(
+        SynthesizerConfig(sampling_rate=16000, audio_encoding=AudioEncoding.LINEAR16),
+        CHUNK_SIZE,
+        asyncio.Queue(),
+        asyncio.Queue(),
+    )
+    worker.start()
+    try:
+        whole_output = await _decode_in_chunks(worker, mp3_bytes, len(mp3_bytes))
+        chunked_output = await _decode_in_chunks(worker, mp3_bytes, 100)
+    finally:
+        worker.terminate()
+
+    assert all(len(chunk) == CHUNK_SIZE for chunk, _ in chunked_output[:-1])
+    assert [is_last for _, is_last in chunked_output] == [False] * (
+        len(chunked_output) - 1
+    ) + [True]
+    # the decoder is fed byte for byte the same stream, so chunk boundaries must not change the output
+    assert b"".join(chunk for chunk, _ in chunked_output) == b"".join(
+        chunk for chunk, _ in whole_output
+    )
+    # 16kHz LINEAR16 is 32000 bytes per second and the fixture is over a second long
+    assert sum(len(chunk) for chunk, _ in chunked_output) > 32000
+
+
+@pytest.mark.asyncio
+async def test_miniaudio_worker_mulaw_output():
+    with open(get_audio_path("fake_audio.mp3"), "rb") as f:
+        mp3_bytes = f.read()
+    worker = MiniaudioWorker(
+        SynthesizerConfig(sampling_rate=8000, audio_encoding=AudioEncoding.MULAW),
+        CHUNK_SIZE,
+        asyncio.Queue(),
+        asyncio.Queue(),
+    )
+    worker.start()
+    try:
+        output = await _decode_in_chunks(worker, mp3_bytes, 512)
+    finally:
+        worker.terminate()
+    # mulaw is one byte per sample
+    assert sum(len(chunk) for chunk, _ in output) > 8000
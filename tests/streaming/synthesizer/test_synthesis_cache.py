@@ -0,0 +1,92 @@
+from typing import Optional
+
+import pytest
+from tests.streaming.fixtures.synthesizer import TestSynthesizer, TestSynthesizerConfig
+from vocode.streaming.agent.bot_sentiment_analyser import BotSentiment
+from vocode.streaming.models.audio_encoding import AudioEncoding
+from vocode.streaming.models.message import BaseMessage
+from vocode.streaming.models.synthesizer import SynthesisCacheConfig
+from vocode.streaming.synthesizer.base_synthesizer import SynthesisResult
+from vocode.streaming.synthesizer.synthesis_cache import SynthesisCache
+
+CHUNK_SIZE = 1024
+
+
+class CountingSynthesizer(TestSynthesizer):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.num_create_speech_calls = 0
+
+    async def create_speech(
+        self,
+        message: BaseMessage,
+        chunk_size: int,
+        bot_sentiment: Optional[BotSentiment] = None,
+    ) -> SynthesisResult:
+        self.num_create_speech_calls += 1
+        return await super().create_speech(message, chunk_size, bot_sentiment)
+
+
+async def _collect_audio(synthesis_result: SynthesisResult) -> bytes:
+    return b"".join(
+        [chunk_result.chunk async for chunk_result in synthesis_result.chunk_generator]
+    )
+
+
+def _create_synthesizer(cache_dir: str) -> CountingSynthesizer:
+    return CountingSynthesizer(
+        TestSynthesizerConfig(
+            sampling_rate=16000,
+            audio_encoding=AudioEncoding.LINEAR16,
+            cache_config=SynthesisCacheConfig(cache_dir=cache_dir),
+        )
+    )
+
+
+@pytest.mark.asyncio
+async def test_cache_hit_skips_create_speech(tmp_path):
+    synthesizer = _create_synthesizer(str(tmp_path))
+    message = BaseMessage(text="Thanks for calling, goodbye!")
+
+    uncached_audio = await _collect_audio(
+        await synthesizer.create_speech_with_cache(message, CHUNK_SIZE)
+    )
+    cached_audio = await _collect_audio(
+        await synthesizer.create_speech_with_cache(message, CHUNK_SIZE)
+    )
+    assert cached_audio == uncached_audio
+    assert synthesizer.num_create_speech_calls == 1
+
+    await _collect_audio(
+        await synthesizer.create_speech_with_cache(
+            BaseMessage(text="Something else"), CHUNK_SIZE
+        )
+    )
+    assert synthesizer.num_create_speech_calls == 2
+    await synthesizer.tear_down()
+
+
+@pytest.mark.asyncio
+async def test_interrupted_synthesis_is_not_cached(tmp_path):
+    synthesizer = _create_synthesizer(str(tmp_path))
+    message = BaseMessage(text="This will be interrupted")
+
+    synthesis_result = await synthesizer.create_speech_with_cache(message, CHUNK_SIZE)
+    async for _ in synthesis_result.chunk_generator:
+        break
+    await synthesizer.create_speech_with_cache(message, CHUNK_SIZE)
+    assert synthesizer.num_create_speech_calls == 2
+    await synthesizer.tear_down()
+
+
+@pytest.mark.asyncio
+async def test_disk_tier_survives_memory_eviction(tmp_path):
+    cache = SynthesisCache(max_size_bytes=10, cache_dir=str(tmp_path))
+    cache._set_in_memory("a", b"0123456789")
+    cache._write_to_disk("a", b"0123456789")
+    cache._set_in_memory("b", b"01234")
+    assert "a" not in cache.entries
+    assert cache.size_bytes == 5
+    assert await cache.get("a") == b"0123456789"
+    assert await cache.get("missing") is None
+    assert (cache.hits, cache.misses) == (1, 1)
@@ -1,5 +1,8 @@
 import asyncio
 import logging
+from typing import Dict, Optional
+from unittest.mock import patch
+
 import pytest
 from tests.streaming.fixtures.output_device import SilentOutputDevice
 from tests.streaming.fixtures.synthesizer import TestSynthesizer, TestSynthesizerConfig
@@ -7,11 +10,16 @@ from tests.streaming.fixtures.transcriber import (
     TestAsyncTranscriber,
     TestTranscriberConfig,
 )
+from vocode.streaming.agent.base_agent import AgentResponseMessage
+from vocode.streaming.agent.bot_sentiment_analyser import BotSentiment
 from vocode.streaming.agent.echo_agent import EchoAgent
 from vocode.streaming.models.agent import EchoAgentConfig
 from vocode.streaming.models.audio_encoding import AudioEncoding
 from vocode.streaming.models.message import BaseMessage
+from vocode.streaming.models.transcriber import VADConfig
 from vocode.streaming.streaming_conversation import StreamingConversation
+from vocode.streaming.synthesizer.base_synthesizer import SynthesisResult
+from vocode.streaming.vad_utils import SpeechEvent, SpeechEventType
 
 logging.basicConfig()
 logger = logging.getLogger(__name__)
@@ -49,3 +57,108 @@ async def test_streaming_conversation():
     await conversation.start()
     await asyncio.sleep(1)
     await conversation.terminate()
+
+
+class ClosableChunkGenerator:
+    def __init__(self):
+        self.closed = False
+
+    async def aclose(self):
+        self.closed = True
+
+
+class DelayedSynthesizer(TestSynthesizer):
+    """Takes the given number of seconds to synthesize each message"""
+
+    def __init__(self, synthesizer_config, delays: Dict[str, float]):
+        super().__init__(synthesizer_config)
+        self.delays = delays
+        self.chunk_generators: Dict[str, ClosableChunkGenerator] = {}
+
+    async def create_speech(
+        self,
+        message: BaseMessage,
+        chunk_size: int,
+        bot_sentiment: Optional[BotSentiment] = None,
+    ) -> SynthesisResult:
+        await asyncio.sleep(self.delays[message.text])
+        chunk_generator = ClosableChunkGenerator()
+        self.chunk_generators[message.text] = chunk_generator
+        return SynthesisResult(chunk_generator, lambda seconds: message.text)  # type: ignore
+
+
+@pytest.mark.asyncio
+async def test_interrupted_lookahead_synthesis_results_are_closed():
+    sampling_rate = 16000
+    audio_encoding = AudioEncoding.LINEAR16
+    silent_output_device = SilentOutputDevice(
+        sampling_rate=sampling_rate, audio_encoding=audio_encoding
+    )
+    synthesizer = DelayedSynthesizer(
+        TestSynthesizerConfig.from_output_device(silent_output_device),
+        delays={"first": 0, "slow": 0.2, "fast": 0},
+    )
+    conversation = StreamingConversation(
+        output_device=silent_output_device,
+        transcriber=TestAsyncTranscriber(
+            TestTranscriberConfig(
+                sampling_rate=sampling_rate,
+                audio_encoding=audio_encoding,
+                chunk_size=2048,
+            )
+        ),
+        agent=EchoAgent(EchoAgentConfig(synthesis_lookahead=3)),
+        synthesizer=synthesizer,
+        logger=logger,
+    )
+    agent_responses_worker = conversation.agent_responses_worker
+    agent_responses_worker.start()
+    for text in ["first", "slow", "fast"]:
+        agent_responses_worker.consume_nonblocking(
+            conversation.interruptible_event_factory.create_interruptible_agent_response_event(
+                AgentResponseMessage(message=BaseMessage(text=text))
+            )
+        )
+    await asyncio.sleep(0.05)
+    # "first" waits for playback, "fast" is held back until "slow" is synthesized
+    assert conversation.synthesis_results_queue.qsize() == 1
+    assert set(synthesizer.chunk_generators) == {"first", "fast"}
+
+    conversation.broadcast_interrupt()
+    await asyncio.sleep(0.3)
+    assert synthesizer.chunk_generators["first"].closed
+    assert synthesizer.chunk_generators["fast"].closed
+    assert "slow" not in synthesizer.chunk_generators
+    assert conversation.synthesis_results_queue.empty()
+    agent_responses_worker.terminate()
+
+
+@pytest.mark.asyncio
+async def test_speech_start_only_interrupts_when_configured():
+    sampling_rate = 16000
+    audio_encoding = AudioEncoding.LINEAR16
+    silent_output_device = SilentOutputDevice(
+        sampling_rate=sampling_rate, audio_encoding=audio_encoding
+    )
+    transcriber_config = TestTranscriberConfig(
+        sampling_rate=sampling_rate,
+        audio_encoding=audio_encoding,
+        chunk_size=2048,
+    )
+    conversation = StreamingConversation(
+        output_device=silent_output_device,
+        transcriber=TestAsyncTranscriber(transcriber_config),
+        agent=EchoAgent(EchoAgentConfig()),
+        synthesizer=TestSynthesizer(
+            TestSynthesizerConfig.from_output_device(silent_output_device)
+        ),
+        logger=logger,
+    )
+    speech_start = SpeechEvent(type=SpeechEventType.START, timestamp_seconds=0)
+    with patch.object(conversation, "broadcast_interrupt") as broadcast_interrupt:
+        transcriber_config.vad_config = VADConfig()
+        conversation.handle_speech_event(speech_start)
+        broadcast_interrupt.assert_not_called()
+        transcriber_config.vad_config = VADConfig(interrupt_on_speech_start=True)
+        conversation.handle_speech_event(speech_start)
+        broadcast_interrupt.assert_called_once()
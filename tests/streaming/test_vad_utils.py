@@ -0,0 +1,242 @@
+import asyncio
+import subprocess
+import sys
+import threading
+from typing import Any, Dict, List
+
+import numpy as np
+import pytest
+
+from vocode.streaming.models.audio_encoding import AudioEncoding
+from vocode.streaming.models.transcriber import VADConfig
+from vocode.streaming.vad_utils import (
+    BatchedVADWorker,
+    SpeechEvent,
+    SpeechEventType,
+    VADIterator,
+    VADScheduler,
+    VADUplinkGate,
+    VADWorker,
+)
+
+
+class ScriptedVADModel:
+    """Returns scripted speech probabilities and records the windows it's called with"""
+
+    def __init__(self, speech_probabilities: List[float]):
+        self.speech_probabilities = list(speech_probabilities)
+        self.windows: List[np.ndarray] = []
+
+    def create_state(self) -> Dict[str, Any]:
+        return {"num_windows": 0}
+
+    def get_speech_probability(
+        self, window: np.ndarray, sampling_rate: int, state: Dict[str, Any]
+    ) -> float:
+        self.windows.append(window.copy())
+        state["num_windows"] += 1
+        return self.speech_probabilities.pop(0)
+
+
+class LoudnessVADModel:
+    """Treats loud windows as speech and records the size of each batch"""
+
+    def __init__(self):
+        self.batch_sizes: List[int] = []
+
+    def create_state(self) -> Dict[str, Any]:
+        return {"num_windows": 0}
+
+    def get_speech_probabilities(
+        self,
+        windows: List[np.ndarray],
+        sampling_rate: int,
+        states: List[Dict[str, Any]],
+    ) -> List[float]:
+        self.batch_sizes.append(len(windows))
+        for state in states:
+            state["num_windows"] += 1
+        return [0.9 if np.abs(window).mean() > 0.1 else 0.0 for window in windows]
+
+
+def test_vad_iterator_windows_and_events():
+    model = ScriptedVADModel([0.0, 0.9, 0.9, 0.1, 0.1])
+    vad_iterator = VADIterator(
+        VADConfig(window_size_samples=256, min_silence_duration_ms=32, speech_pad_ms=0),
+        sampling_rate=8000,
+        audio_encoding=AudioEncoding.LINEAR16,
+        model=model,  # type: ignore
+    )
+    samples = np.full(256 * 5, 16384, dtype=np.int16).tobytes()
+
+    speech_events = []
+    # chunks that don't line up with the model's windows
+    for i in range(0, len(samples), 320):
+        speech_events.extend(vad_iterator.process(samples[i : i + 320]))
+
+    assert len(model.windows) == 5
+    assert np.allclose(model.windows[0], 0.5)
+    assert vad_iterator.model_state["num_windows"] == 5
+    assert [speech_event.type for speech_event in speech_events] == [
+        SpeechEventType.START,
+        SpeechEventType.END,
+    ]
+    assert speech_events[0].timestamp_seconds == 256 / 8000
+
+
+def test_vad_iterator_window_size_depends_on_the_sampling_rate():
+    model = ScriptedVADModel([0.0])
+    vad_iterator = VADIterator(
+        VADConfig(),
+        sampling_rate=16000,
+        audio_encoding=AudioEncoding.LINEAR16,
+        model=model,  # type: ignore
+    )
+    vad_iterator.process(np.zeros(512, dtype=np.int16).tobytes())
+    assert len(model.windows) == 1
+    assert len(model.windows[0]) == 512
+
+    with pytest.raises(ValueError):
+        VADIterator(
+            VADConfig(window_size_samples=256),
+            sampling_rate=16000,
+            audio_encoding=AudioEncoding.LINEAR16,
+            model=model,  # type: ignore
+        )
+
+
+@pytest.mark.asyncio
+async def test_vad_worker_runs_inference_off_the_event_loop():
+    model = ScriptedVADModel([0.0, 0.9, 0.1])
+    inference_threads = []
+    get_speech_probability = model.get_speech_probability
+
+    def record_thread(*args):
+        inference_threads.append(threading.get_ident())
+        return get_speech_probability(*args)
+
+    model.get_speech_probability = record_thread  # type: ignore
+    vad_worker = VADWorker(
+        vad_iterator=VADIterator(
+            VADConfig(min_silence_duration_ms=32, speech_pad_ms=0),
+            sampling_rate=8000,
+            audio_encoding=AudioEncoding.LINEAR16,
+            model=model,  # type: ignore
+        ),
+        input_queue=asyncio.Queue(),
+        output_queue=asyncio.Queue(),
+    )
+    vad_worker.start()
+    vad_worker.consume_nonblocking(np.zeros(256, dtype=np.int16).tobytes())
+    vad_worker.consume_nonblocking(np.full(512, 16384, dtype=np.int16).tobytes())
+    speech_event = await asyncio.wait_for(vad_worker.output_queue.get(), timeout=1)
+    assert speech_event.type == SpeechEventType.START
+    assert len(inference_threads) == 3
+    assert threading.get_ident() not in inference_threads
+    vad_worker.terminate()
+
+
+class RecordingTranscriber:
+    def __init__(self):
+        self.is_muted = False
+        self.sent_chunks: List[bytes] = []
+        self.num_keepalives = 0
+
+    def send_audio(self, chunk: bytes):
+        self.sent_chunks.append(chunk)
+
+    def send_keepalive(self):
+        self.num_keepalives += 1
+
+
+def test_uplink_gate_sends_speech_with_padding():
+    transcriber = RecordingTranscriber()
+    uplink_gate = VADUplinkGate(
+        transcriber=transcriber,  # type: ignore
+        vad_config=VADConfig(
+            gate_uplink=True,
+            uplink_pre_padding_ms=40,
+            uplink_post_padding_ms=20,
+            uplink_keepalive_interval_seconds=0,
+        ),
+        bytes_per_second=8000,
+    )
+    chunks = [bytes([i]) * 160 for i in range(8)]
+
+    for chunk in chunks[:4]:
+        uplink_gate.send_audio(chunk)
+    assert transcriber.sent_chunks == []
+    uplink_gate.handle_speech_event(
+        SpeechEvent(type=SpeechEventType.START, timestamp_seconds=0.06)
+    )
+    assert transcriber.sent_chunks == chunks[2:4]
+    uplink_gate.send_audio(chunks[4])
+    uplink_gate.handle_speech_event(
+        SpeechEvent(type=SpeechEventType.END, timestamp_seconds=0.1)
+    )
+    for chunk in chunks[5:]:
+        uplink_gate.send_audio(chunk)
+
+    assert transcriber.sent_chunks == chunks[2:6]
+    assert uplink_gate.bytes_sent == 4 * 160
+    # the last two chunks are still buffered as pre-padding
+    assert uplink_gate.bytes_suppressed == 2 * 160
+    assert transcriber.num_keepalives > 0
+
+
+def test_importing_streaming_conversation_does_not_import_torch():
+    subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, vocode.streaming.streaming_conversation; assert 'torch' not in sys.modules",
+        ],
+        check=True,
+    )
+
+
+@pytest.mark.asyncio
+async def test_vad_scheduler_batches_across_streams():
+    model = LoudnessVADModel()
+    scheduler = VADScheduler(
+        model=model,  # type: ignore
+        batching_window_seconds=0.01,
+        max_batch_size=256,
+    )
+    vad_config = VADConfig(min_silence_duration_ms=32, speech_pad_ms=0)
+    vad_workers = [
+        BatchedVADWorker(
+            vad_iterator=VADIterator(
+                vad_config,
+                sampling_rate=8000,
+                audio_encoding=AudioEncoding.LINEAR16,
+                model=model,  # type: ignore
+            ),
+            scheduler=scheduler,
+            input_queue=asyncio.Queue(),
+            output_queue=asyncio.Queue(),
+        )
+        for _ in range(10)
+    ]
+    silence = np.zeros(256, dtype=np.int16).tobytes()
+    speech = np.full(256, 16384, dtype=np.int16).tobytes()
+    for vad_worker in vad_workers:
+        vad_worker.start()
+        for chunk in [silence, speech, speech, silence, silence]:
+            vad_worker.consume_nonblocking(chunk)
+
+    for vad_worker in vad_workers:
+        speech_events = [
+            await asyncio.wait_for(vad_worker.output_queue.get(), timeout=1)
+            for _ in range(2)
+        ]
+        assert [speech_event.type for speech_event in speech_events] == [
+            SpeechEventType.START,
+            SpeechEventType.END,
+        ]
+        assert vad_worker.vad_iterator.model_state["num_windows"] == 5
+        vad_worker.terminate()
+
+    # each batch has one window from every stream
+    assert model.batch_sizes == [10] * 5
+    assert scheduler.num_windows == 50
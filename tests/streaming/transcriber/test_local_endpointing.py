@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+
+from vocode.streaming.models.audio_encoding import AudioEncoding
+from vocode.streaming.models.transcriber import LocalEndpointingConfig
+from vocode.streaming.transcriber.base_transcriber import Transcription
+from vocode.streaming.transcriber.local_endpointing import LocalEndpointingWorker
+from vocode.streaming.vad_utils import SpeechEvent, SpeechEventType
+from tests.streaming.fixtures.transcriber import (
+    TestAsyncTranscriber,
+    TestTranscriberConfig,
+)
+
+
+def create_endpointing_worker() -> LocalEndpointingWorker:
+    transcriber = TestAsyncTranscriber(
+        TestTranscriberConfig(
+            sampling_rate=8000,
+            audio_encoding=AudioEncoding.MULAW,
+            chunk_size=160,
+            endpointing_config=LocalEndpointingConfig(
+                time_cutoff_seconds=0.2,
+                punctuation_time_cutoff_seconds=0.05,
+                reference_words_per_second=None,
+            ),
+        )
+    )
+    endpointing_worker = LocalEndpointingWorker(
+        input_queue=asyncio.Queue(),
+        output_queue=asyncio.Queue(),
+        transcriber=transcriber,
+    )
+    endpointing_worker.start()
+    return endpointing_worker
+
+
+def get_finals(endpointing_worker: LocalEndpointingWorker) -> list:
+    finals = []
+    while not endpointing_worker.output_queue.empty():
+        transcription = endpointing_worker.output_queue.get_nowait()
+        if transcription.is_final:
+            finals.append(transcription.message)
+    return finals
+
+
+@pytest.mark.asyncio
+async def test_local_endpointing_ends_turn_before_provider():
+    endpointing_worker = create_endpointing_worker()
+    endpointing_worker.handle_speech_event(
+        SpeechEvent(type=SpeechEventType.START, timestamp_seconds=0)
+    )
+    endpointing_worker.consume_nonblocking(
+        Transcription(message="hello there.", confidence=0.9, is_final=False)
+    )
+    await asyncio.sleep(0.01)
+    endpointing_worker.handle_speech_event(
+        SpeechEvent(type=SpeechEventType.END, timestamp_seconds=1)
+    )
+
+    # terminal punctuation uses the short cutoff
+    await asyncio.sleep(0.1)
+    assert get_finals(endpointing_worker) == ["hello there."]
+
+    # the provider's final only carries the words that came after the local final
+    endpointing_worker.consume_nonblocking(
+        Transcription(message="hello there. how", confidence=0.9, is_final=True)
+    )
+    await asyncio.sleep(0.01)
+    assert get_finals(endpointing_worker) == ["how"]
+    endpointing_worker.terminate()
+
+
+@pytest.mark.asyncio
+async def test_local_endpointing_waits_while_human_speaks():
+    endpointing_worker = create_endpointing_worker()
+    endpointing_worker.handle_speech_event(
+        SpeechEvent(type=SpeechEventType.START, timestamp_seconds=0)
+    )
+    endpointing_worker.consume_nonblocking(
+        Transcription(message="I would like", confidence=0.9, is_final=False)
+    )
+    await asyncio.sleep(0.3)
+    assert get_finals(endpointing_worker) == []
+
+    endpointing_worker.handle_speech_event(
+        SpeechEvent(type=SpeechEventType.END, timestamp_seconds=1)
+    )
+    await asyncio.sleep(0.1)
+    assert get_finals(endpointing_worker) == []
+    await asyncio.sleep(0.2)
+    assert get_finals(endpointing_worker) == ["I would like"]
+    endpointing_worker.terminate()
@@ -0,0 +1,65 @@
+import numpy as np
+
+from vocode.streaming.models.audio_encoding import AudioEncoding
+from vocode.streaming.utils import convert_linear_audio
+from vocode.streaming.utils.audio_converter import (
+    StreamingAudioConverter,
+    linear16_to_mulaw,
+    mulaw_to_linear16,
+)
+
+# G.711 reference values, matching audioop.lin2ulaw and audioop.ulaw2lin
+MULAW_ENCODED_SAMPLES = {
+    0: 0xFF,
+    -1: 0x7E,
+    1000: 0xCE,
+    -1000: 0x4E,
+    32767: 0x80,
+    -32768: 0x00,
+}
+MULAW_DECODED_SAMPLES = {0xFF: 0, 0x7F: 0, 0xCE: 988, 0x4E: -988, 0x80: 32124}
+
+
+def test_mulaw_conversion():
+    linear_audio = np.array(list(MULAW_ENCODED_SAMPLES.keys()), dtype=np.int16)
+    assert list(linear16_to_mulaw(linear_audio.tobytes())) == list(
+        MULAW_ENCODED_SAMPLES.values()
+    )
+    decoded = np.frombuffer(
+        mulaw_to_linear16(bytes(MULAW_DECODED_SAMPLES.keys())), dtype=np.int16
+    )
+    assert decoded.tolist() == list(MULAW_DECODED_SAMPLES.values())
+
+
+def test_streaming_conversion_is_chunk_invariant():
+    samples = (8000 * np.sin(np.arange(24000) / 10)).astype(np.int16).tobytes()
+    expected = StreamingAudioConverter(
+        input_sampling_rate=24000,
+        output_sampling_rate=8000,
+        output_encoding=AudioEncoding.MULAW,
+    ).convert(samples)
+    assert len(expected) == 8000
+
+    for chunk_size in [2, 322, 1000]:
+        audio_converter = StreamingAudioConverter(
+            input_sampling_rate=24000,
+            output_sampling_rate=8000,
+            output_encoding=AudioEncoding.MULAW,
+        )
+        output = b"".join(
+            audio_converter.convert(samples[i : i + chunk_size])
+            for i in range(0, len(samples), chunk_size)
+        )
+        assert output == expected
+
+
+def test_flush_completes_the_output():
+    samples = np.full(24000, 1000, dtype=np.int16).tobytes()
+    for input_sampling_rate, output_sampling_rate in [(8000, 16000), (24000, 8000)]:
+        output = convert_linear_audio(
+            samples,
+            input_sample_rate=input_sampling_rate,
+            output_sample_rate=output_sampling_rate,
+        )
+        assert len(output) == 2 * 24000 * output_sampling_rate // input_sampling_rate
+        assert set(np.frombuffer(output, dtype=np.int16).tolist()) == {1000}
@@ -0,0 +1,85 @@
+import asyncio
+import os
+from unittest.mock import AsyncMock, patch
+
+import numpy as np
+import pytest
+
+from vocode.streaming.utils.embedding_service import EmbeddingCache, EmbeddingService
+from vocode.streaming.utils.openai_client import OpenAIClient
+
+
+async def create_embedding_response(input, **params):
+    await asyncio.sleep(0.01)
+    return {
+        "data": [
+            {"index": i, "embedding": [float(len(text)), 1.0]}
+            for i, text in enumerate(input)
+        ]
+    }
+
+
+@pytest.mark.asyncio
+async def test_concurrent_texts_are_batched_coalesced_and_cached():
+    openai_client = OpenAIClient(api_key="key")
+    embedding_service = EmbeddingService(openai_client, EmbeddingCache())
+    with patch.object(
+        openai_client,
+        "create_embedding",
+        AsyncMock(side_effect=create_embedding_response),
+    ) as create_embedding:
+        embeddings = await asyncio.gather(
+            embedding_service.create_embedding("Okay"),
+            embedding_service.create_embedding("okay "),
+            embedding_service.create_embedding("thank you"),
+            embedding_service.create_embeddings(["yes", "Thank you"]),
+        )
+        assert create_embedding.call_count == 1
+        # normalized for the cache key only, the first caller's text is embedded
+        assert create_embedding.call_args.kwargs["input"] == [
+            "Okay",
+            "thank you",
+            "yes",
+        ]
+        assert embeddings[0].dtype == np.float32
+        assert embeddings[0].tolist() == [4.0, 1.0]
+        assert embeddings[1].tolist() == [4.0, 1.0]
+        assert [embedding.tolist() for embedding in embeddings[3]] == [
+            [3.0, 1.0],
+            [9.0, 1.0],
+        ]
+
+        await embedding_service.create_embeddings(["YES", "okay"])
+        assert create_embedding.call_count == 1
+        await embedding_service.create_embedding("okay", model="text-embedding-3-small")
+        assert create_embedding.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_is_not_cached():
+    openai_client = OpenAIClient(api_key="key")
+    embedding_service = EmbeddingService(openai_client, EmbeddingCache())
+    with patch.object(
+        openai_client,
+        "create_embedding",
+        AsyncMock(side_effect=[RuntimeError("unavailable"), create_embedding_response]),
+    ):
+        with pytest.raises(RuntimeError):
+            await embedding_service.create_embedding("okay")
+    with patch.object(
+        openai_client,
+        "create_embedding",
+        AsyncMock(side_effect=create_embedding_response),
+    ) as create_embedding:
+        assert (await embedding_service.create_embedding("okay")).tolist() == [4.0, 1.0]
+        assert create_embedding.call_count == 1
+
+
+def test_embedding_cache_is_persisted(tmp_path):
+    path = os.path.join(tmp_path, "embeddings.npz")
+    embedding_cache = EmbeddingCache(path=path)
+    embedding_cache.embeddings[("text-embedding-ada-002", "okay")] = np.array([1.0])
+    embedding_cache.save()
+    loaded_embedding_cache = EmbeddingCache(path=path)
+    embedding = loaded_embedding_cache.get(("text-embedding-ada-002", "okay"))
+    assert embedding is not None and embedding.tolist() == [1.0]
@@ -0,0 +1,62 @@
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from vocode.streaming.utils.goodbye_model import (
+    EMBEDDING_SIZE,
+    GOODBYE_PHRASES,
+    GoodbyeModel,
+    LocalGoodbyeModel,
+)
+from vocode.streaming.utils.openai_client import OpenAIClient
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "text,is_goodbye",
+    [
+        ("Okay, thanks. Goodbye!", True),
+        ("Alright, talk to ya later.", True),
+        ("Thanks, that's all I needed.", True),
+        ("Have a great day!", True),
+        ("What are your opening hours?", False),
+        ("I'd like to see your menu", False),
+        ("Have a good look at it", False),
+        ("Okay, take care now.", True),
+        ("Thats all I needed", True),
+        ("Can you take care of it?", False),
+        ("Have a good time", False),
+        ("Great, see you there", False),
+        ("I'll see you at five", False),
+    ],
+)
+async def test_local_goodbye_model(text: str, is_goodbye: bool):
+    assert await LocalGoodbyeModel().is_goodbye(text) == is_goodbye
+
+
+def create_embedding_response(input, **params):
+    return {
+        "data": [
+            {"index": i, "embedding": [float(i)] * EMBEDDING_SIZE}
+            for i in range(len(input))
+        ]
+    }
+
+
+@pytest.mark.asyncio
+async def test_goodbye_model_batches_and_caches_embeddings():
+    openai_client = OpenAIClient(api_key="key")
+    with patch.object(
+        openai_client,
+        "create_embedding",
+        AsyncMock(side_effect=create_embedding_response),
+    ) as create_embedding:
+        goodbye_model = GoodbyeModel(openai_client=openai_client)
+        embeddings = await goodbye_model.create_embeddings()
+        assert embeddings.shape == (EMBEDDING_SIZE, len(GOODBYE_PHRASES))
+        assert create_embedding.call_count == 1
+
+        goodbye_model.goodbye_embeddings = embeddings
+        await goodbye_model.is_goodbye("what is the weather like")
+        await goodbye_model.is_goodbye("What is the weather like ")
+        assert create_embedding.call_count == 2
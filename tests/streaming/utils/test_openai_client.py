@@ -0,0 +1,52 @@
+from unittest.mock import AsyncMock, patch
+
+import openai
+import pytest
+
+from vocode.streaming.utils.openai_client import (
+    OpenAIClient,
+    get_openai_client,
+)
+
+
+def test_openai_clients_are_shared_per_endpoint_and_credentials():
+    client = get_openai_client(api_key="key-1")
+    assert get_openai_client(api_key="key-1") is client
+    assert get_openai_client(api_key="key-2") is not client
+    assert (
+        get_openai_client(
+            api_key="key-1",
+            api_base="https://example.openai.azure.com",
+            api_type="azure",
+            api_version="2023-03-15-preview",
+        )
+        is not client
+    )
+
+
+@pytest.mark.asyncio
+async def test_openai_client_passes_credentials_without_global_state():
+    global_api_key = openai.api_key
+    client = OpenAIClient(
+        api_key="key",
+        api_base="https://example.openai.azure.com",
+        api_type="azure",
+        api_version="2023-03-15-preview",
+        max_connections=2,
+    )
+
+    with patch.object(
+        openai.ChatCompletion, "acreate", AsyncMock(return_value="response")
+    ) as acreate:
+        response = await client.create_chat_completion(engine="gpt-35-turbo")
+    assert response == "response"
+    _, kwargs = acreate.call_args
+    assert kwargs["api_key"] == "key"
+    assert kwargs["api_base"] == "https://example.openai.azure.com"
+    assert kwargs["api_type"] == "azure"
+    assert kwargs["engine"] == "gpt-35-turbo"
+    assert openai.api_key == global_api_key
+    assert openai.aiosession.get() is None
+    assert client.aiohttp_session is not None
+    assert client.aiohttp_session.connector.limit == 2
+    await client.close()
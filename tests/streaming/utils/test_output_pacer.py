@@ -0,0 +1,53 @@
+import asyncio
+
+import pytest
+
+from vocode.streaming.utils.output_pacer import OutputPacer, PacedOutputStream
+
+
+@pytest.mark.asyncio
+async def test_paced_output_stream_does_not_drift():
+    pacer = OutputPacer(tick_seconds=0.005)
+    output_stream = PacedOutputStream(lead_seconds=0.01, pacer=pacer)
+    start_time = pacer.time()
+    for _ in range(20):
+        await output_stream.wait_for_next_chunk()
+        output_stream.mark_sent(0.05)
+        # simulate some work between chunks
+        await asyncio.sleep(0.002)
+    await output_stream.wait_for_next_chunk()
+
+    # the last chunk is released lead_seconds before the previous one finishes playing
+    assert pacer.time() - start_time == pytest.approx(0.99, abs=0.02)
+    assert output_stream.get_playback_position() == pytest.approx(0.99, abs=0.02)
+
+
+@pytest.mark.asyncio
+async def test_output_streams_share_one_wakeup():
+    pacer = OutputPacer(tick_seconds=0.01)
+    output_streams = [PacedOutputStream(lead_seconds=0, pacer=pacer) for _ in range(50)]
+    for output_stream in output_streams:
+        output_stream.mark_sent(0.05)
+
+    await asyncio.gather(
+        *[output_stream.wait_for_next_chunk() for output_stream in output_streams]
+    )
+
+    assert pacer.waiters == []
+    for output_stream in output_streams:
+        # released at most a tick early
+        assert output_stream.get_buffered_seconds() <= pacer.tick_seconds
+
+
+@pytest.mark.asyncio
+async def test_paced_output_stream_drops_buffered_audio():
+    pacer = OutputPacer(tick_seconds=0.005)
+    output_stream = PacedOutputStream(lead_seconds=0, pacer=pacer)
+    output_stream.mark_sent(1.0)
+
+    output_stream.drop_buffered_audio(playback_position=0.2)
+
+    assert output_stream.sent_seconds == 0.2
+    assert output_stream.get_buffered_seconds() == 0
+    # the next chunk can be sent right away
+    await asyncio.wait_for(output_stream.wait_for_next_chunk(), timeout=0.01)
@@ -0,0 +1,93 @@
+import asyncio
+from typing import Dict, List
+
+import pytest
+from vocode.streaming.utils.worker import (
+    InterruptibleEvent,
+    InterruptibleEventFactory,
+    InterruptibleWorker,
+)
+
+
+class SleepingWorker(InterruptibleWorker[InterruptibleEvent[float]]):
+    """Sleeps for the payload's number of seconds, then outputs it"""
+
+    def __init__(self, max_concurrency: int, ordered_output: bool):
+        super().__init__(
+            input_queue=asyncio.Queue(),
+            output_queue=asyncio.Queue(),
+            max_concurrency=max_concurrency,
+            ordered_output=ordered_output,
+        )
+        self.num_running = 0
+        self.max_num_running = 0
+        self.cancelled: List[float] = []
+
+    async def process(self, item: InterruptibleEvent[float]):
+        self.num_running += 1
+        self.max_num_running = max(self.max_num_running, self.num_running)
+        try:
+            await asyncio.sleep(item.payload)
+            self.produce_nonblocking(item.payload)
+        except asyncio.CancelledError:
+            self.cancelled.append(item.payload)
+        finally:
+            self.num_running -= 1
+
+
+def _consume(worker: InterruptibleWorker, payloads: List[float], **kwargs):
+    factory = InterruptibleEventFactory()
+    for payload in payloads:
+        worker.consume_nonblocking(
+            factory.create_interruptible_event(payload, **kwargs)
+        )
+
+
+async def _get_outputs(worker: InterruptibleWorker, num_outputs: int) -> List[float]:
+    return [
+        await asyncio.wait_for(worker.output_queue.get(), 1) for _ in range(num_outputs)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_max_concurrency_one_is_sequential():
+    worker = SleepingWorker(max_concurrency=1, ordered_output=True)
+    worker.start()
+    _consume(worker, [0.03, 0.01, 0.02])
+    assert await _get_outputs(worker, 3) == [0.03, 0.01, 0.02]
+    assert worker.max_num_running == 1
+    worker.terminate()
+
+
+@pytest.mark.asyncio
+async def test_ordered_output_keeps_input_order():
+    worker = SleepingWorker(max_concurrency=3, ordered_output=True)
+    worker.start()
+    _consume(worker, [0.05, 0.01, 0.03, 0.02])
+    assert await _get_outputs(worker, 4) == [0.05, 0.01, 0.03, 0.02]
+    assert worker.max_num_running == 3
+    worker.terminate()
+
+
+@pytest.mark.asyncio
+async def test_unordered_output_in_completion_order():
+    worker = SleepingWorker(max_concurrency=3, ordered_output=False)
+    worker.start()
+    _consume(worker, [0.05, 0.01, 0.03])
+    assert await _get_outputs(worker, 3) == [0.01, 0.03, 0.05]
+    worker.terminate()
+
+
+@pytest.mark.asyncio
+async def test_cancel_current_task_cancels_every_interruptible_task():
+    worker = SleepingWorker(max_concurrency=3, ordered_output=False)
+    worker.start()
+    _consume(worker, [0.2, 0.3])
+    _consume(worker, [0.1], is_interruptible=False)
+    await asyncio.sleep(0.01)
+    assert len(worker.current_tasks) == 3
+    assert worker.cancel_current_task()
+    assert await _get_outputs(worker, 1) == [0.1]
+    assert sorted(worker.cancelled) == [0.2, 0.3]
+    assert not worker.current_tasks
+    worker.terminate()
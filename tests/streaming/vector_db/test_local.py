@@ -0,0 +1,80 @@
+from typing import List
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from vocode.streaming.models.vector_db import LocalVectorDBConfig, LocalVectorDBDType
+from vocode.streaming.utils.openai_client import OpenAIClient
+from vocode.streaming.vector_db.local import LocalVectorDB, LocalVectorStore
+
+VOCABULARY = ["opening", "hours", "parking", "refund", "policy", "weekend"]
+
+
+def embed(text: str) -> List[float]:
+    return [float(word in text.lower()) + 0.01 for word in VOCABULARY]
+
+
+async def create_openai_embeddings(texts: List[str], model=None) -> List[List[float]]:
+    return [embed(text) for text in texts]
+
+
+async def create_openai_embedding(text: str, model=None) -> List[float]:
+    return embed(text)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("dtype", list(LocalVectorDBDType))
+async def test_local_vector_db_search(tmp_path, dtype: LocalVectorDBDType):
+    vector_db = LocalVectorDB(
+        LocalVectorDBConfig(path=str(tmp_path / dtype.value), dtype=dtype, top_k=2),
+        openai_client=OpenAIClient(api_key="key"),
+    )
+    with patch.object(
+        vector_db, "create_openai_embeddings", create_openai_embeddings
+    ), patch.object(vector_db, "create_openai_embedding", create_openai_embedding):
+        await vector_db.add_texts(
+            [
+                "Our opening hours are 9 to 5",
+                "Weekend opening hours are 10 to 2",
+                "Parking is free",
+                "Our refund policy lasts 30 days",
+            ],
+            metadatas=[
+                {"source": "hours"},
+                {"source": "hours"},
+                {"source": "parking"},
+                {"source": "refunds"},
+            ],
+            ids=["hours", "weekend_hours", "parking", "refunds"],
+        )
+        await vector_db.add_texts(["Parking costs 5 dollars"], ids=["parking"])
+        await vector_db.add_texts(["Closed on holidays"], namespace="holidays")
+
+        results = await vector_db.similarity_search_with_score("opening hours")
+        assert [document.page_content for document, _ in results] == [
+            "Our opening hours are 9 to 5",
+            "Weekend opening hours are 10 to 2",
+        ]
+        assert results[0][1] == pytest.approx(1.0, abs=0.02)
+
+        results = await vector_db.similarity_search_with_score(
+            "opening hours", filter={"source": {"$in": ["parking", "refunds"]}}
+        )
+        assert [document.page_content for document, _ in results] == [
+            "Our refund policy lasts 30 days"
+        ]
+        results = await vector_db.similarity_search_with_score("parking")
+        assert results[0][0].page_content == "Parking costs 5 dollars"
+        results = await vector_db.similarity_search_with_score(
+            "parking", namespace="holidays"
+        )
+        assert [document.page_content for document, _ in results] == [
+            "Closed on holidays"
+        ]
+    await vector_db.tear_down()
+
+    # e.g. another process, sharing the memory-mapped vectors
+    store = LocalVectorStore(str(tmp_path / dtype.value), dtype)
+    assert len(store.stored_vectors.documents) == 5
+    assert isinstance(store.stored_vectors.vectors, np.memmap)
@@ -0,0 +1,103 @@
+import asyncio
+import time
+from email.utils import formatdate
+from typing import List
+from unittest.mock import patch
+
+import pytest
+
+from vocode.streaming.models.vector_db import PineconeConfig
+from vocode.streaming.utils.openai_client import OpenAIClient
+from vocode.streaming.vector_db.base_vector_db import (
+    RateLimitError,
+    parse_retry_after,
+)
+from vocode.streaming.vector_db.pinecone import PineconeDB
+
+
+@pytest.mark.asyncio
+async def test_add_texts_batches_embeddings_and_retries_rate_limited_upserts():
+    vector_db = PineconeDB(
+        PineconeConfig(index="index", api_key="key", api_environment="local"),
+        openai_client=OpenAIClient(api_key="key"),
+    )
+    embedding_batches: List[List[str]] = []
+    upserted_chunks: List[List[dict]] = []
+    num_rate_limited = 0
+
+    async def create_openai_embeddings(texts: List[str]) -> List[List[float]]:
+        embedding_batches.append(texts)
+        return [[float(len(text))] for text in texts]
+
+    async def upsert(docs: List[dict], namespace: str):
+        nonlocal num_rate_limited
+        if num_rate_limited == 0:
+            num_rate_limited += 1
+            raise RateLimitError(retry_after_seconds=0.01)
+        upserted_chunks.append(docs)
+
+    progress = []
+    texts = [f"text {i}" for i in range(25)]
+    with patch.object(
+        vector_db, "create_openai_embeddings", create_openai_embeddings
+    ), patch.object(vector_db, "upsert", upsert):
+        ids = await vector_db.add_texts(
+            texts,
+            embedding_batch_size=10,
+            upsert_batch_size=4,
+            max_concurrency=2,
+            on_progress=lambda num_upserted, num_texts: progress.append(num_upserted),
+        )
+    await vector_db.tear_down()
+
+    assert [len(batch) for batch in embedding_batches] == [10, 10, 5]
+    assert num_rate_limited == 1
+    assert all(len(chunk) <= 4 for chunk in upserted_chunks)
+    assert sorted(doc["id"] for chunk in upserted_chunks for doc in chunk) == sorted(
+        ids
+    )
+    assert progress[-1] == len(texts)
+
+
+@pytest.mark.asyncio
+async def test_add_texts_cancels_the_other_embeddings_on_failure():
+    vector_db = PineconeDB(
+        PineconeConfig(index="index", api_key="key", api_environment="local"),
+        openai_client=OpenAIClient(api_key="key"),
+    )
+    num_cancelled = 0
+
+    async def create_openai_embeddings(texts: List[str]) -> List[List[float]]:
+        nonlocal num_cancelled
+        if texts[0] == "text 0":
+            raise ValueError("embedding failed")
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            num_cancelled += 1
+            raise
+        return [[0.0] for _ in texts]
+
+    async def upsert(docs: List[dict], namespace: str):
+        raise AssertionError("nothing should be upserted")
+
+    with patch.object(
+        vector_db, "create_openai_embeddings", create_openai_embeddings
+    ), patch.object(vector_db, "upsert", upsert):
+        with pytest.raises(ValueError):
+            await vector_db.add_texts(
+                [f"text {i}" for i in range(3)],
+                embedding_batch_size=1,
+                max_concurrency=3,
+            )
+        await asyncio.sleep(0.01)
+    await vector_db.tear_down()
+
+    assert num_cancelled == 2
+
+
+def test_parse_retry_after():
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("2") == 2
+    assert parse_retry_after("soon") is None
+    assert 8 < parse_retry_after(formatdate(time.time() + 10, usegmt=True)) <= 10  # type: ignore
@@ -15,6 +15,8 @@ from vocode.streaming.utils.worker import (
     InterruptibleWorker,
 )
 
+ACTIONS_WORKER_DEFAULT_MAX_CONCURRENCY = 4
+
 
 class ActionsWorker(InterruptibleWorker):
     def __init__(
@@ -23,11 +25,15 @@ class ActionsWorker(InterruptibleWorker):
         output_queue: asyncio.Queue[InterruptibleEvent[AgentInput]],
         interruptible_event_factory: InterruptibleEventFactory = InterruptibleEventFactory(),
         action_factory: ActionFactory = ActionFactory(),
+        max_concurrency: int = ACTIONS_WORKER_DEFAULT_MAX_CONCURRENCY,
     ):
+        # actions are independent of each other, so a slow action shouldn't hold up the rest
         super().__init__(
             input_queue=input_queue,
             output_queue=output_queue,
             interruptible_event_factory=interruptible_event_factory,
+            max_concurrency=max_concurrency,
+            ordered_output=False,
         )
         self.action_factory = action_factory
 
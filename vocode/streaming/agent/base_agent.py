@@ -34,14 +34,24 @@ from vocode.streaming.models.actions import (
 from vocode.streaming.models.agent import (
     AgentConfig,
     ChatGPTAgentConfig,
+    GoodbyeModelType,
     LLMAgentConfig,
 )
 from vocode.streaming.models.message import BaseMessage
 from vocode.streaming.models.model import BaseModel, TypedModel
 from vocode.streaming.transcriber.base_transcriber import Transcription
 from vocode.streaming.utils import remove_non_letters_digits
-from vocode.streaming.utils.goodbye_model import GoodbyeModel
+from vocode.streaming.utils.goodbye_model import GoodbyeModel, LocalGoodbyeModel
 from vocode.streaming.models.transcript import Transcript
+from vocode.streaming.agent.response_cache import (
+    ResponseCache,
+    ResponseCacheLookup,
+    get_response_cache,
+)
+from vocode.streaming.agent.speculative_response import (
+    SpeculativeResponder,
+    shadow_transcript,
+)
 from vocode.streaming.utils.worker import (
     InterruptibleAgentResponseEvent,
     InterruptibleEvent,
@@ -133,6 +143,13 @@ class AbstractAgent(Generic[AgentConfigType]):
 
 
 class BaseAgent(AbstractAgent[AgentConfigType], InterruptibleWorker):
+    # whether generate_response only depends on the transcript, so that it can be run ahead
+    # of the final transcription without side effects
+    supports_speculative_responses = False
+    # whether the agent's context only comes from the transcript, so that a response reused
+    # from the cache leaves nothing out of the history that the next response is based on
+    supports_response_cache = False
+
     def __init__(
         self,
         agent_config: AgentConfigType,
@@ -158,13 +175,27 @@ class BaseAgent(AbstractAgent[AgentConfigType], InterruptibleWorker):
             InterruptibleEvent[ActionInput]
         ] = asyncio.Queue()
         self.logger = logger or logging.getLogger(__name__)
-        self.goodbye_model = None
+        self.goodbye_model: Optional[Union[GoodbyeModel, LocalGoodbyeModel]] = None
         if self.agent_config.end_conversation_on_goodbye:
-            self.goodbye_model = GoodbyeModel()
+            if self.agent_config.goodbye_model_type == GoodbyeModelType.LOCAL:
+                self.goodbye_model = LocalGoodbyeModel()
+            else:
+                self.goodbye_model = GoodbyeModel()
             self.goodbye_model_initialize_task = asyncio.create_task(
                 self.goodbye_model.initialize_embeddings()
             )
-        self.transcript: Optional[Transcript] = None
+        self._transcript: Optional[Transcript] = None
+        # only RespondAgents generate responses that can be speculated
+        self.speculative_responder: Optional[SpeculativeResponder] = None
+        self.response_cache: Optional[ResponseCache] = None
+        if self.agent_config.response_cache_config and self.supports_response_cache:
+            self.response_cache = get_response_cache(
+                self.agent_config.response_cache_config
+            )
+            self.response_cache_namespace = ResponseCache.get_namespace(
+                self.agent_config.type,
+                getattr(self.agent_config, "prompt_preamble", None),
+            )
 
         self.functions = self.get_functions() if self.agent_config.actions else None
         self.is_muted = False
@@ -172,9 +203,25 @@ class BaseAgent(AbstractAgent[AgentConfigType], InterruptibleWorker):
     def get_functions(self):
         raise NotImplementedError
 
+    @property
+    def transcript(self) -> Optional[Transcript]:
+        return shadow_transcript.get() or self._transcript
+
+    @transcript.setter
+    def transcript(self, transcript: Optional[Transcript]):
+        self._transcript = transcript
+
     def attach_transcript(self, transcript: Transcript):
         self.transcript = transcript
 
+    def handle_interim_transcription(
+        self, transcription: Transcription, conversation_id: str
+    ):
+        if self.speculative_responder is not None:
+            self.speculative_responder.handle_interim_transcription(
+                transcription, conversation_id
+            )
+
     def attach_conversation_state_manager(
         self, conversation_state_manager: ConversationStateManager
     ):
@@ -197,8 +244,72 @@ class BaseAgent(AbstractAgent[AgentConfigType], InterruptibleWorker):
         assert self.goodbye_model is not None
         return asyncio.create_task(self.goodbye_model.is_goodbye(message))
 
+    def terminate(self):
+        if self.speculative_responder is not None:
+            self.speculative_responder.cancel()
+        return super().terminate()
+
 
 class RespondAgent(BaseAgent[AgentConfigType]):
+    def __init__(
+        self,
+        agent_config: AgentConfigType,
+        action_factory: ActionFactory = ActionFactory(),
+        interruptible_event_factory: InterruptibleEventFactory = InterruptibleEventFactory(),
+        logger: Optional[logging.Logger] = None,
+    ):
+        super().__init__(
+            agent_config=agent_config,
+            action_factory=action_factory,
+            interruptible_event_factory=interruptible_event_factory,
+            logger=logger,
+        )
+        if (
+            self.agent_config.speculative_response_config
+            and self.agent_config.generate_responses
+            and self.supports_speculative_responses
+        ):
+            self.speculative_responder = SpeculativeResponder(
+                self,
+                self.agent_config.speculative_response_config,
+                logger=self.logger,
+            )
+
+    def can_speculate(self) -> bool:
+        """Whether a response generated now could be thrown away without side effects"""
+        return True
+
+    async def lookup_cached_response(
+        self, transcription: Transcription, agent_input: AgentInput
+    ) -> Optional[ResponseCacheLookup]:
+        if (
+            self.response_cache is None
+            or not isinstance(agent_input, TranscriptionAgentInput)
+            or transcription.is_interrupt
+        ):
+            return None
+        assert self.agent_config.response_cache_config is not None
+        try:
+            # the response is generated instead of waiting on a slow embedding
+            return await asyncio.wait_for(
+                self.response_cache.lookup(
+                    self.response_cache_namespace, transcription.message
+                ),
+                self.agent_config.response_cache_config.lookup_timeout_seconds,
+            )
+        except asyncio.TimeoutError:
+            self.logger.debug("Timed out looking up cached response")
+            return None
+        except Exception as e:
+            self.logger.error(f"Error while looking up cached response: {e}")
+            return None
+
+    async def get_cached_responses(
+        self, sentences: typing.List[str]
+    ) -> AsyncGenerator[Tuple[str, bool], None]:
+        for sentence in sentences:
+            yield sentence, True
+
     async def handle_generate_response(
         self, transcription: Transcription, agent_input: AgentInput
     ) -> bool:
@@ -210,17 +321,39 @@ class RespondAgent(BaseAgent[AgentConfigType]):
         agent_span_first = tracer.start_span(
             f"{tracer_name_start}.generate_first"  # type: ignore
         )
-        responses = self.generate_response(
-            transcription.message,
-            is_interrupt=transcription.is_interrupt,
-            conversation_id=conversation_id,
-        )
+        speculative_response = None
+        if self.speculative_responder is not None and isinstance(
+            agent_input, TranscriptionAgentInput
+        ):
+            speculative_response = self.speculative_responder.take_speculative_response(
+                transcription
+            )
+        response_cache_lookup = None
+        if speculative_response is not None:
+            responses = speculative_response.get_responses()
+        else:
+            response_cache_lookup = await self.lookup_cached_response(
+                transcription, agent_input
+            )
+            if (
+                response_cache_lookup is not None
+                and response_cache_lookup.sentences is not None
+            ):
+                responses = self.get_cached_responses(response_cache_lookup.sentences)
+            else:
+                responses = self.generate_response(
+                    transcription.message,
+                    is_interrupt=transcription.is_interrupt,
+                    conversation_id=conversation_id,
+                )
         is_first_response = True
         function_call = None
+        sentences = []
         async for response, is_interruptible in responses:
             if isinstance(response, FunctionCall):
                 function_call = response
                 continue
+            sentences.append(response)
             if is_first_response:
                 agent_span_first.end()
                 is_first_response = False
@@ -232,25 +365,41 @@ class RespondAgent(BaseAgent[AgentConfigType]):
             )
         # TODO: implement should_stop for generate_responses
         agent_span.end()
+        if response_cache_lookup is not None and function_call is None:
+            response_cache_lookup.store(sentences)
         if function_call and self.agent_config.actions is not None:
             await self.call_function(function_call, agent_input)
         return False
 
     async def handle_respond(
-        self, transcription: Transcription, conversation_id: str
+        self,
+        transcription: Transcription,
+        conversation_id: str,
+        response_cache_lookup: Optional[ResponseCacheLookup] = None,
     ) -> bool:
-        try:
-            tracer_name_start = await self.get_tracer_name_start()
-            with tracer.start_as_current_span(f"{tracer_name_start}.respond_total"):
-                response, should_stop = await self.respond(
-                    transcription.message,
-                    is_interrupt=transcription.is_interrupt,
-                    conversation_id=conversation_id,
+        if (
+            response_cache_lookup is not None
+            and response_cache_lookup.sentences is not None
+        ):
+            response: Optional[str] = " ".join(response_cache_lookup.sentences)
+            should_stop = False
+        else:
+            try:
+                tracer_name_start = await self.get_tracer_name_start()
+                with tracer.start_as_current_span(f"{tracer_name_start}.respond_total"):
+                    response, should_stop = await self.respond(
+                        transcription.message,
+                        is_interrupt=transcription.is_interrupt,
+                        conversation_id=conversation_id,
+                    )
+            except Exception as e:
+                self.logger.error(
+                    f"Error while generating response: {e}", exc_info=True
                 )
-        except Exception as e:
-            self.logger.error(f"Error while generating response: {e}", exc_info=True)
-            response = None
-            return True
+                response = None
+                return True
+            if response_cache_lookup is not None and response and not should_stop:
+                response_cache_lookup.store([response])
         if response:
             self.produce_interruptible_agent_response_event_nonblocking(
                 AgentResponseMessage(message=BaseMessage(text=response)),
@@ -311,7 +460,11 @@ class RespondAgent(BaseAgent[AgentConfigType]):
                 )
             else:
                 should_stop = await self.handle_respond(
-                    transcription, agent_input.conversation_id
+                    transcription,
+                    agent_input.conversation_id,
+                    response_cache_lookup=await self.lookup_cached_response(
+                        transcription, agent_input
+                    ),
                 )
 
             if should_stop:
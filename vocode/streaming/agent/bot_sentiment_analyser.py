@@ -1,9 +1,14 @@
-from typing import List, Optional
+import asyncio
+import logging
+from collections import deque
+from typing import Callable, Deque, List, Optional
 from langchain.llms import OpenAI
 from langchain.prompts import PromptTemplate
 from pydantic import BaseModel
 
 from vocode import getenv
+from vocode.streaming.models.synthesizer import SentimentConfig
+from vocode.streaming.models.transcript import Message
 
 TEMPLATE = """
 Read the following conversation classify the final emotion of the Bot as one of [{emotions}].
@@ -56,3 +61,65 @@ class BotSentimentAnalyser:
         except ValueError:
             return BotSentiment(emotion=emotion, degree=0.5)
         return BotSentiment(emotion=emotion, degree=parsed_degree)
+
+
+class BotSentimentTracker:
+    """Analyses the bot's sentiment as messages are added to the transcript
+
+    The analysis runs once no message has been added for debounce_seconds, on the last
+    window_size messages only, which are rendered once when they are added. At most one
+    analysis is in flight, messages added during an analysis trigger one more afterwards.
+    """
+
+    def __init__(
+        self,
+        bot_sentiment_analyser: BotSentimentAnalyser,
+        sentiment_config: SentimentConfig,
+        on_bot_sentiment: Callable[[BotSentiment], None],
+        logger: Optional[logging.Logger] = None,
+    ):
+        self.bot_sentiment_analyser = bot_sentiment_analyser
+        self.sentiment_config = sentiment_config
+        self.on_bot_sentiment = on_bot_sentiment
+        self.logger = logger or logging.getLogger(__name__)
+        self.recent_lines: Deque[str] = deque(maxlen=sentiment_config.window_size)
+        self.debounce_task: Optional[asyncio.Task] = None
+        self.analysis_task: Optional[asyncio.Task] = None
+        self.has_unanalysed_messages = False
+
+    def start(self):
+        self.request_analysis()
+
+    def handle_message(self, message: Message):
+        self.recent_lines.append(message.to_string())
+        if self.debounce_task is not None:
+            self.debounce_task.cancel()
+        self.debounce_task = asyncio.create_task(self.request_analysis_after_debounce())
+
+    async def request_analysis_after_debounce(self):
+        await asyncio.sleep(self.sentiment_config.debounce_seconds)
+        self.debounce_task = None
+        self.request_analysis()
+
+    def request_analysis(self):
+        self.has_unanalysed_messages = True
+        if self.analysis_task is None or self.analysis_task.done():
+            self.analysis_task = asyncio.create_task(self.analyse())
+
+    async def analyse(self):
+        while self.has_unanalysed_messages:
+            self.has_unanalysed_messages = False
+            try:
+                bot_sentiment = await self.bot_sentiment_analyser.analyse(
+                    "\n".join(self.recent_lines)
+                )
+            except Exception as e:
+                self.logger.error(f"Error while analysing bot sentiment: {e}")
+                continue
+            if bot_sentiment.emotion:
+                self.on_bot_sentiment(bot_sentiment)
+
+    def terminate(self):
+        for task in (self.debounce_task, self.analysis_task):
+            if task is not None:
+                task.cancel()
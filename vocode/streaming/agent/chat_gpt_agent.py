@@ -1,16 +1,22 @@
+import asyncio
 import logging
 
 from typing import Any, Dict, List, Optional, Tuple, Union
 
-import openai
 from typing import AsyncGenerator, Optional, Tuple
 
 import logging
 from pydantic import BaseModel
 
-from vocode import getenv
 from vocode.streaming.action.factory import ActionFactory
 from vocode.streaming.agent.base_agent import RespondAgent
+from vocode.streaming.agent.context_window import ContextWindowManager
+from vocode.streaming.agent.first_response import (
+    await_first_response,
+    get_first_response_key,
+    precompute_first_response,
+)
+from vocode.streaming.agent.retrieval_cache import RetrievalCache
 from vocode.streaming.models.actions import FunctionCall, FunctionFragment
 from vocode.streaming.models.agent import ChatGPTAgentConfig
 from vocode.streaming.agent.utils import (
@@ -20,11 +26,20 @@ from vocode.streaming.agent.utils import (
     vector_db_result_to_openai_chat_message,
 )
 from vocode.streaming.models.events import Sender
-from vocode.streaming.models.transcript import Transcript
+from vocode.streaming.models.transcript import Message, Transcript
+from vocode.streaming.transcriber.base_transcriber import Transcription
+from vocode.streaming.utils.openai_client import (
+    OpenAIClient,
+    get_azure_openai_client,
+    get_default_openai_client,
+)
 from vocode.streaming.vector_db.factory import VectorDBFactory
 
 
 class ChatGPTAgent(RespondAgent[ChatGPTAgentConfig]):
+    supports_speculative_responses = True
+    supports_response_cache = True
+
     def __init__(
         self,
         agent_config: ChatGPTAgentConfig,
@@ -32,33 +47,48 @@ class ChatGPTAgent(RespondAgent[ChatGPTAgentConfig]):
         logger: Optional[logging.Logger] = None,
         openai_api_key: Optional[str] = None,
         vector_db_factory=VectorDBFactory(),
+        openai_client: Optional[OpenAIClient] = None,
     ):
         super().__init__(
             agent_config=agent_config, action_factory=action_factory, logger=logger
         )
-        if agent_config.azure_params:
-            openai.api_type = agent_config.azure_params.api_type
-            openai.api_base = getenv("AZURE_OPENAI_API_BASE")
-            openai.api_version = agent_config.azure_params.api_version
-            openai.api_key = getenv("AZURE_OPENAI_API_KEY")
+        if openai_client is not None:
+            self.openai_client = openai_client
+        elif agent_config.azure_params:
+            self.openai_client = get_azure_openai_client(
+                api_type=agent_config.azure_params.api_type,
+                api_version=agent_config.azure_params.api_version,
+            )
         else:
-            openai.api_type = "open_ai"
-            openai.api_base = "https://api.openai.com/v1"
-            openai.api_version = None
-            openai.api_key = openai_api_key or getenv("OPENAI_API_KEY")
-        if not openai.api_key:
-            raise ValueError("OPENAI_API_KEY must be set in environment or passed in")
-        self.first_response = (
-            self.create_first_response(agent_config.expected_first_prompt)
-            if agent_config.expected_first_prompt
-            else None
-        )
+            self.openai_client = get_default_openai_client(openai_api_key)
+        # generated in the background, so that constructing the agent doesn't block the loop
+        self.first_response_task: Optional[asyncio.Task[str]] = None
+        if agent_config.expected_first_prompt:
+            self.first_response_task = self.precompute_first_response(
+                agent_config.expected_first_prompt
+            )
         self.is_first_response = True
 
+        self.retrieval_cache: Optional[RetrievalCache] = None
         if self.agent_config.vector_db_config:
             self.vector_db = vector_db_factory.create_vector_db(
                 self.agent_config.vector_db_config
             )
+            if self.agent_config.retrieval_prefetch_config:
+                self.retrieval_cache = RetrievalCache(
+                    self.vector_db.similarity_search_with_score,
+                    self.agent_config.retrieval_prefetch_config,
+                    logger=self.logger,
+                )
+
+        self.context_window_manager: Optional[ContextWindowManager] = None
+        if self.agent_config.context_window_config:
+            self.context_window_manager = ContextWindowManager(
+                self.agent_config.context_window_config,
+                model_name=self.agent_config.model_name,
+                create_summary=self.create_summary,
+                logger=self.logger,
+            )
 
     def get_functions(self):
         assert self.agent_config.actions
@@ -69,13 +99,21 @@ class ChatGPTAgent(RespondAgent[ChatGPTAgentConfig]):
             for action_config in self.agent_config.actions
         ]
 
+    def get_chat_messages(self) -> List[dict]:
+        assert self.transcript is not None
+        if self.context_window_manager is None:
+            return format_openai_chat_messages_from_transcript(
+                self.transcript, self.agent_config.prompt_preamble
+            )
+        return self.context_window_manager.get_chat_messages(
+            self.transcript.get_openai_chat_messages(),
+            self.agent_config.prompt_preamble,
+        )
+
     def get_chat_parameters(
         self, messages: Optional[List] = None, use_functions: bool = True
     ):
-        assert self.transcript is not None
-        messages = messages or format_openai_chat_messages_from_transcript(
-            self.transcript, self.agent_config.prompt_preamble
-        )
+        messages = messages or self.get_chat_messages()
 
         parameters: Dict[str, Any] = {
             "messages": messages,
@@ -93,22 +131,67 @@ class ChatGPTAgent(RespondAgent[ChatGPTAgentConfig]):
 
         return parameters
 
-    def create_first_response(self, first_prompt):
-        messages = [
-            (
-                [{"role": "system", "content": self.agent_config.prompt_preamble}]
-                if self.agent_config.prompt_preamble
-                else []
+    def precompute_first_response(self, first_prompt: str) -> asyncio.Task[str]:
+        messages = (
+            [{"role": "system", "content": self.agent_config.prompt_preamble}]
+            if self.agent_config.prompt_preamble
+            else []
+        ) + [{"role": "user", "content": first_prompt}]
+        parameters = self.get_chat_parameters(messages)
+        shared_key = (
+            get_first_response_key(
+                api_base=self.openai_client.api_base, parameters=parameters
             )
-            + [{"role": "user", "content": first_prompt}]
-        ]
+            if self.agent_config.share_first_response
+            else None
+        )
+        return precompute_first_response(
+            lambda: self.create_first_response(parameters), shared_key=shared_key
+        )
 
-        parameters = self.get_chat_parameters(messages)
-        return openai.ChatCompletion.create(**parameters)
+    async def create_first_response(self, parameters: Dict[str, Any]) -> str:
+        chat_completion = await self.openai_client.create_chat_completion(**parameters)
+        return chat_completion.choices[0].message.content
+
+    def can_speculate(self) -> bool:
+        # a speculative first turn would use up the precomputed first response
+        return not self.is_first_response or self.first_response_task is None
+
+    async def get_first_response(self) -> Optional[str]:
+        if not self.is_first_response or self.first_response_task is None:
+            return None
+        self.is_first_response = False
+        return await await_first_response(self.first_response_task, self.logger)
 
     def attach_transcript(self, transcript: Transcript):
         self.transcript = transcript
 
+    def handle_interim_transcription(
+        self, transcription: Transcription, conversation_id: str
+    ):
+        super().handle_interim_transcription(transcription, conversation_id)
+        if self.retrieval_cache is not None:
+            # the same query that the final transcription will be looked up with
+            self.retrieval_cache.prefetch(
+                Message(sender=Sender.HUMAN, text=transcription.message).to_string()
+            )
+
+    async def retrieve_documents(self, query: str):
+        if self.retrieval_cache is not None:
+            return await self.retrieval_cache.get(query)
+        return await self.vector_db.similarity_search_with_score(query)
+
+    async def create_summary(self, messages: List[dict]) -> str:
+        assert self.agent_config.context_window_config is not None
+        chat_parameters = self.get_chat_parameters(messages, use_functions=False)
+        chat_parameters[
+            "max_tokens"
+        ] = self.agent_config.context_window_config.summary_max_tokens
+        chat_completion = await self.openai_client.create_chat_completion(
+            **chat_parameters
+        )
+        return chat_completion.choices[0].message.content
+
     async def respond(
         self,
         human_input,
@@ -120,13 +203,15 @@ class ChatGPTAgent(RespondAgent[ChatGPTAgentConfig]):
             cut_off_response = self.get_cut_off_response()
             return cut_off_response, False
         self.logger.debug("LLM responding to human input")
-        if self.is_first_response and self.first_response:
+        first_response = await self.get_first_response()
+        if first_response is not None:
             self.logger.debug("First response is cached")
-            self.is_first_response = False
-            text = self.first_response
+            text = first_response
         else:
             chat_parameters = self.get_chat_parameters()
-            chat_completion = await openai.ChatCompletion.acreate(**chat_parameters)
+            chat_completion = await self.openai_client.create_chat_completion(
+                **chat_parameters
+            )
             text = chat_completion.choices[0].message.content
         self.logger.debug(f"LLM response: {text}")
         return text, False
@@ -142,11 +227,16 @@ class ChatGPTAgent(RespondAgent[ChatGPTAgentConfig]):
             yield cut_off_response, False
             return
         assert self.transcript is not None
+        first_response = await self.get_first_response()
+        if first_response is not None:
+            self.logger.debug("First response is cached")
+            yield first_response, True
+            return
 
         chat_parameters = {}
         if self.agent_config.vector_db_config:
             try:
-                docs_with_scores = await self.vector_db.similarity_search_with_score(
+                docs_with_scores = await self.retrieve_documents(
                     self.transcript.get_last_user_message()[1]
                 )
                 docs_with_scores_str = "\n\n".join(
@@ -159,9 +249,7 @@ class ChatGPTAgent(RespondAgent[ChatGPTAgentConfig]):
                     ]
                 )
                 vector_db_result = f"Found {len(docs_with_scores)} similar documents:\n{docs_with_scores_str}"
-                messages = format_openai_chat_messages_from_transcript(
-                    self.transcript, self.agent_config.prompt_preamble
-                )
+                messages = self.get_chat_messages()
                 messages.insert(
                     -1, vector_db_result_to_openai_chat_message(vector_db_result)
                 )
@@ -172,8 +260,20 @@ class ChatGPTAgent(RespondAgent[ChatGPTAgentConfig]):
         else:
             chat_parameters = self.get_chat_parameters()
         chat_parameters["stream"] = True
-        stream = await openai.ChatCompletion.acreate(**chat_parameters)
+        stream = await self.openai_client.create_chat_completion(**chat_parameters)
         async for message in collate_response_async(
             openai_get_tokens(stream), get_functions=True
         ):
             yield message, True
+
+    def terminate(self):
+        if (
+            self.first_response_task is not None
+            and not self.agent_config.share_first_response
+        ):
+            self.first_response_task.cancel()
+        if self.context_window_manager is not None:
+            self.context_window_manager.terminate()
+        if self.retrieval_cache is not None:
+            self.retrieval_cache.terminate()
+        return super().terminate()
@@ -0,0 +1,226 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from opentelemetry import metrics
+
+from vocode.streaming.models.agent import ContextWindowConfig
+
+# tokens that every chat message adds on top of its content, and that prime the reply
+TOKENS_PER_CHAT_MESSAGE = 3
+TOKENS_PER_NAME = 1
+TOKENS_PER_REPLY = 3
+# used when tiktoken isn't installed
+APPROXIMATE_CHARACTERS_PER_TOKEN = 4
+
+SUMMARY_PROMPT = (
+    "Summarize the conversation below between a human and an AI assistant. Keep every"
+    " fact, request and commitment that later parts of the conversation may refer to."
+)
+
+meter = metrics.get_meter(__name__)
+prompt_tokens_histogram = meter.create_histogram(
+    name="agent.context_window.prompt_tokens",
+    unit="tokens",
+)
+truncations_counter = meter.create_counter(
+    name="agent.context_window.truncations",
+    unit="prompts",
+)
+
+logger = logging.getLogger(__name__)
+
+token_counters: Dict[str, Callable[[str], int]] = {}
+
+
+def get_token_counter(model_name: str) -> Callable[[str], int]:
+    """Returns a function that counts the tokens of a text for the given model"""
+    if model_name not in token_counters:
+        try:
+            import tiktoken
+
+            try:
+                encoding = tiktoken.encoding_for_model(model_name)
+            except KeyError:
+                encoding = tiktoken.get_encoding("cl100k_base")
+            token_counters[model_name] = lambda text: len(encoding.encode(text))
+        except ImportError:
+            logger.warning("tiktoken is not installed, approximating token counts")
+            token_counters[model_name] = (
+                lambda text: len(text) // APPROXIMATE_CHARACTERS_PER_TOKEN + 1
+            )
+    return token_counters[model_name]
+
+
+class ContextWindowManager:
+    """Keeps the prompt of a chat agent within a token budget
+
+    The system preamble is always sent, followed by the rolling summary if there is one, and
+    then as many of the most recent chat messages as fit. Token counts are cached per chat
+    message, and only the messages that are kept are looked at on each turn, so the cost of
+    a turn doesn't grow with the length of the conversation. If summarization is enabled,
+    the messages that fell out of the window are summarized in the background, and the
+    summary is used from the next turn on.
+    """
+
+    def __init__(
+        self,
+        context_window_config: ContextWindowConfig,
+        model_name: str,
+        create_summary: Optional[
+            Callable[[List[Dict[str, Any]]], Awaitable[str]]
+        ] = None,
+        count_tokens: Optional[Callable[[str], int]] = None,
+        logger: Optional[logging.Logger] = None,
+    ):
+        self.context_window_config = context_window_config
+        self.create_summary = create_summary
+        self.count_tokens = count_tokens or get_token_counter(model_name)
+        self.logger = logger or logging.getLogger(__name__)
+        # id of each chat message -> the message and its token count, the message is kept
+        # so that its id can't be reused
+        self.token_counts: Dict[int, Tuple[Dict[str, Any], int]] = {}
+        # reused across turns, so that their token counts stay cached
+        self.preamble_chat_message: Optional[Dict[str, Any]] = None
+        self.summary: Optional[str] = None
+        self.summary_chat_message: Optional[Dict[str, Any]] = None
+        # number of chat messages, from the start of the conversation, that the summary covers
+        self.num_summarized_messages = 0
+        self.summary_task: Optional[asyncio.Task] = None
+
+    def count_chat_message_tokens(self, chat_message: Dict[str, Any]) -> int:
+        cached = self.token_counts.get(id(chat_message))
+        if cached is not None and cached[0] is chat_message:
+            return cached[1]
+        num_tokens = TOKENS_PER_CHAT_MESSAGE
+        if chat_message.get("content"):
+            num_tokens += self.count_tokens(chat_message["content"])
+        if chat_message.get("name"):
+            num_tokens += TOKENS_PER_NAME + self.count_tokens(chat_message["name"])
+        function_call = chat_message.get("function_call")
+        if function_call:
+            num_tokens += self.count_tokens(function_call["name"])
+            num_tokens += self.count_tokens(function_call["arguments"])
+        self.token_counts[id(chat_message)] = (chat_message, num_tokens)
+        return num_tokens
+
+    def get_preamble_chat_message(
+        self, prompt_preamble: Optional[str]
+    ) -> Optional[Dict[str, Any]]:
+        if not prompt_preamble:
+            return None
+        if (
+            self.preamble_chat_message is None
+            or self.preamble_chat_message["content"] != prompt_preamble
+        ):
+            self.preamble_chat_message = {"role": "system", "content": prompt_preamble}
+        return self.preamble_chat_message
+
+    def get_chat_messages(
+        self,
+        chat_messages: List[Dict[str, Any]],
+        prompt_preamble: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        prefix = [
+            chat_message
+            for chat_message in (
+                self.get_preamble_chat_message(prompt_preamble),
+                self.summary_chat_message,
+            )
+            if chat_message is not None
+        ]
+        num_prompt_tokens = TOKENS_PER_REPLY + sum(
+            self.count_chat_message_tokens(chat_message) for chat_message in prefix
+        )
+
+        # walk back from the latest message, which is always sent
+        first_kept_index = len(chat_messages)
+        while first_kept_index > 0:
+            num_tokens = self.count_chat_message_tokens(
+                chat_messages[first_kept_index - 1]
+            )
+            if (
+                first_kept_index < len(chat_messages)
+                and num_prompt_tokens + num_tokens
+                > self.context_window_config.max_prompt_tokens
+            ):
+                break
+            num_prompt_tokens += num_tokens
+            first_kept_index -= 1
+        # a function result makes no sense without the call that it answers
+        while (
+            first_kept_index < len(chat_messages) - 1
+            and chat_messages[first_kept_index]["role"] == "function"
+        ):
+            num_prompt_tokens -= self.count_chat_message_tokens(
+                chat_messages[first_kept_index]
+            )
+            first_kept_index += 1
+        kept_chat_messages = chat_messages[first_kept_index:]
+
+        # forget the token counts of the messages that fell out of the window
+        kept_ids = set(map(id, prefix + kept_chat_messages))
+        for chat_message_id in list(self.token_counts):
+            if chat_message_id not in kept_ids:
+                del self.token_counts[chat_message_id]
+
+        prompt_tokens_histogram.record(num_prompt_tokens)
+        if first_kept_index > 0:
+            truncations_counter.add(1)
+            self.logger.debug(
+                f"Truncated {first_kept_index} chat messages to fit {num_prompt_tokens} prompt tokens"
+            )
+            if self.context_window_config.summarize_truncated_messages:
+                self.maybe_refresh_summary(chat_messages, first_kept_index)
+        return prefix + kept_chat_messages
+
+    def maybe_refresh_summary(
+        self, chat_messages: List[Dict[str, Any]], num_truncated_messages: int
+    ):
+        if (
+            self.create_summary is None
+            or num_truncated_messages <= self.num_summarized_messages
+            or (self.summary_task is not None and not self.summary_task.done())
+        ):
+            return
+        self.summary_task = asyncio.create_task(
+            self.refresh_summary(chat_messages, num_truncated_messages)
+        )
+
+    async def refresh_summary(
+        self, chat_messages: List[Dict[str, Any]], num_truncated_messages: int
+    ):
+        assert self.create_summary is not None
+        conversation_lines = (
+            [f"Summary of what came before: {self.summary}"] if self.summary else []
+        )
+        for chat_message in chat_messages[
+            self.num_summarized_messages : num_truncated_messages
+        ]:
+            if chat_message.get("function_call"):
+                conversation_lines.append(
+                    f"assistant called {chat_message['function_call']['name']}"
+                    f" with {chat_message['function_call']['arguments']}"
+                )
+            elif chat_message.get("content"):
+                conversation_lines.append(
+                    f"{chat_message['role']}: {chat_message['content']}"
+                )
+        try:
+            self.summary = await self.create_summary(
+                [
+                    {"role": "system", "content": SUMMARY_PROMPT},
+                    {"role": "user", "content": "\n".join(conversation_lines)},
+                ]
+            )
+            self.summary_chat_message = {
+                "role": "system",
+                "content": f"Summary of the earlier conversation: {self.summary}",
+            }
+            self.num_summarized_messages = num_truncated_messages
+        except Exception as e:
+            self.logger.error(f"Error while summarizing: {e}", exc_info=True)
+
+    def terminate(self):
+        if self.summary_task is not None:
+            self.summary_task.cancel()
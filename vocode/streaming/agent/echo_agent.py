@@ -4,6 +4,9 @@ from vocode.streaming.models.agent import EchoAgentConfig
 
 
 class EchoAgent(RespondAgent[EchoAgentConfig]):
+    supports_speculative_responses = True
+    supports_response_cache = True
+
     async def respond(
         self,
         human_input,
@@ -0,0 +1,52 @@
+import asyncio
+import hashlib
+import json
+import logging
+from typing import Any, Callable, Coroutine, Dict, Optional
+
+# shared first responses, by prompt and generation parameters, for the lifetime of the process
+first_response_tasks: Dict[str, "asyncio.Task[str]"] = {}
+
+
+def get_first_response_key(**params: Any) -> str:
+    return hashlib.sha256(
+        json.dumps(params, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+def precompute_first_response(
+    create_first_response: Callable[[], Coroutine[Any, Any, str]],
+    shared_key: Optional[str] = None,
+) -> "asyncio.Task[str]":
+    """Starts generating the response to an agent's expected first prompt in the background
+
+    If a shared_key is passed, agents with the same key get the same task, so the response is
+    only generated once per process. A shared task that failed is retried by the next agent.
+    """
+    if shared_key is None:
+        return asyncio.create_task(create_first_response())
+    task = first_response_tasks.get(shared_key)
+    if (
+        task is None
+        or task.get_loop() is not asyncio.get_running_loop()
+        or (task.done() and (task.cancelled() or task.exception() is not None))
+    ):
+        task = asyncio.create_task(create_first_response())
+        first_response_tasks[shared_key] = task
+    return task
+
+
+async def await_first_response(
+    task: "asyncio.Task[str]", logger: logging.Logger
+) -> Optional[str]:
+    """Returns the precomputed first response, or None if it couldn't be generated"""
+    try:
+        # the task may be shared, so it must not be cancelled along with this turn
+        return await asyncio.shield(task)
+    except asyncio.CancelledError:
+        if task.cancelled():
+            return None
+        raise
+    except Exception as e:
+        logger.error(f"Error while precomputing the first response: {e}")
+        return None
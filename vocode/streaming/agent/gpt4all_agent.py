@@ -1,5 +1,11 @@
-from typing import Optional, Tuple
+from typing import AsyncGenerator, List, Optional, Tuple
 from vocode.streaming.agent.base_agent import BaseAgent, RespondAgent
+from vocode.streaming.agent.local_inference_server import (
+    GPT4AllModel,
+    LocalInferenceServer,
+    get_local_inference_server,
+)
+from vocode.streaming.agent.utils import collate_response_async
 from vocode.streaming.models.agent import GPT4AllAgentConfig
 from vocode.turn_based.agent.gpt4all_agent import GPT4AllAgent as TurnBasedGPT4AllAgent
 
@@ -7,6 +13,22 @@ from vocode.turn_based.agent.gpt4all_agent import GPT4AllAgent as TurnBasedGPT4A
 class GPT4AllAgent(RespondAgent[GPT4AllAgentConfig]):
     def __init__(self, agent_config: GPT4AllAgentConfig):
         super().__init__(agent_config=agent_config)
+        self.local_inference_server: Optional[LocalInferenceServer] = None
+        if agent_config.local_inference_server_config:
+            self.local_inference_server = get_local_inference_server(
+                lambda: GPT4AllModel(agent_config.model_path),
+                gpt4all_model_path=agent_config.model_path,
+            )
+            self.prompt_template = (
+                f"{agent_config.prompt_preamble}\n\n"
+                + TurnBasedGPT4AllAgent.DEFAULT_PROMPT_TEMPLATE
+            )
+            self.memory: List[str] = (
+                [f"AI: {agent_config.initial_message.text}"]
+                if agent_config.initial_message
+                else []
+            )
+            return
         self.turn_based_agent = TurnBasedGPT4AllAgent(
             model_path=agent_config.model_path,
             system_prompt=agent_config.prompt_preamble,
@@ -21,4 +43,44 @@ class GPT4AllAgent(RespondAgent[GPT4AllAgentConfig]):
         conversation_id: str,
         is_interrupt: bool = False,
     ) -> Tuple[Optional[str], bool]:
+        if self.local_inference_server is not None:
+            tokens = [
+                token async for token in self.local_inference_get_tokens(human_input)
+            ]
+            return "".join(tokens).strip(), False
         return (await self.turn_based_agent.respond_async(human_input)), False
+
+    async def local_inference_get_tokens(self, human_input: str):
+        assert self.local_inference_server is not None
+        # the same prompt and memory as the turn based agent
+        prompt = self.prompt_template.format(
+            history="\n".join(self.memory[-5:]), human_input=human_input
+        )
+        response = ""
+        try:
+            async for token in self.local_inference_server.generate(
+                prompt, stop=["Human:"]
+            ):
+                response += token
+                yield token
+        finally:
+            self.memory.append(f"Human: {human_input}\nAI: {response.strip()}")
+
+    async def generate_response(
+        self,
+        human_input: str,
+        conversation_id: str,
+        is_interrupt: bool = False,
+    ) -> AsyncGenerator[Tuple[str, bool], None]:
+        if self.local_inference_server is None:
+            raise NotImplementedError(
+                "Streaming GPT4All responses requires local_inference_server_config"
+            )
+        async for message in collate_response_async(
+            self.local_inference_get_tokens(human_input)
+        ):
+            yield str(message), True
+
+    def update_last_bot_message_on_cut_off(self, message: str):
+        if self.local_inference_server is not None and self.memory:
+            self.memory[-1] = self.memory[-1].split("\nAI: ", 1)[0] + f"\nAI: {message}"
@@ -1,10 +1,23 @@
 from concurrent.futures import ThreadPoolExecutor
 import asyncio
 import logging
-from typing import AsyncGenerator, Optional, Tuple, Any, Union
+import threading
+from typing import AsyncGenerator, List, Optional, Tuple, Any, Union
 import typing
 from langchain import ConversationChain
 from vocode.streaming.agent.base_agent import RespondAgent
+from vocode.streaming.agent.llamacpp_session import (
+    LlamacppSession,
+    create_llamacpp_session,
+    get_incremental_prompt_format,
+    get_recent_turns,
+    split_llamacpp_kwargs,
+)
+from vocode.streaming.agent.local_inference_server import (
+    LlamacppBatchModel,
+    LocalInferenceServer,
+    get_local_inference_server,
+)
 from vocode.streaming.models.agent import LlamacppAgentConfig
 from vocode.streaming.agent.utils import collate_response_async
 from langchain.callbacks.base import BaseCallbackHandler
@@ -68,6 +81,44 @@ class LlamacppAgent(RespondAgent[LlamacppAgentConfig]):
         logger: Optional[logging.Logger] = None,
     ):
         super().__init__(agent_config=agent_config, logger=logger)
+        self.thread_pool_executor = ThreadPoolExecutor(max_workers=1)
+
+        if agent_config.reuse_kv_cache and agent_config.local_inference_server_config:
+            raise ValueError(
+                "reuse_kv_cache can't be used with local_inference_server_config"
+            )
+        self.session: Optional[LlamacppSession] = None
+        self.local_inference_server: Optional[LocalInferenceServer] = None
+        if agent_config.reuse_kv_cache:
+            self.session = create_llamacpp_session(
+                agent_config.prompt_preamble,
+                agent_config.prompt_template,
+                agent_config.llamacpp_kwargs,
+            )
+            return
+
+        if agent_config.local_inference_server_config:
+            self.prompt_format = get_incremental_prompt_format(
+                agent_config.prompt_template
+            )
+            _, self.max_tokens, stop, _ = split_llamacpp_kwargs(
+                agent_config.llamacpp_kwargs
+            )
+            self.stop = [self.prompt_format.stop] + (stop or [])
+            self.system_text = self.prompt_format.system.format(
+                preamble=agent_config.prompt_preamble
+            )
+            # each turn's human text and response, the prompt is rebuilt from them
+            self.turns: List[Tuple[str, str]] = []
+            max_batch_size = agent_config.local_inference_server_config.max_batch_size
+            self.local_inference_server = get_local_inference_server(
+                lambda: LlamacppBatchModel(
+                    agent_config.llamacpp_kwargs, max_batch_size=max_batch_size
+                ),
+                llamacpp_kwargs=agent_config.llamacpp_kwargs,
+                max_batch_size=max_batch_size,
+            )
+            return
 
         self.prompt: Union[PromptTemplate, ChatPromptTemplate]
         if type(agent_config.prompt_template) is str:
@@ -106,7 +157,6 @@ class LlamacppAgent(RespondAgent[LlamacppAgentConfig]):
         self.conversation = ConversationChain(
             memory=self.memory, prompt=self.prompt, llm=self.llm
         )
-        self.thread_pool_executor = ThreadPoolExecutor(max_workers=1)
 
     async def respond(
         self,
@@ -114,11 +164,23 @@ class LlamacppAgent(RespondAgent[LlamacppAgentConfig]):
         conversation_id: str,
         is_interrupt: bool = False,
     ) -> Tuple[str, bool]:
-        text = await asyncio.get_event_loop().run_in_executor(
-            self.thread_pool_executor,
-            lambda input: self.conversation.predict(input=input),
-            human_input,
-        )
+        if self.session is not None:
+            session = self.session
+            text = await asyncio.get_event_loop().run_in_executor(
+                self.thread_pool_executor,
+                lambda input: "".join(session.generate(input)),
+                human_input,
+            )
+        elif self.local_inference_server is not None:
+            text = "".join(
+                [token async for token in self.local_inference_get_tokens(human_input)]
+            )
+        else:
+            text = await asyncio.get_event_loop().run_in_executor(
+                self.thread_pool_executor,
+                lambda input: self.conversation.predict(input=input),
+                human_input,
+            )
 
         self.logger.debug(f"LLM response: {text}")
         return text, False
@@ -130,12 +192,84 @@ class LlamacppAgent(RespondAgent[LlamacppAgentConfig]):
                 break
             yield callback_output.token
 
+    async def session_get_tokens(self, session: LlamacppSession, human_input: str):
+        loop = asyncio.get_running_loop()
+        token_queue: asyncio.Queue = asyncio.Queue()
+        # set when the response is cancelled, so the worker thread stops sampling
+        stop_event = threading.Event()
+
+        def generate():
+            try:
+                for token in session.generate(human_input, stop_event.is_set):
+                    loop.call_soon_threadsafe(token_queue.put_nowait, token)
+            finally:
+                loop.call_soon_threadsafe(token_queue.put_nowait, None)
+
+        generation = loop.run_in_executor(self.thread_pool_executor, generate)
+        try:
+            while True:
+                token = await token_queue.get()
+                if token is None:
+                    break
+                yield token
+            await generation
+        finally:
+            stop_event.set()
+
+    def get_local_inference_prompt(self, human_text: str) -> str:
+        """The preamble, as many recent turns as fit in the model's prompt, and the human text"""
+        assert self.local_inference_server is not None
+        model = self.local_inference_server.model
+        turn_texts = [
+            turn_human_text + turn_response + self.prompt_format.response_end
+            for turn_human_text, turn_response in self.turns
+        ]
+        if model.max_prompt_tokens is not None:
+            # one more token for the start of the sequence
+            budget = (
+                model.max_prompt_tokens
+                - model.count_tokens(self.system_text + human_text)
+                - 1
+            )
+            turn_texts = get_recent_turns(turn_texts, budget, model.count_tokens)
+            # older turns won't fit again, so they are dropped for good
+            self.turns = self.turns[len(self.turns) - len(turn_texts) :]
+        return self.system_text + "".join(turn_texts) + human_text
+
+    async def local_inference_get_tokens(self, human_input: str):
+        assert self.local_inference_server is not None
+        human_text = self.prompt_format.human.format(input=human_input)
+        response = ""
+        try:
+            async for token in self.local_inference_server.generate(
+                self.get_local_inference_prompt(human_text),
+                max_tokens=self.max_tokens,
+                stop=self.stop,
+            ):
+                response += token
+                yield token
+        finally:
+            self.turns.append((human_text, response))
+
     async def generate_response(
         self,
         human_input: str,
         conversation_id: str,
         is_interrupt: bool = False,
     ) -> AsyncGenerator[Tuple[str, bool], None]:
+        if self.session is not None:
+            async for message in collate_response_async(
+                self.session_get_tokens(self.session, human_input),
+            ):
+                yield str(message), True
+            return
+        if self.local_inference_server is not None:
+            async for message in collate_response_async(
+                self.local_inference_get_tokens(human_input),
+            ):
+                yield str(message), True
+            return
+
         asyncio.get_event_loop().run_in_executor(
             self.thread_pool_executor,
             lambda input: self.conversation.predict(input=input),
@@ -146,3 +280,10 @@ class LlamacppAgent(RespondAgent[LlamacppAgentConfig]):
             self.llamacpp_get_tokens(),
         ):
             yield str(message), True
+
+    def update_last_bot_message_on_cut_off(self, message: str):
+        if self.session is not None:
+            # queued behind any generation that is still stopping in the worker thread
+            self.thread_pool_executor.submit(self.session.cut_off_response, message)
+        elif self.local_inference_server is not None and self.turns:
+            self.turns[-1] = (self.turns[-1][0], message)
@@ -0,0 +1,260 @@
+import codecs
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+if TYPE_CHECKING:
+    from llama_cpp import Llama
+
+# LlamaCpp kwargs that are used for sampling, by their name in llama_cpp.Llama.sample
+LLAMACPP_SAMPLING_KWARGS = {
+    "temperature": "temp",
+    "top_p": "top_p",
+    "top_k": "top_k",
+    "repeat_penalty": "repeat_penalty",
+}
+# LlamaCpp kwargs that only apply to langchain's completion calls
+LLAMACPP_IGNORED_KWARGS = {"streaming", "suffix", "logprobs", "echo"}
+LLAMACPP_DEFAULT_MAX_TOKENS = 256
+# when the context is full, it is rebuilt from the recent turns that fit in this fraction of it
+LLAMACPP_REBUILT_CONTEXT_FRACTION = 0.5
+
+
+class IncrementalPromptFormat(BaseModel):
+    """A prompt that only ever grows at the end, so each turn can be appended to the context"""
+
+    system: str
+    human: str
+    # appended after each response, before the next human turn
+    response_end: str
+    stop: str
+
+
+INCREMENTAL_PROMPT_FORMATS: Dict[Optional[str], IncrementalPromptFormat] = {
+    # the same roles as langchain's get_buffer_string, which the default chat prompt renders to
+    None: IncrementalPromptFormat(
+        system="System: {preamble}\n",
+        human="Human: {input}\nAI:",
+        response_end="\n",
+        stop="\nHuman:",
+    ),
+    "alpaca": IncrementalPromptFormat(
+        system="{preamble}\n\n",
+        human="### Instruction:\n{input}\n\n### Response:\n",
+        response_end="\n\n",
+        stop="### Instruction",
+    ),
+}
+
+
+def get_unstoppable_length(text: str, stop: str) -> int:
+    """Length of the prefix of text that can't become part of the stop sequence"""
+    for suffix_length in range(min(len(stop) - 1, len(text)), 0, -1):
+        if stop.startswith(text[-suffix_length:]):
+            return len(text) - suffix_length
+    return len(text)
+
+
+def get_recent_turns(
+    turns: List[str], budget: int, count_tokens: Callable[[str], int]
+) -> List[str]:
+    """The most recent turns whose tokens add up to at most the budget"""
+    recent_turns: List[str] = []
+    for turn in reversed(turns):
+        budget -= count_tokens(turn)
+        if budget < 0:
+            break
+        recent_turns.insert(0, turn)
+    return recent_turns
+
+
+class LlamacppSession:
+    """One conversation's llama.cpp context, kept evaluated across turns
+
+    The tokens of the conversation so far stay in the model's KV cache, so a turn only
+    evaluates the tokens of the new human message instead of the whole history. Before each
+    response the position in the context is checkpointed, and when the response is cut off the
+    context is restored to the checkpoint and only the part that was spoken is evaluated.
+    """
+
+    def __init__(
+        self,
+        llama: "Llama",
+        prompt_format: IncrementalPromptFormat,
+        prompt_preamble: str,
+        max_tokens: int = LLAMACPP_DEFAULT_MAX_TOKENS,
+        stop: Optional[List[str]] = None,
+        sampling_kwargs: Optional[Dict[str, Any]] = None,
+    ):
+        self.llama = llama
+        self.prompt_format = prompt_format
+        self.max_tokens = max_tokens
+        self.stop = [prompt_format.stop] + (stop or [])
+        self.sampling_kwargs = sampling_kwargs or {}
+        self.system_text = prompt_format.system.format(preamble=prompt_preamble)
+        # the tokens in the KV cache, in order, the model's n_tokens is kept equal to its length
+        self.tokens: List[int] = []
+        # the text of each finished turn, to rebuild the context once it is full
+        self.turns: List[str] = []
+        # text that is evaluated along with the next human message
+        self.pending_text = self.system_text
+        self.response_checkpoint: Optional[int] = None
+        self.response_turn = ""
+        self.prompt_eval_seconds = 0.0
+
+    def checkpoint(self) -> int:
+        return len(self.tokens)
+
+    def restore(self, checkpoint: int):
+        # llama.cpp overwrites the cached positions past n_tokens on the next eval
+        del self.tokens[checkpoint:]
+        self.llama.n_tokens = checkpoint
+
+    def tokenize(self, text: str) -> List[int]:
+        return self.llama.tokenize(text.encode("utf-8"), add_bos=not self.tokens)
+
+    def evaluate_turn(self, human_text: str):
+        tokens = self.tokenize(self.pending_text + human_text)
+        if len(self.tokens) + len(tokens) + self.max_tokens > self.llama.n_ctx():
+            # the rebuilt context already ends with the pending text
+            self.rebuild_context()
+            tokens = self.tokenize(human_text)
+        self.llama.eval(tokens)
+        self.tokens += tokens
+        self.pending_text = ""
+
+    def rebuild_context(self):
+        """Starts the context over with the preamble and as many recent turns as fit"""
+        budget = int(self.llama.n_ctx() * LLAMACPP_REBUILT_CONTEXT_FRACTION)
+        budget -= len(self.llama.tokenize(self.system_text.encode("utf-8")))
+        recent_turns = get_recent_turns(
+            self.turns,
+            budget,
+            lambda turn: len(self.llama.tokenize(turn.encode("utf-8"), add_bos=False)),
+        )
+        self.turns = recent_turns
+        self.restore(0)
+        tokens = self.tokenize(self.system_text + "".join(recent_turns))
+        self.llama.eval(tokens)
+        self.tokens = tokens
+
+    def generate(
+        self, human_input: str, should_stop: Callable[[], bool] = lambda: False
+    ) -> Iterator[str]:
+        """Evaluates the human message and yields the response as it is sampled
+
+        Blocks on the model, so it is meant to run in a worker thread.
+        """
+        human_text = self.prompt_format.human.format(input=human_input)
+        start_time = time.time()
+        self.evaluate_turn(human_text)
+        self.prompt_eval_seconds = time.time() - start_time
+        self.response_checkpoint = self.checkpoint()
+        self.response_turn = human_text
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+        response = ""
+        num_sent = 0
+        is_stopped = False
+        for _ in range(self.max_tokens):
+            if should_stop():
+                break
+            token = self.llama.sample(**self.sampling_kwargs)
+            if token == self.llama.token_eos():
+                break
+            self.llama.eval([token])
+            self.tokens.append(token)
+            response += decoder.decode(self.llama.detokenize([token]))
+            stop_indexes = [response.find(stop) for stop in self.stop]
+            stop_index = min(
+                (index for index in stop_indexes if index >= 0), default=-1
+            )
+            if stop_index >= 0:
+                response = response[:stop_index]
+                is_stopped = True
+                break
+            sendable_length = min(
+                get_unstoppable_length(response, stop) for stop in self.stop
+            )
+            if sendable_length > num_sent:
+                yield response[num_sent:sendable_length]
+                num_sent = sendable_length
+        # the evaluated tokens run past the response if it hit a stop sequence or was cancelled
+        self.finish_response(response, is_evaluated=not (is_stopped or should_stop()))
+        if len(response) > num_sent:
+            yield response[num_sent:]
+
+    def finish_response(self, response: str, is_evaluated: bool):
+        self.turns.append(
+            self.response_turn + response + self.prompt_format.response_end
+        )
+        if is_evaluated:
+            self.pending_text = self.prompt_format.response_end
+        else:
+            self.replace_response(response)
+
+    def replace_response(self, response: str):
+        """Restores the context to before the response, which is evaluated with the next turn"""
+        assert self.response_checkpoint is not None
+        self.restore(self.response_checkpoint)
+        self.pending_text = response + self.prompt_format.response_end
+
+    def cut_off_response(self, message: str):
+        """Keeps only the part of the last response that was spoken before the human cut it off"""
+        if self.response_checkpoint is None or not self.turns:
+            return
+        self.turns[-1] = self.response_turn + message + self.prompt_format.response_end
+        self.replace_response(message)
+
+
+def get_incremental_prompt_format(prompt_template: Any) -> IncrementalPromptFormat:
+    # custom prompt templates may render the history anywhere, so they can't be appended to
+    if (
+        not (prompt_template is None or isinstance(prompt_template, str))
+        or prompt_template not in INCREMENTAL_PROMPT_FORMATS
+    ):
+        raise ValueError(
+            f"Prompt template {prompt_template} can't be used incrementally, use the default or alpaca"
+        )
+    return INCREMENTAL_PROMPT_FORMATS[prompt_template]
+
+
+def split_llamacpp_kwargs(
+    llamacpp_kwargs: Dict[str, Any]
+) -> Tuple[Dict[str, Any], int, Optional[List[str]], Dict[str, Any]]:
+    """Splits langchain LlamaCpp kwargs into Llama kwargs, max_tokens, stop and sampling kwargs"""
+    llama_kwargs = {
+        key: value
+        for key, value in llamacpp_kwargs.items()
+        if key not in LLAMACPP_IGNORED_KWARGS
+    }
+    max_tokens = llama_kwargs.pop("max_tokens", None) or LLAMACPP_DEFAULT_MAX_TOKENS
+    stop = llama_kwargs.pop("stop", None)
+    sampling_kwargs = {
+        sampling_key: llama_kwargs.pop(key)
+        for key, sampling_key in LLAMACPP_SAMPLING_KWARGS.items()
+        if key in llama_kwargs
+    }
+    return llama_kwargs, max_tokens, stop, sampling_kwargs
+
+
+def create_llamacpp_session(
+    prompt_preamble: str,
+    prompt_template: Any,
+    llamacpp_kwargs: Dict[str, Any],
+) -> LlamacppSession:
+    """Loads the model from langchain LlamaCpp kwargs into a session for one conversation"""
+    prompt_format = get_incremental_prompt_format(prompt_template)
+    from llama_cpp import Llama
+
+    llama_kwargs, max_tokens, stop, sampling_kwargs = split_llamacpp_kwargs(
+        llamacpp_kwargs
+    )
+    return LlamacppSession(
+        Llama(**llama_kwargs),
+        prompt_format,
+        prompt_preamble,
+        max_tokens=max_tokens,
+        stop=stop,
+        sampling_kwargs=sampling_kwargs,
+    )
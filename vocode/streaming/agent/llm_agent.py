@@ -1,3 +1,4 @@
+import asyncio
 import re
 from typing import AsyncGenerator, Optional, Tuple
 
@@ -5,12 +6,20 @@ from langchain import OpenAI
 from typing import Generator
 import logging
 
-import openai
 from vocode import getenv
 
 from vocode.streaming.agent.base_agent import BaseAgent, RespondAgent
+from vocode.streaming.agent.first_response import (
+    await_first_response,
+    get_first_response_key,
+    precompute_first_response,
+)
 from vocode.streaming.agent.utils import collate_response_async, openai_get_tokens
 from vocode.streaming.models.agent import LLMAgentConfig
+from vocode.streaming.utils.openai_client import (
+    OpenAIClient,
+    get_default_openai_client,
+)
 
 
 class LLMAgent(RespondAgent[LLMAgentConfig]):
@@ -25,6 +34,7 @@ class LLMAgent(RespondAgent[LLMAgentConfig]):
         sender="AI",
         recipient="Human",
         openai_api_key: Optional[str] = None,
+        openai_client: Optional[OpenAIClient] = None,
     ):
         super().__init__(agent_config)
         self.prompt_template = (
@@ -44,6 +54,7 @@ class LLMAgent(RespondAgent[LLMAgentConfig]):
         openai_api_key = openai_api_key or getenv("OPENAI_API_KEY")
         if not openai_api_key:
             raise ValueError("OPENAI_API_KEY must be set in environment or passed in")
+        self.openai_client = openai_client or get_default_openai_client(openai_api_key)
         self.llm = OpenAI(  # type: ignore
             model_name=self.agent_config.model_name,
             temperature=self.agent_config.temperature,
@@ -51,18 +62,39 @@ class LLMAgent(RespondAgent[LLMAgentConfig]):
             openai_api_key=openai_api_key,
         )
         self.stop_tokens = [f"{recipient}:"]
-        self.first_response = (
-            self.llm(
-                self.prompt_template.format(
-                    history="", human_input=agent_config.expected_first_prompt
-                ),
-                stop=self.stop_tokens,
-            ).strip()
-            if agent_config.expected_first_prompt
-            else None
-        )
+        # generated in the background, so that constructing the agent doesn't block the loop
+        self.first_response_task: Optional[asyncio.Task[str]] = None
+        if agent_config.expected_first_prompt:
+            prompt = self.prompt_template.format(
+                history="", human_input=agent_config.expected_first_prompt
+            )
+            self.first_response_task = precompute_first_response(
+                lambda: self.create_first_response(prompt),
+                shared_key=get_first_response_key(
+                    prompt=prompt,
+                    model_name=self.agent_config.model_name,
+                    temperature=self.agent_config.temperature,
+                    max_tokens=self.agent_config.max_tokens,
+                    stop=self.stop_tokens,
+                )
+                if agent_config.share_first_response
+                else None,
+            )
         self.is_first_response = True
 
+    async def create_first_response(self, prompt: str) -> str:
+        return (
+            (await self.llm.agenerate([prompt], stop=self.stop_tokens))
+            .generations[0][0]
+            .text.strip()
+        )
+
+    async def get_first_response(self) -> Optional[str]:
+        if not self.is_first_response or self.first_response_task is None:
+            return None
+        self.is_first_response = False
+        return await await_first_response(self.first_response_task, self.logger)
+
     def create_prompt(self, human_input):
         history = "\n".join(self.memory[-5:])
         return self.prompt_template.format(history=history, human_input=human_input)
@@ -81,10 +113,10 @@ class LLMAgent(RespondAgent[LLMAgentConfig]):
             self.memory.append(self.get_memory_entry(human_input, cut_off_response))
             return cut_off_response, False
         self.logger.debug("LLM responding to human input")
-        if self.is_first_response and self.first_response:
+        first_response = await self.get_first_response()
+        if first_response is not None:
             self.logger.debug("First response is cached")
-            self.is_first_response = False
-            response = self.first_response
+            response = first_response
         else:
             response = (
                 (
@@ -101,7 +133,7 @@ class LLMAgent(RespondAgent[LLMAgentConfig]):
         return response, False
 
     async def _stream_sentences(self, prompt):
-        stream = await openai.Completion.acreate(
+        stream = await self.openai_client.create_completion(
             prompt=prompt,
             max_tokens=self.agent_config.max_tokens,
             temperature=self.agent_config.temperature,
@@ -131,10 +163,10 @@ class LLMAgent(RespondAgent[LLMAgentConfig]):
             yield cut_off_response, False
             return
         self.memory.append(self.get_memory_entry(human_input, ""))
-        if self.is_first_response and self.first_response:
+        first_response = await self.get_first_response()
+        if first_response is not None:
             self.logger.debug("First response is cached")
-            self.is_first_response = False
-            sentences = self._agen_from_list([self.first_response])
+            sentences = self._agen_from_list([first_response])
         else:
             self.logger.debug("Creating LLM prompt")
             prompt = self.create_prompt(human_input)
@@ -154,3 +186,11 @@ class LLMAgent(RespondAgent[LLMAgentConfig]):
             last_message.split("\n", 1)[0] + f"\n{self.sender}: {message}"
         )
         self.memory[-1] = new_last_message
+
+    def terminate(self):
+        if (
+            self.first_response_task is not None
+            and not self.agent_config.share_first_response
+        ):
+            self.first_response_task.cancel()
+        return super().terminate()
@@ -0,0 +1,482 @@
+import asyncio
+import codecs
+import json
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import (
+    Any,
+    AsyncGenerator,
+    Callable,
+    Deque,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+
+import numpy as np
+from opentelemetry import metrics
+
+from vocode.streaming.agent.llamacpp_session import (
+    LLAMACPP_REBUILT_CONTEXT_FRACTION,
+    get_unstoppable_length,
+    split_llamacpp_kwargs,
+)
+
+LOCAL_INFERENCE_DEFAULT_MAX_TOKENS = 256
+# recent tokens of a sequence that repeat_penalty applies to
+REPEAT_PENALTY_LAST_N_TOKENS = 64
+
+logger = logging.getLogger(__name__)
+
+meter = metrics.get_meter(__name__)
+local_inference_batch_size_histogram = meter.create_histogram(
+    name="agent.local_inference.batch_size",
+    unit="sequences",
+)
+local_inference_queue_size_histogram = meter.create_histogram(
+    name="agent.local_inference.queue_size",
+    unit="requests",
+)
+
+
+def sample_token(
+    logits: np.ndarray,
+    recent_tokens: List[int],
+    temp: float = 0.8,
+    top_k: int = 40,
+    top_p: float = 0.95,
+    repeat_penalty: float = 1.1,
+    rng: Optional[np.random.Generator] = None,
+) -> int:
+    """Samples like llama.cpp's default sampler, from the logits of one sequence"""
+    logits = logits.astype(np.float64)
+    if repeat_penalty != 1 and recent_tokens:
+        recent = np.unique(recent_tokens[-REPEAT_PENALTY_LAST_N_TOKENS:])
+        logits[recent] = np.where(
+            logits[recent] > 0,
+            logits[recent] / repeat_penalty,
+            logits[recent] * repeat_penalty,
+        )
+    if temp <= 0:
+        return int(np.argmax(logits))
+    candidates = (
+        np.argpartition(logits, -top_k)[-top_k:]
+        if 0 < top_k < len(logits)
+        else np.arange(len(logits))
+    )
+    candidate_logits = logits[candidates] / temp
+    probabilities = np.exp(candidate_logits - np.max(candidate_logits))
+    probabilities /= probabilities.sum()
+    order = np.argsort(-probabilities)
+    # the smallest set of most likely tokens whose probabilities add up to top_p
+    num_kept = int(np.searchsorted(np.cumsum(probabilities[order]), top_p)) + 1
+    kept = order[:num_kept]
+    kept_probabilities = probabilities[kept] / probabilities[kept].sum()
+    return int(
+        (rng or np.random.default_rng()).choice(candidates[kept], p=kept_probabilities)
+    )
+
+
+class LocalModel:
+    """A model that decodes several sequences at once, called from one worker thread only
+
+    Sequences are identified by their slot, from 0 to max_batch_size - 1.
+    """
+
+    max_batch_size: int = 1
+    # the most tokens that a prompt can have, None if there is no limit
+    max_prompt_tokens: Optional[int] = None
+
+    def count_tokens(self, text: str) -> int:
+        """Number of tokens in the text, without the ones that start a sequence"""
+        raise NotImplementedError
+
+    def add_sequence(self, sequence_id: int, prompt: str):
+        """Evaluates the prompt of a new sequence, raises ValueError if the prompt is too long"""
+        raise NotImplementedError
+
+    def decode(self, sequence_ids: List[int]) -> List[Optional[bytes]]:
+        """Samples and evaluates the next token of every sequence in one batch
+
+        Returns the bytes of each token, or None for sequences that have ended.
+        """
+        raise NotImplementedError
+
+    def remove_sequence(self, sequence_id: int):
+        """Also called for sequences that add_sequence failed on, to clear what they evaluated"""
+        raise NotImplementedError
+
+
+class LlamacppBatchModel(LocalModel):
+    """One llama.cpp context whose KV cache holds a sequence per concurrent generation
+
+    Each decode step evaluates the next token of every sequence in a single llama_decode call,
+    so concurrent conversations share the weights and the cost of reading them from memory.
+    """
+
+    max_prompt_tokens: int
+
+    def __init__(self, llamacpp_kwargs: Dict[str, Any], max_batch_size: int):
+        import llama_cpp
+
+        self.llama_cpp = llama_cpp
+        llama_kwargs, _, _, self.sampling_kwargs = split_llamacpp_kwargs(
+            llamacpp_kwargs
+        )
+        # n_ctx is per conversation, the cache is shared by all of the sequences
+        self.n_ctx_per_sequence = llama_kwargs.pop("n_ctx", 512)
+        self.max_batch_size = max_batch_size
+        # the rest of the sequence's context is left for the response
+        self.max_prompt_tokens = int(
+            self.n_ctx_per_sequence * LLAMACPP_REBUILT_CONTEXT_FRACTION
+        )
+        self.llama = llama_cpp.Llama(
+            n_ctx=self.n_ctx_per_sequence * max_batch_size, **llama_kwargs
+        )
+        self.n_vocab = self.llama.n_vocab()
+        self.n_batch = max(self.llama.n_batch, max_batch_size)
+        self.batch = llama_cpp.llama_batch_init(self.n_batch, 0, 1)
+        self.positions: Dict[int, int] = {}
+        self.logits: Dict[int, np.ndarray] = {}
+        self.recent_tokens: Dict[int, List[int]] = {}
+
+    @property
+    def ctx(self):
+        return self.llama._ctx.ctx
+
+    def decode_batch(self, tokens: List[Tuple[int, int, int, bool]]):
+        """Evaluates (token, position, sequence_id, needs_logits) tuples in one call"""
+        self.batch.n_tokens = len(tokens)
+        for i, (token, position, sequence_id, needs_logits) in enumerate(tokens):
+            self.batch.token[i] = token
+            self.batch.pos[i] = position
+            self.batch.n_seq_id[i] = 1
+            self.batch.seq_id[i][0] = sequence_id
+            self.batch.logits[i] = needs_logits
+        if self.llama_cpp.llama_decode(self.ctx, self.batch) != 0:
+            raise RuntimeError("llama_decode failed, the KV cache may be full")
+
+    def get_logits(self, batch_index: int) -> np.ndarray:
+        return np.ctypeslib.as_array(
+            self.llama_cpp.llama_get_logits_ith(self.ctx, batch_index),
+            shape=(self.n_vocab,),
+        ).copy()
+
+    def count_tokens(self, text: str) -> int:
+        return len(self.llama.tokenize(text.encode("utf-8"), add_bos=False))
+
+    def add_sequence(self, sequence_id: int, prompt: str):
+        tokens = self.llama.tokenize(prompt.encode("utf-8"))
+        # cutting the prompt short would drop the start of sequence token and the preamble
+        if len(tokens) > self.max_prompt_tokens:
+            raise ValueError(
+                f"Prompt has {len(tokens)} tokens, more than the {self.max_prompt_tokens} allowed"
+            )
+        for start in range(0, len(tokens), self.n_batch):
+            chunk = tokens[start : start + self.n_batch]
+            self.decode_batch(
+                [
+                    (token, position, sequence_id, position == len(tokens) - 1)
+                    for position, token in enumerate(chunk, start)
+                ]
+            )
+        self.logits[sequence_id] = self.get_logits(len(chunk) - 1)
+        self.positions[sequence_id] = len(tokens)
+        self.recent_tokens[sequence_id] = list(tokens)
+
+    def decode(self, sequence_ids: List[int]) -> List[Optional[bytes]]:
+        results: List[Optional[bytes]] = []
+        batch_tokens: List[Tuple[int, int, int, bool]] = []
+        for sequence_id in sequence_ids:
+            token = sample_token(
+                self.logits[sequence_id],
+                self.recent_tokens[sequence_id],
+                **self.sampling_kwargs,
+            )
+            if (
+                token == self.llama.token_eos()
+                or self.positions[sequence_id] >= self.n_ctx_per_sequence
+            ):
+                results.append(None)
+                continue
+            results.append(self.llama.detokenize([token]))
+            batch_tokens.append((token, self.positions[sequence_id], sequence_id, True))
+        if batch_tokens:
+            self.decode_batch(batch_tokens)
+        for batch_index, (token, _, sequence_id, _) in enumerate(batch_tokens):
+            self.logits[sequence_id] = self.get_logits(batch_index)
+            self.positions[sequence_id] += 1
+            self.recent_tokens[sequence_id].append(token)
+        return results
+
+    def remove_sequence(self, sequence_id: int):
+        self.llama_cpp.llama_kv_cache_seq_rm(self.ctx, sequence_id, -1, -1)
+        self.positions.pop(sequence_id, None)
+        self.logits.pop(sequence_id, None)
+        self.recent_tokens.pop(sequence_id, None)
+
+
+class GPT4AllModel(LocalModel):
+    """A GPT4All-J model, loaded once and shared by every conversation
+
+    The bindings only keep one sequence in the model's context, so generations run one at a
+    time, but they no longer load their own copy of the weights.
+    """
+
+    max_batch_size = 1
+
+    def __init__(self, model_path: str):
+        from pygpt4all.models.gpt4all_j import GPT4All_J
+
+        self.llm = GPT4All_J(model_path)
+        self.generations: Dict[int, Iterator[str]] = {}
+
+    def add_sequence(self, sequence_id: int, prompt: str):
+        self.generations[sequence_id] = iter(
+            self.llm.generate(prompt, n_predict=LOCAL_INFERENCE_DEFAULT_MAX_TOKENS)
+        )
+
+    def decode(self, sequence_ids: List[int]) -> List[Optional[bytes]]:
+        results: List[Optional[bytes]] = []
+        for sequence_id in sequence_ids:
+            text = next(self.generations[sequence_id], None)
+            results.append(None if text is None else text.encode("utf-8"))
+        return results
+
+    def remove_sequence(self, sequence_id: int):
+        self.generations.pop(sequence_id, None)
+
+
+class GenerationRequest:
+    def __init__(self, prompt: str, max_tokens: int, stop: List[str]):
+        self.prompt = prompt
+        self.max_tokens = max_tokens
+        self.stop = stop
+        self.output: asyncio.Queue[Optional[str]] = asyncio.Queue()
+        self.error: Optional[Exception] = None
+        self.sequence_id: Optional[int] = None
+        self.is_cancelled = False
+        self.is_finished = False
+        self.decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+        self.response = ""
+        self.num_sent = 0
+        self.num_tokens = 0
+
+    def add_token(self, token: bytes):
+        self.num_tokens += 1
+        self.response += self.decoder.decode(token)
+        stop_indexes = [self.response.find(stop) for stop in self.stop]
+        stop_index = min((index for index in stop_indexes if index >= 0), default=-1)
+        if stop_index >= 0:
+            self.response = self.response[:stop_index]
+            self.finish()
+            return
+        if self.num_tokens >= self.max_tokens:
+            self.finish()
+            return
+        sendable_length = min(
+            (get_unstoppable_length(self.response, stop) for stop in self.stop),
+            default=len(self.response),
+        )
+        if sendable_length > self.num_sent:
+            self.output.put_nowait(self.response[self.num_sent : sendable_length])
+            self.num_sent = sendable_length
+
+    def finish(self, error: Optional[Exception] = None):
+        if self.is_finished:
+            return
+        self.is_finished = True
+        self.error = error
+        if len(self.response) > self.num_sent:
+            self.output.put_nowait(self.response[self.num_sent :])
+            self.num_sent = len(self.response)
+        self.output.put_nowait(None)
+
+
+class LocalInferenceServer:
+    """Runs generations for every conversation in the process on one shared model
+
+    Agents submit requests over an async queue. Between decode steps, waiting requests take
+    any free slots in the batch and finished or cancelled ones leave it, so each step decodes
+    the next token of every active request at once. The model is only called from one worker
+    thread, and tokens are streamed back to each request's generator as they are decoded.
+    """
+
+    def __init__(self, model: LocalModel):
+        self.model = model
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        # the queue and scheduler belong to the loop that created them
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.request_queue: "asyncio.Queue[GenerationRequest]" = asyncio.Queue()
+        self.serve_task: Optional[asyncio.Task] = None
+        self.waiting_requests: Deque[GenerationRequest] = deque()
+        self.active_requests: List[GenerationRequest] = []
+        # sequences whose requests left the batch, removed from the model on the next step
+        self.removed_sequence_ids: List[int] = []
+
+    def ensure_serving(self):
+        loop = asyncio.get_running_loop()
+        if (
+            loop is self.loop
+            and self.serve_task is not None
+            and not self.serve_task.done()
+        ):
+            return
+        self.removed_sequence_ids += [
+            request.sequence_id
+            for request in self.active_requests
+            if request.sequence_id is not None
+        ]
+        self.active_requests = []
+        self.waiting_requests = deque()
+        self.loop = loop
+        self.request_queue = asyncio.Queue()
+        self.serve_task = asyncio.create_task(self.serve())
+
+    async def generate(
+        self,
+        prompt: str,
+        max_tokens: int = LOCAL_INFERENCE_DEFAULT_MAX_TOKENS,
+        stop: Optional[List[str]] = None,
+    ) -> AsyncGenerator[str, None]:
+        """Streams the response to the prompt, cancelling the generator stops its decoding"""
+        self.ensure_serving()
+        request = GenerationRequest(prompt, max_tokens, stop or [])
+        self.request_queue.put_nowait(request)
+        try:
+            while True:
+                text = await request.output.get()
+                if text is None:
+                    break
+                yield text
+            if request.error is not None:
+                raise request.error
+        finally:
+            request.is_cancelled = True
+
+    def stop(self):
+        """Stops serving in the current loop, the next request starts serving again"""
+        if self.serve_task is not None:
+            self.serve_task.cancel()
+            self.serve_task = None
+
+    def get_free_sequence_ids(self) -> List[int]:
+        used_sequence_ids = {request.sequence_id for request in self.active_requests}
+        used_sequence_ids.update(self.removed_sequence_ids)
+        return [
+            sequence_id
+            for sequence_id in range(self.model.max_batch_size)
+            if sequence_id not in used_sequence_ids
+        ]
+
+    def remove_inactive_requests(self):
+        for request in self.active_requests:
+            if request.is_cancelled or request.is_finished:
+                request.finish()
+                assert request.sequence_id is not None
+                self.removed_sequence_ids.append(request.sequence_id)
+        self.active_requests = [
+            request
+            for request in self.active_requests
+            if not (request.is_cancelled or request.is_finished)
+        ]
+
+    def step(
+        self,
+        removed_sequence_ids: List[int],
+        new_requests: List[GenerationRequest],
+        requests: List[GenerationRequest],
+    ) -> Tuple[Dict[int, Exception], List[Optional[bytes]]]:
+        """Adds the new sequences and decodes the next token of every request
+
+        A request whose sequence can't be added only fails itself, it is left out of the decode
+        and its error is returned by sequence id.
+        """
+        for sequence_id in removed_sequence_ids:
+            self.model.remove_sequence(sequence_id)
+        add_errors: Dict[int, Exception] = {}
+        for request in new_requests:
+            assert request.sequence_id is not None
+            try:
+                self.model.add_sequence(request.sequence_id, request.prompt)
+            except Exception as e:
+                add_errors[request.sequence_id] = e
+        return add_errors, self.model.decode(
+            [
+                request.sequence_id  # type: ignore
+                for request in requests
+                if request.sequence_id not in add_errors
+            ]
+        )
+
+    async def serve(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            self.remove_inactive_requests()
+            while not self.request_queue.empty():
+                self.waiting_requests.append(self.request_queue.get_nowait())
+            if (
+                not self.active_requests
+                and not self.removed_sequence_ids
+                and not self.waiting_requests
+            ):
+                # nothing to decode, wait for the next request
+                self.waiting_requests.append(await self.request_queue.get())
+            new_requests: List[GenerationRequest] = []
+            free_sequence_ids = self.get_free_sequence_ids()
+            while free_sequence_ids and self.waiting_requests:
+                request = self.waiting_requests.popleft()
+                if request.is_cancelled:
+                    continue
+                request.sequence_id = free_sequence_ids.pop(0)
+                new_requests.append(request)
+            local_inference_queue_size_histogram.record(len(self.waiting_requests))
+            self.active_requests += new_requests
+            requests = list(self.active_requests)
+            removed_sequence_ids = self.removed_sequence_ids
+            self.removed_sequence_ids = []
+            if requests:
+                local_inference_batch_size_histogram.record(len(requests))
+            try:
+                add_errors, tokens = await loop.run_in_executor(
+                    self.executor,
+                    self.step,
+                    removed_sequence_ids,
+                    new_requests,
+                    requests,
+                )
+            except Exception as e:
+                logger.error(f"Local inference step failed: {e}", exc_info=True)
+                for request in requests:
+                    request.finish(error=e)
+                continue
+            for request in requests:
+                if request.sequence_id in add_errors:
+                    error = add_errors[request.sequence_id]
+                    logger.error(f"Adding a local inference sequence failed: {error}")
+                    # its slot is freed, and anything it evaluated removed, on the next step
+                    request.finish(error=error)
+            requests = [
+                request for request in requests if request.sequence_id not in add_errors
+            ]
+            for request, token in zip(requests, tokens):
+                if token is None:
+                    request.finish()
+                elif not request.is_cancelled:
+                    request.add_token(token)
+
+
+local_inference_servers: Dict[str, LocalInferenceServer] = {}
+
+
+def get_local_inference_server(
+    create_model: Callable[[], LocalModel], **model_params: Any
+) -> LocalInferenceServer:
+    """Returns the process-wide server for a model, loading the model on the first call"""
+    key = json.dumps(model_params, sort_keys=True, default=str)
+    if key not in local_inference_servers:
+        local_inference_servers[key] = LocalInferenceServer(create_model())
+    return local_inference_servers[key]
@@ -0,0 +1,162 @@
+import hashlib
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from opentelemetry import metrics
+
+from vocode.streaming.agent.speculative_response import normalize_transcription
+from vocode.streaming.models.agent import ResponseCacheConfig
+from vocode.streaming.utils.embedding_service import get_embedding_service
+
+meter = metrics.get_meter(__name__)
+response_cache_hits_counter = meter.create_counter(
+    name="agent.response_cache.hits",
+    unit="responses",
+)
+response_cache_misses_counter = meter.create_counter(
+    name="agent.response_cache.misses",
+    unit="responses",
+)
+response_cache_lookup_latency_histogram = meter.create_histogram(
+    name="agent.response_cache.lookup_latency",
+    unit="seconds",
+)
+
+
+async def create_openai_embedding(text: str) -> np.ndarray:
+    # repeated questions are answered from the embedding service's cache
+    return await get_embedding_service().create_embedding(text)
+
+
+class ResponseCacheIndex:
+    """The cached responses for one prompt preamble, searched by brute force"""
+
+    def __init__(self):
+        self.embeddings: List[np.ndarray] = []
+        self.entries: List[Tuple[float, List[str]]] = []
+        # stacked self.embeddings, rebuilt on the first search after a change
+        self.embedding_matrix: Optional[np.ndarray] = None
+
+    def remove_oldest(self, num_entries: int):
+        if num_entries <= 0:
+            return
+        del self.embeddings[:num_entries]
+        del self.entries[:num_entries]
+        self.embedding_matrix = None
+
+    def remove_expired(self, ttl_seconds: float):
+        # entries are in the order they were added, so the expired ones come first
+        expiry_time = time.time() - ttl_seconds
+        num_expired = 0
+        while (
+            num_expired < len(self.entries)
+            and self.entries[num_expired][0] < expiry_time
+        ):
+            num_expired += 1
+        self.remove_oldest(num_expired)
+
+    def add(self, embedding: np.ndarray, sentences: List[str], max_entries: int):
+        self.embeddings.append(embedding)
+        self.entries.append((time.time(), sentences))
+        self.embedding_matrix = None
+        self.remove_oldest(len(self.entries) - max_entries)
+
+    def search(self, embedding: np.ndarray) -> Tuple[Optional[List[str]], float]:
+        if not self.entries:
+            return None, 0.0
+        if self.embedding_matrix is None:
+            self.embedding_matrix = np.stack(self.embeddings)
+        similarities = self.embedding_matrix @ embedding
+        best_index = int(np.argmax(similarities))
+        return self.entries[best_index][1], float(similarities[best_index])
+
+
+class ResponseCacheLookup:
+    """The result of looking up a human message, used to cache the response on a miss"""
+
+    def __init__(
+        self,
+        response_cache: "ResponseCache",
+        namespace: str,
+        embedding: np.ndarray,
+        sentences: Optional[List[str]],
+    ):
+        self.response_cache = response_cache
+        self.namespace = namespace
+        self.embedding = embedding
+        self.sentences = sentences
+
+    def store(self, sentences: List[str]):
+        # only misses are stored, a hit's response is already cached
+        if self.sentences is None and sentences:
+            self.response_cache.add(self.namespace, self.embedding, sentences)
+
+
+class ResponseCache:
+    """Semantic cache of agent responses, shared by all conversations in the process
+
+    Responses are kept in one in-memory index per namespace, which is derived from the agent's
+    prompt preamble, and a human message hits if its embedding is within the similarity
+    threshold of a cached message's.
+    """
+
+    def __init__(
+        self,
+        response_cache_config: ResponseCacheConfig,
+        create_embedding: Callable[
+            [str], Awaitable[np.ndarray]
+        ] = create_openai_embedding,
+    ):
+        self.response_cache_config = response_cache_config
+        self.create_embedding = create_embedding
+        self.indexes: Dict[str, ResponseCacheIndex] = {}
+
+    @staticmethod
+    def get_namespace(agent_type: str, prompt_preamble: Optional[str]) -> str:
+        return hashlib.sha256(
+            f"{agent_type}\n{prompt_preamble or ''}".encode("utf-8")
+        ).hexdigest()
+
+    async def get_embedding(self, text: str) -> np.ndarray:
+        embedding = await self.create_embedding(normalize_transcription(text))
+        return embedding / np.linalg.norm(embedding)
+
+    async def lookup(self, namespace: str, text: str) -> ResponseCacheLookup:
+        start_time = time.time()
+        embedding = await self.get_embedding(text)
+        sentences = None
+        index = self.indexes.get(namespace)
+        if index is not None:
+            index.remove_expired(self.response_cache_config.ttl_seconds)
+            cached_sentences, similarity = index.search(embedding)
+            if similarity >= self.response_cache_config.similarity_threshold:
+                sentences = cached_sentences
+        if sentences is None:
+            response_cache_misses_counter.add(1)
+        else:
+            response_cache_hits_counter.add(1)
+        response_cache_lookup_latency_histogram.record(time.time() - start_time)
+        return ResponseCacheLookup(self, namespace, embedding, sentences)
+
+    def add(self, namespace: str, embedding: np.ndarray, sentences: List[str]):
+        if namespace not in self.indexes:
+            self.indexes[namespace] = ResponseCacheIndex()
+        self.indexes[namespace].add(
+            embedding, list(sentences), self.response_cache_config.max_entries
+        )
+
+
+response_caches: Dict[Tuple[float, float, int], ResponseCache] = {}
+
+
+def get_response_cache(response_cache_config: ResponseCacheConfig) -> ResponseCache:
+    """Returns the process-wide cache for this config, so that it is shared across conversations"""
+    cache_id = (
+        response_cache_config.similarity_threshold,
+        response_cache_config.ttl_seconds,
+        response_cache_config.max_entries,
+    )
+    if cache_id not in response_caches:
+        response_caches[cache_id] = ResponseCache(response_cache_config)
+    return response_caches[cache_id]
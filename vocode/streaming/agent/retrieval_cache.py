@@ -0,0 +1,120 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Coroutine, List, Optional, Tuple
+
+from langchain.docstore.document import Document
+from opentelemetry import metrics
+
+from vocode.streaming.agent.speculative_response import (
+    normalize_transcription,
+    transcriptions_match,
+)
+from vocode.streaming.models.agent import RetrievalPrefetchConfig
+
+# retrievals for the latest interim transcriptions, older ones are never asked for again
+MAX_CACHED_RETRIEVALS = 16
+
+meter = metrics.get_meter(__name__)
+retrieval_cache_hits_counter = meter.create_counter(
+    name="agent.retrieval_cache.hits",
+    unit="retrievals",
+)
+retrieval_cache_misses_counter = meter.create_counter(
+    name="agent.retrieval_cache.misses",
+    unit="retrievals",
+)
+
+DocumentsWithScores = List[Tuple[Document, float]]
+
+
+class RetrievalCache:
+    """Retrieves documents for interim transcriptions, so they are ready by the final one
+
+    Retrievals are kept for the lifetime of a conversation, keyed by the normalized query. A
+    query reuses a retrieval, finished or still in flight, if it matches the retrieval's query
+    within the configured similarity, and starts a new retrieval otherwise.
+    """
+
+    def __init__(
+        self,
+        retrieve: Callable[[str], Coroutine[Any, Any, DocumentsWithScores]],
+        retrieval_prefetch_config: RetrievalPrefetchConfig,
+        logger: Optional[logging.Logger] = None,
+    ):
+        self.retrieve = retrieve
+        self.retrieval_prefetch_config = retrieval_prefetch_config
+        self.logger = logger or logging.getLogger(__name__)
+        self.retrievals: "OrderedDict[str, asyncio.Task[DocumentsWithScores]]" = (
+            OrderedDict()
+        )
+        self.stable_query_task: Optional[asyncio.Task] = None
+
+    def prefetch(self, query: str):
+        """Retrieves documents for the query once it has been stable for a while"""
+        if normalize_transcription(query) in self.retrievals:
+            return
+        if self.stable_query_task is not None:
+            self.stable_query_task.cancel()
+        self.stable_query_task = asyncio.create_task(self.retrieve_once_stable(query))
+
+    async def retrieve_once_stable(self, query: str):
+        await asyncio.sleep(self.retrieval_prefetch_config.stability_threshold_seconds)
+        self.logger.debug(f"Prefetching documents for: {query}")
+        self.start_retrieval(query)
+
+    def start_retrieval(self, query: str) -> "asyncio.Task[DocumentsWithScores]":
+        normalized_query = normalize_transcription(query)
+        task = self.retrievals.get(normalized_query)
+        if task is not None:
+            self.retrievals.move_to_end(normalized_query)
+            return task
+        task = asyncio.create_task(self.retrieve(query))
+        self.retrievals[normalized_query] = task
+        if len(self.retrievals) > MAX_CACHED_RETRIEVALS:
+            # not cancelled, a response may still be waiting for it
+            self.retrievals.popitem(last=False)
+        return task
+
+    def find_retrieval(
+        self, query: str
+    ) -> Optional["asyncio.Task[DocumentsWithScores]"]:
+        normalized_query = normalize_transcription(query)
+        task = self.retrievals.get(normalized_query)
+        if task is not None:
+            return task
+        # the most recent interim transcriptions are the likeliest to match
+        for cached_query, task in reversed(self.retrievals.items()):
+            if transcriptions_match(
+                cached_query,
+                normalized_query,
+                self.retrieval_prefetch_config.min_similarity,
+            ):
+                return task
+        return None
+
+    async def get(self, query: str) -> DocumentsWithScores:
+        if self.stable_query_task is not None:
+            self.stable_query_task.cancel()
+        task = self.find_retrieval(query)
+        if task is None:
+            retrieval_cache_misses_counter.add(1)
+            task = self.start_retrieval(query)
+        else:
+            retrieval_cache_hits_counter.add(1)
+        try:
+            # other queries may reuse the retrieval, so it must outlive this turn
+            return await asyncio.shield(task)
+        except Exception:
+            # failed retrievals are not reused
+            for cached_query, cached_task in list(self.retrievals.items()):
+                if cached_task is task:
+                    del self.retrievals[cached_query]
+            raise
+
+    def terminate(self):
+        if self.stable_query_task is not None:
+            self.stable_query_task.cancel()
+        for task in self.retrievals.values():
+            task.cancel()
+        self.retrievals.clear()
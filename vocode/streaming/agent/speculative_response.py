@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import asyncio
+import difflib
+import logging
+import re
+import time
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, AsyncGenerator, Optional, Tuple, Union
+
+from opentelemetry import metrics
+
+from vocode.streaming.models.actions import FunctionCall
+from vocode.streaming.models.agent import SpeculativeResponseConfig
+from vocode.streaming.models.transcript import Transcript
+from vocode.streaming.transcriber.base_transcriber import Transcription
+
+if TYPE_CHECKING:
+    from vocode.streaming.agent.base_agent import RespondAgent
+
+# the transcript that agent.transcript resolves to inside a speculative response task
+shadow_transcript: ContextVar[Optional[Transcript]] = ContextVar(
+    "shadow_transcript", default=None
+)
+
+meter = metrics.get_meter(__name__)
+speculative_response_hits_counter = meter.create_counter(
+    name="agent.speculative_response.hits",
+    unit="responses",
+)
+speculative_response_misses_counter = meter.create_counter(
+    name="agent.speculative_response.misses",
+    unit="responses",
+)
+speculative_response_latency_saved_histogram = meter.create_histogram(
+    name="agent.speculative_response.latency_saved",
+    unit="seconds",
+)
+
+
+def normalize_transcription(text: str) -> str:
+    text = re.sub(r"[^\w\s]", "", text.lower())
+    return " ".join(text.split())
+
+
+def transcriptions_match(first: str, second: str, min_similarity: float) -> bool:
+    first, second = normalize_transcription(first), normalize_transcription(second)
+    if first == second:
+        return True
+    if min_similarity >= 1:
+        return False
+    return difflib.SequenceMatcher(None, first, second).ratio() >= min_similarity
+
+
+class SpeculativeResponse:
+    """A response generated for an interim transcription, buffered until the final one arrives"""
+
+    def __init__(self, transcription: Transcription, conversation_id: str):
+        self.transcription = transcription
+        self.conversation_id = conversation_id
+        self.start_time = time.time()
+        self.first_response_time: Optional[float] = None
+        self.buffered_responses: asyncio.Queue[
+            Optional[Tuple[Union[str, FunctionCall], bool]]
+        ] = asyncio.Queue()
+        self.task: Optional[asyncio.Task] = None
+
+    async def generate(self, agent: RespondAgent, transcript: Transcript):
+        # the task runs in its own context, so only this task sees the shadow transcript
+        shadow_transcript.set(transcript)
+        try:
+            async for response in agent.generate_response(
+                self.transcription.message,
+                conversation_id=self.conversation_id,
+                is_interrupt=self.transcription.is_interrupt,
+            ):
+                if self.first_response_time is None:
+                    self.first_response_time = time.time()
+                self.buffered_responses.put_nowait(response)
+        finally:
+            self.buffered_responses.put_nowait(None)
+
+    def get_latency_saved(self) -> float:
+        """Seconds of the response generation that happened before the final transcription"""
+        now = time.time()
+        return min(self.first_response_time or now, now) - self.start_time
+
+    async def get_responses(
+        self,
+    ) -> AsyncGenerator[Tuple[Union[str, FunctionCall], bool], None]:
+        # if the turn consuming the responses is cancelled, stop generating them too
+        try:
+            while True:
+                response = await self.buffered_responses.get()
+                if response is None:
+                    return
+                yield response
+        finally:
+            self.cancel()
+
+    def cancel(self):
+        if self.task is not None:
+            self.task.cancel()
+
+
+class SpeculativeResponder:
+    """Starts generating a response once an interim transcription has been stable for a while
+
+    The response is generated against a shadow copy of the transcript that already contains
+    the interim transcription, and nothing is released until the final transcription matches.
+    """
+
+    def __init__(
+        self,
+        agent: RespondAgent,
+        speculative_response_config: SpeculativeResponseConfig,
+        logger: Optional[logging.Logger] = None,
+    ):
+        self.agent = agent
+        self.speculative_response_config = speculative_response_config
+        self.logger = logger or logging.getLogger(__name__)
+        self.stable_transcription_task: Optional[asyncio.Task] = None
+        self.latest_interim_message: Optional[str] = None
+        self.speculative_response: Optional[SpeculativeResponse] = None
+        self.hits = 0
+        self.misses = 0
+
+    def handle_interim_transcription(
+        self, transcription: Transcription, conversation_id: str
+    ):
+        normalized_message = normalize_transcription(transcription.message)
+        if normalized_message == self.latest_interim_message:
+            return
+        self.latest_interim_message = normalized_message
+        if self.speculative_response is not None:
+            # the human kept talking, the response was generated for nothing
+            self.record_miss()
+        self.cancel()
+        self.stable_transcription_task = asyncio.create_task(
+            self.speculate_once_stable(transcription, conversation_id)
+        )
+
+    async def speculate_once_stable(
+        self, transcription: Transcription, conversation_id: str
+    ):
+        await asyncio.sleep(
+            self.speculative_response_config.stability_threshold_seconds
+        )
+        if not self.agent.can_speculate():
+            return
+        assert self.agent.transcript is not None
+        transcript = Transcript()
+        # assigned after construction, so that validation doesn't copy the event logs
+        transcript.event_logs = list(self.agent.transcript.event_logs)
+        transcript.add_human_message(
+            text=transcription.message,
+            conversation_id=conversation_id,
+        )
+        self.logger.debug(f"Speculating a response to {transcription.message}")
+        speculative_response = SpeculativeResponse(transcription, conversation_id)
+        speculative_response.task = asyncio.create_task(
+            speculative_response.generate(self.agent, transcript)
+        )
+        self.speculative_response = speculative_response
+
+    def take_speculative_response(
+        self, transcription: Transcription
+    ) -> Optional[SpeculativeResponse]:
+        """Returns the speculative response if it was generated for this final transcription"""
+        speculative_response = self.speculative_response
+        self.speculative_response = None
+        self.latest_interim_message = None
+        if self.stable_transcription_task is not None:
+            self.stable_transcription_task.cancel()
+            self.stable_transcription_task = None
+        if speculative_response is None:
+            return None
+        if (
+            transcriptions_match(
+                speculative_response.transcription.message,
+                transcription.message,
+                self.speculative_response_config.min_similarity,
+            )
+            and speculative_response.transcription.is_interrupt
+            == transcription.is_interrupt
+        ):
+            self.hits += 1
+            speculative_response_hits_counter.add(1)
+            latency_saved = speculative_response.get_latency_saved()
+            speculative_response_latency_saved_histogram.record(latency_saved)
+            self.logger.debug(f"Speculative response hit, saved {latency_saved:.3f}s")
+            return speculative_response
+        self.record_miss()
+        speculative_response.cancel()
+        return None
+
+    def record_miss(self):
+        self.misses += 1
+        speculative_response_misses_counter.add(1)
+        self.logger.debug("Speculative response missed, cancelling it")
+
+    def cancel(self):
+        if self.stable_transcription_task is not None:
+            self.stable_transcription_task.cancel()
+            self.stable_transcription_task = None
+        if self.speculative_response is not None:
+            self.speculative_response.cancel()
+            self.speculative_response = None
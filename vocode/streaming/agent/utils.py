@@ -1,4 +1,3 @@
-from copy import deepcopy
 import re
 from typing import (
     Dict,
@@ -15,14 +14,7 @@ from typing import (
 
 from openai.openai_object import OpenAIObject
 from vocode.streaming.models.actions import FunctionCall, FunctionFragment
-from vocode.streaming.models.events import Sender
-from vocode.streaming.models.transcript import (
-    ActionFinish,
-    ActionStart,
-    EventLog,
-    Message,
-    Transcript,
-)
+from vocode.streaming.models.transcript import Transcript
 
 SENTENCE_ENDINGS = [".", "!", "?", "\n"]
 
@@ -119,57 +111,7 @@ def format_openai_chat_messages_from_transcript(
         [{"role": "system", "content": prompt_preamble}] if prompt_preamble else []
     )
 
-    # merge consecutive bot messages
-    new_event_logs: List[EventLog] = []
-    idx = 0
-    while idx < len(transcript.event_logs):
-        bot_messages_buffer: List[Message] = []
-        current_log = transcript.event_logs[idx]
-        while isinstance(current_log, Message) and current_log.sender == Sender.BOT:
-            bot_messages_buffer.append(current_log)
-            idx += 1
-            try:
-                current_log = transcript.event_logs[idx]
-            except IndexError:
-                break
-        if bot_messages_buffer:
-            merged_bot_message = deepcopy(bot_messages_buffer[-1])
-            merged_bot_message.text = " ".join(
-                event_log.text for event_log in bot_messages_buffer
-            )
-            new_event_logs.append(merged_bot_message)
-        else:
-            new_event_logs.append(current_log)
-            idx += 1
-
-    for event_log in new_event_logs:
-        if isinstance(event_log, Message):
-            chat_messages.append(
-                {
-                    "role": "assistant" if event_log.sender == Sender.BOT else "user",
-                    "content": event_log.text,
-                }
-            )
-        elif isinstance(event_log, ActionStart):
-            chat_messages.append(
-                {
-                    "role": "assistant",
-                    "content": None,
-                    "function_call": {
-                        "name": event_log.action_type,
-                        "arguments": event_log.action_input.params.json(),
-                    },
-                }
-            )
-        elif isinstance(event_log, ActionFinish):
-            chat_messages.append(
-                {
-                    "role": "function",
-                    "name": event_log.action_type,
-                    "content": event_log.action_output.response.json(),
-                }
-            )
-    return chat_messages
+    return chat_messages + transcript.get_openai_chat_messages()
 
 
 def vector_db_result_to_openai_chat_message(vector_db_result):
@@ -1,19 +1,18 @@
+from typing import Optional
+
 import numpy as np
 
 
-def int2float(sound):
+def int2float(sound, out: Optional[np.ndarray] = None):
     """
     Convert an array of integers representing sound samples to an array of floating point numbers.
 
     Parameters:
     sound (np.ndarray): The input array of sound samples.
+    out (np.ndarray, optional): A float32 array to write the result into instead of allocating a new one.
 
     Returns:
     np.ndarray: The array of sound samples converted to floating point numbers.
     """
-    abs_max = np.abs(sound).max()
-    sound = sound.astype('float32')
-    if abs_max > 0:
-        sound *= 1 / 32768
-    sound = sound.squeeze()
-    return sound
+    sound = np.multiply(sound, np.float32(1 / 32768), out=out, dtype=np.float32)
+    return sound.squeeze()
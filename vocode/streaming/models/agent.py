@@ -40,6 +40,13 @@ class AgentType(str, Enum):
     ACTION = "agent_action"
 
 
+class GoodbyeModelType(str, Enum):
+    # compares OpenAI embeddings of each message to those of goodbye phrases
+    EMBEDDING = "goodbye_model_embedding"
+    # matches each clause of a message to goodbye phrases word by word, without network requests
+    LOCAL = "goodbye_model_local"
+
+
 class FillerAudioConfig(BaseModel):
     silence_threshold_seconds: float = FILLER_AUDIO_DEFAULT_SILENCE_THRESHOLD_SECONDS
     use_phrases: bool = True
@@ -64,16 +71,80 @@ class AzureOpenAIConfig(BaseModel):
     engine: str = AZURE_OPENAI_DEFAULT_ENGINE
 
 
+class SpeculativeResponseConfig(BaseModel):
+    # how long an interim transcription must stay unchanged before a response is generated for it
+    stability_threshold_seconds: float = 0.3
+    # how similar the final transcription must be to the interim one, after normalization,
+    # for the speculative response to be used, 1 means identical
+    min_similarity: float = 1.0
+
+    @validator("min_similarity")
+    def min_similarity_must_be_between_0_and_1(cls, v):
+        if not 0 <= v <= 1:
+            raise ValueError("must be between 0 and 1")
+        return v
+
+
+class RetrievalPrefetchConfig(BaseModel):
+    # how long an interim transcription must stay unchanged before documents are retrieved for it
+    stability_threshold_seconds: float = 0.2
+    # how similar the final transcription must be to an interim one, after normalization,
+    # for the documents retrieved for the interim one to be used, 1 means identical
+    min_similarity: float = 0.9
+
+    @validator("min_similarity")
+    def min_similarity_must_be_between_0_and_1(cls, v):
+        if not 0 <= v <= 1:
+            raise ValueError("must be between 0 and 1")
+        return v
+
+
+class LocalInferenceServerConfig(BaseModel):
+    # how many conversations' generations are decoded together, each takes a slot in the batch
+    max_batch_size: int = 4
+
+
+class ResponseCacheConfig(BaseModel):
+    # how similar, by cosine similarity of the embeddings, a human message must be to a cached
+    # one for its response to be reused
+    similarity_threshold: float = 0.95
+    ttl_seconds: float = 60 * 60
+    # per prompt preamble, the oldest responses are evicted first
+    max_entries: int = 1000
+    # the response is generated if the lookup, which embeds the human message, takes longer
+    lookup_timeout_seconds: float = 0.2
+
+    @validator("similarity_threshold")
+    def similarity_threshold_must_be_between_0_and_1(cls, v):
+        if not 0 <= v <= 1:
+            raise ValueError("must be between 0 and 1")
+        return v
+
+
 class AgentConfig(TypedModel, type=AgentType.BASE.value):
     initial_message: Optional[BaseMessage] = None
     generate_responses: bool = True
     allowed_idle_time_seconds: Optional[float] = None
     allow_agent_to_be_cut_off: bool = True
     end_conversation_on_goodbye: bool = False
+    goodbye_model_type: GoodbyeModelType = GoodbyeModelType.EMBEDDING
     send_filler_audio: Union[bool, FillerAudioConfig] = False
     webhook_config: Optional[WebhookConfig] = None
     track_bot_sentiment: bool = False
     actions: Optional[List[ActionConfig]] = None
+    # if set, up to this many agent responses are synthesized concurrently, ahead of playback
+    synthesis_lookahead: Optional[int] = None
+    # if set, responses are generated while the human is still speaking, from interim transcriptions
+    speculative_response_config: Optional[SpeculativeResponseConfig] = None
+    # if set, responses to human messages that are similar to earlier ones, in any
+    # conversation with the same prompt preamble, are reused
+    response_cache_config: Optional[ResponseCacheConfig] = None
+
+    @validator("synthesis_lookahead")
+    def synthesis_lookahead_must_be_positive(cls, v):
+        if v is not None and v < 1:
+            raise ValueError("synthesis_lookahead must be at least 1")
+        return v
 
 
 class CutOffResponse(BaseModel):
@@ -83,21 +154,39 @@ class CutOffResponse(BaseModel):
 class LLMAgentConfig(AgentConfig, type=AgentType.LLM.value):
     prompt_preamble: str
     expected_first_prompt: Optional[str] = None
+    # if set, the response to expected_first_prompt is generated once per process and shared
+    # by all agents with the same prompt and generation parameters
+    share_first_response: bool = False
     model_name: str = LLM_AGENT_DEFAULT_MODEL_NAME
     temperature: float = LLM_AGENT_DEFAULT_TEMPERATURE
     max_tokens: int = LLM_AGENT_DEFAULT_MAX_TOKENS
     cut_off_response: Optional[CutOffResponse] = None
 
 
+class ContextWindowConfig(BaseModel):
+    # prompt tokens the preamble, the summary and the most recent messages must fit in
+    max_prompt_tokens: int = 3000
+    # if set, the messages that don't fit anymore are compacted into a rolling summary
+    summarize_truncated_messages: bool = False
+    summary_max_tokens: int = 256
+
+
 class ChatGPTAgentConfig(AgentConfig, type=AgentType.CHAT_GPT.value):
     prompt_preamble: str
     expected_first_prompt: Optional[str] = None
+    # if set, the response to expected_first_prompt is generated once per process and shared
+    # by all agents with the same prompt and generation parameters
+    share_first_response: bool = False
     model_name: str = CHAT_GPT_AGENT_DEFAULT_MODEL_NAME
     temperature: float = LLM_AGENT_DEFAULT_TEMPERATURE
     max_tokens: int = LLM_AGENT_DEFAULT_MAX_TOKENS
     cut_off_response: Optional[CutOffResponse] = None
     azure_params: Optional[AzureOpenAIConfig] = None
     vector_db_config: Optional[VectorDBConfig] = None
+    # if set with vector_db_config, documents are retrieved while the human is still talking
+    retrieval_prefetch_config: Optional[RetrievalPrefetchConfig] = None
+    # if set, only the most recent messages that fit in a token budget are sent
+    context_window_config: Optional[ContextWindowConfig] = None
 
 
 class ChatAnthropicAgentConfig(AgentConfig, type=AgentType.CHAT_ANTHROPIC.value):
@@ -123,6 +212,12 @@ class LlamacppAgentConfig(AgentConfig, type=AgentType.LLAMACPP.value):
     prompt_preamble: str
     llamacpp_kwargs: dict = {}
     prompt_template: Optional[Union[PromptTemplate, str]] = None
+    # if set, the conversation stays evaluated in llama.cpp's KV cache and each turn only
+    # evaluates the new human message, requires llama-cpp-python and the default or alpaca prompt
+    reuse_kv_cache: bool = False
+    # if set, the model is loaded once per process and generations from every conversation are
+    # batched by a shared server, requires llama-cpp-python and the default or alpaca prompt
+    local_inference_server_config: Optional[LocalInferenceServerConfig] = None
 
 
 class InformationRetrievalAgentConfig(
@@ -143,6 +238,8 @@ class GPT4AllAgentConfig(AgentConfig, type=AgentType.GPT4ALL.value):
     prompt_preamble: str
     model_path: str
     generate_responses: bool = False
+    # if set, the model is loaded once per process and shared by every conversation
+    local_inference_server_config: Optional[LocalInferenceServerConfig] = None
 
 
 class RESTfulUserImplementedAgentConfig(
@@ -4,6 +4,7 @@ from typing import Any, Dict, List, Optional, Union
 from pydantic import validator
 from vocode.streaming.models.client_backend import OutputAudioConfig
 
+from vocode.streaming.constants import TEXT_TO_SPEECH_CHUNK_SIZE_SECONDS
 from vocode.streaming.output_device.base_output_device import BaseOutputDevice
 from vocode.streaming.telephony.constants import (
     DEFAULT_AUDIO_ENCODING,
@@ -30,6 +31,10 @@ class SynthesizerType(str, Enum):
 
 class SentimentConfig(BaseModel):
     emotions: List[str] = ["angry", "friendly", "sad", "whispering"]
+    # the sentiment is analysed once no message has been added for this long
+    debounce_seconds: float = 1.0
+    # number of most recent messages the sentiment is analysed from
+    window_size: int = 10
 
     @validator("emotions")
     def emotions_must_not_be_empty(cls, v):
@@ -38,15 +43,40 @@ class SentimentConfig(BaseModel):
         return v
 
 
+DEFAULT_SYNTHESIS_CACHE_MAX_SIZE_BYTES = 64 * 1024 * 1024
+
+
+class SynthesisCacheConfig(BaseModel):
+    # byte budget of the in-memory LRU tier, shared by every synthesizer using the same cache config
+    max_size_bytes: int = DEFAULT_SYNTHESIS_CACHE_MAX_SIZE_BYTES
+    # if set, synthesized audio is also persisted here and survives process restarts
+    cache_dir: Optional[str] = None
+
+    @validator("max_size_bytes")
+    def max_size_bytes_must_be_positive(cls, v):
+        if v <= 0:
+            raise ValueError("max_size_bytes must be positive")
+        return v
+
+
 class SynthesizerConfig(TypedModel, type=SynthesizerType.BASE.value):
     sampling_rate: int
     audio_encoding: AudioEncoding
     should_encode_as_wav: bool = False
     sentiment_config: Optional[SentimentConfig] = None
+    cache_config: Optional[SynthesisCacheConfig] = None
+    # duration of the chunks sent to the output device, shorter chunks stop sooner on interrupt
+    output_chunk_size_seconds: float = TEXT_TO_SPEECH_CHUNK_SIZE_SECONDS
 
     class Config:
         arbitrary_types_allowed = True
 
+    @validator("output_chunk_size_seconds")
+    def output_chunk_size_seconds_must_be_at_least_20ms(cls, v):
+        if v < 0.02:
+            raise ValueError("must be at least 0.02")
+        return v
+
     @classmethod
     def from_output_device(cls, output_device: BaseOutputDevice, **kwargs):
         return cls(
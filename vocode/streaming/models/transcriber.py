@@ -11,7 +11,7 @@ from vocode.streaming.telephony.constants import (
     DEFAULT_SAMPLING_RATE,
 )
 from .audio_encoding import AudioEncoding
-from .model import TypedModel
+from .model import BaseModel, TypedModel
 
 AZURE_DEFAULT_LANGUAGE = "en-US"
 
@@ -31,6 +31,7 @@ class EndpointingType(str, Enum):
     BASE = "endpointing_base"
     TIME_BASED = "endpointing_time_based"
     PUNCTUATION_BASED = "endpointing_punctuation_based"
+    LOCAL = "endpointing_local"
 
 
 class EndpointingConfig(TypedModel, type=EndpointingType.BASE):
@@ -47,6 +48,47 @@ class PunctuationEndpointingConfig(
     time_cutoff_seconds: float = 0.4
 
 
+class LocalEndpointingConfig(EndpointingConfig, type=EndpointingType.LOCAL):
+    """Ends the human's turn locally, before the transcription provider does
+
+    Silence is measured by the local VAD if the transcriber has a vad_config, otherwise from
+    the last change of the interim transcription.
+    """
+
+    # silence after which the turn ends
+    time_cutoff_seconds: float = 0.8
+    # silence after which the turn ends if the transcription ends in terminal punctuation
+    punctuation_time_cutoff_seconds: float = 0.3
+    # the cutoffs are scaled by how much slower than this the caller speaks, None to disable
+    reference_words_per_second: Optional[float] = 2.5
+
+
+class VADConfig(BaseModel):
+    # path to a local silero_vad.jit, defaults to the SILERO_VAD_MODEL_PATH environment variable
+    model_path: Optional[str] = None
+    threshold: float = 0.7
+    min_silence_duration_ms: int = 500
+    speech_pad_ms: int = 30
+    # silero only accepts 512 samples at 16kHz and 256 at 8kHz, None picks the one for the rate
+    window_size_samples: Optional[int] = None
+    # if set, windows from all conversations in the process are batched into one inference
+    batching_window_ms: Optional[float] = None
+    max_batch_size: int = 256
+    # if set, only speech plus padding is streamed to the transcriber, with keepalives in between
+    gate_uplink: bool = False
+    uplink_pre_padding_ms: int = 300
+    uplink_post_padding_ms: int = 300
+    uplink_keepalive_interval_seconds: float = 3
+    # if set, the start of speech interrupts the bot, so noise that the VAD flags can cut it off
+    interrupt_on_speech_start: bool = False
+
+    @validator("threshold")
+    def threshold_must_be_between_0_and_1(cls, v):
+        if v < 0 or v > 1:
+            raise ValueError("must be between 0 and 1")
+        return v
+
+
 class TranscriberConfig(TypedModel, type=TranscriberType.BASE.value):
     sampling_rate: int
     audio_encoding: AudioEncoding
@@ -55,6 +97,7 @@ class TranscriberConfig(TypedModel, type=TranscriberType.BASE.value):
     downsampling: Optional[int] = None
     min_interrupt_confidence: Optional[float] = None
     mute_during_speech: bool = False
+    vad_config: Optional[VADConfig] = None
 
     @validator("min_interrupt_confidence")
     def min_interrupt_confidence_must_be_between_0_and_1(cls, v):
@@ -1,6 +1,6 @@
 import time
-from typing import Any, Dict, List, Optional, Union
-from pydantic import BaseModel, Field
+from typing import Any, Callable, Dict, List, Optional, Set, Union
+from pydantic import BaseModel, Field, PrivateAttr
 from enum import Enum
 from vocode.streaming.models.actions import ActionInput, ActionOutput
 from vocode.streaming.models.events import ActionEvent, Sender, Event, EventType
@@ -51,13 +51,104 @@ class Transcript(BaseModel):
     event_logs: List[EventLog] = []
     start_time: float = Field(default_factory=time.time)
     events_manager: Optional[EventsManager] = None
+    # the event logs as OpenAI chat messages, consecutive bot messages are merged into one
+    _chat_messages: List[Dict[str, Any]] = PrivateAttr(default_factory=list)
+    # index of each merged bot chat message -> the bot messages it is made of
+    _chat_message_bot_messages: Dict[int, List[Message]] = PrivateAttr(
+        default_factory=dict
+    )
+    # id of each bot message -> index of the chat message it was merged into
+    _bot_message_chat_indices: Dict[int, int] = PrivateAttr(default_factory=dict)
+    _stale_chat_message_indices: Set[int] = PrivateAttr(default_factory=set)
+    _synced_event_logs: Optional[List[EventLog]] = PrivateAttr(default=None)
+    _num_synced_event_logs: int = PrivateAttr(default=0)
+    _message_listeners: List[Callable[[Message], None]] = PrivateAttr(
+        default_factory=list
+    )
 
     class Config:
         arbitrary_types_allowed = True
 
+    def get_openai_chat_messages(self) -> List[Dict[str, Any]]:
+        """The event logs as OpenAI chat messages
+
+        Only the event logs added since the last call are converted, and only the merged bot
+        messages whose text changed are rebuilt. Bot message texts must be changed through
+        update_message_text for the chat messages to pick the change up. The returned dicts
+        are shared with the transcript and must not be modified.
+        """
+        if (
+            self.event_logs is not self._synced_event_logs
+            or len(self.event_logs) < self._num_synced_event_logs
+        ):
+            self._reset_chat_messages()
+        for event_log in self.event_logs[self._num_synced_event_logs :]:
+            self._append_chat_message(event_log)
+        self._num_synced_event_logs = len(self.event_logs)
+        for chat_message_index in self._stale_chat_message_indices:
+            self._chat_messages[chat_message_index] = {
+                "role": "assistant",
+                "content": " ".join(
+                    message.text
+                    for message in self._chat_message_bot_messages[chat_message_index]
+                ),
+            }
+        self._stale_chat_message_indices.clear()
+        return list(self._chat_messages)
+
+    def _reset_chat_messages(self):
+        self._chat_messages = []
+        self._chat_message_bot_messages = {}
+        self._bot_message_chat_indices = {}
+        self._stale_chat_message_indices = set()
+        self._synced_event_logs = self.event_logs
+        self._num_synced_event_logs = 0
+
+    def _append_chat_message(self, event_log: EventLog):
+        if isinstance(event_log, Message) and event_log.sender == Sender.BOT:
+            last_chat_message_index = len(self._chat_messages) - 1
+            if last_chat_message_index not in self._chat_message_bot_messages:
+                self._chat_messages.append({})
+                last_chat_message_index += 1
+                self._chat_message_bot_messages[last_chat_message_index] = []
+            self._chat_message_bot_messages[last_chat_message_index].append(event_log)
+            self._bot_message_chat_indices[id(event_log)] = last_chat_message_index
+            self._stale_chat_message_indices.add(last_chat_message_index)
+        elif isinstance(event_log, Message):
+            self._chat_messages.append({"role": "user", "content": event_log.text})
+        elif isinstance(event_log, ActionStart):
+            self._chat_messages.append(
+                {
+                    "role": "assistant",
+                    "content": None,
+                    "function_call": {
+                        "name": event_log.action_type,
+                        "arguments": event_log.action_input.params.json(),
+                    },
+                }
+            )
+        elif isinstance(event_log, ActionFinish):
+            self._chat_messages.append(
+                {
+                    "role": "function",
+                    "name": event_log.action_type,
+                    "content": event_log.action_output.response.json(),
+                }
+            )
+
+    def update_message_text(self, message: Message, text: str):
+        message.text = text
+        chat_message_index = self._bot_message_chat_indices.get(id(message))
+        if chat_message_index is not None:
+            self._stale_chat_message_indices.add(chat_message_index)
+
     def attach_events_manager(self, events_manager: EventsManager):
         self.events_manager = events_manager
 
+    def add_message_listener(self, listener: Callable[[Message], None]):
+        """Calls listener with each message once it is complete, i.e. when it is published"""
+        self._message_listeners.append(listener)
+
     def to_string(self, include_timestamps: bool = False) -> str:
         return "\n".join(
             event.to_string(include_timestamp=include_timestamps)
@@ -67,6 +158,8 @@ class Transcript(BaseModel):
     def maybe_publish_transcript_event_from_message(
         self, message: Message, conversation_id: str
     ):
+        for listener in self._message_listeners:
+            listener(message)
         if self.events_manager is not None:
             self.events_manager.publish_event(
                 TranscriptEvent(
@@ -167,7 +260,7 @@ class Transcript(BaseModel):
         # TODO: figure out what to do for the event
         for event_log in reversed(self.event_logs):
             if isinstance(event_log, Message) and event_log.sender == Sender.BOT:
-                event_log.text = text
+                self.update_message_text(event_log, text)
                 break
 
 
@@ -8,6 +8,7 @@ DEFAULT_EMBEDDINGS_MODEL = "text-embedding-ada-002"
 class VectorDBType(str, Enum):
     BASE = "vector_db_base"
     PINECONE = "vector_db_pinecone"
+    LOCAL = "vector_db_local"
 
 
 class VectorDBConfig(TypedModel, type=VectorDBType.BASE.value):
@@ -19,3 +20,19 @@ class PineconeConfig(VectorDBConfig, type=VectorDBType.PINECONE.value):
     api_key: Optional[str]
     api_environment: Optional[str]
     top_k: int = 3
+
+
+class LocalVectorDBDType(str, Enum):
+    FLOAT32 = "float32"
+    # halves the file size, with a negligible loss of accuracy for normalized embeddings,
+    # but numpy converts float16 slowly, so searches are slower than with int8
+    FLOAT16 = "float16"
+    # quarters the file size, each vector is scaled to use the full int8 range
+    INT8 = "int8"
+
+
+class LocalVectorDBConfig(VectorDBConfig, type=VectorDBType.LOCAL.value):
+    # directory that the vectors and documents are stored in
+    path: str
+    dtype: LocalVectorDBDType = LocalVectorDBDType.FLOAT32
+    top_k: int = 3
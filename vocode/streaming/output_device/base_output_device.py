@@ -1,3 +1,5 @@
+from typing import Optional
+
 from vocode.streaming.models.audio_encoding import AudioEncoding
 
 
@@ -11,9 +13,17 @@ class BaseOutputDevice:
 
     def consume_nonblocking(self, chunk: bytes):
         raise NotImplemented
-    
+
     def maybe_send_mark_nonblocking(self, message):
         pass
 
+    def get_playback_position(self) -> Optional[float]:
+        """Seconds of audio actually played, if the device reports playback"""
+        return None
+
+    def clear(self) -> bool:
+        """Drops the audio that was sent but not played yet, returns whether the device can"""
+        return False
+
     def terminate(self):
         pass
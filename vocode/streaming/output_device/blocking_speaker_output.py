@@ -6,6 +6,7 @@ import numpy as np
 from vocode.streaming.models.audio_encoding import AudioEncoding
 
 from vocode.streaming.output_device.base_output_device import BaseOutputDevice
+from vocode.streaming.utils.audio_converter import StreamingAudioConverter
 from vocode.streaming.utils.worker import ThreadAsyncWorker
 
 
@@ -25,6 +26,12 @@ class BlockingSpeakerOutput(BaseOutputDevice, ThreadAsyncWorker):
         self.input_queue = asyncio.Queue()
         BaseOutputDevice.__init__(self, sampling_rate, audio_encoding)
         ThreadAsyncWorker.__init__(self, self.input_queue)
+        # the speaker and file expect LINEAR16, so decode mu-law output on the way in
+        self.audio_converter = StreamingAudioConverter(
+            input_sampling_rate=self.sampling_rate,
+            output_sampling_rate=self.sampling_rate,
+            input_encoding=self.audio_encoding,
+        )
         self.stream = sd.OutputStream(
             channels=1,
             samplerate=self.sampling_rate,
@@ -47,7 +54,7 @@ class BlockingSpeakerOutput(BaseOutputDevice, ThreadAsyncWorker):
                 continue
 
     def consume_nonblocking(self, chunk):
-        ThreadAsyncWorker.consume_nonblocking(self, chunk)
+        ThreadAsyncWorker.consume_nonblocking(self, self.audio_converter.convert(chunk))
 
     def terminate(self):
         self._ended = True
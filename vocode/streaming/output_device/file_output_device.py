@@ -5,6 +5,7 @@ import numpy as np
 
 from .base_output_device import BaseOutputDevice
 from vocode.streaming.models.audio_encoding import AudioEncoding
+from vocode.streaming.utils.audio_converter import StreamingAudioConverter
 from vocode.streaming.utils.worker import ThreadAsyncWorker
 
 
@@ -37,6 +38,12 @@ class FileOutputDevice(BaseOutputDevice):
     ):
         super().__init__(sampling_rate, audio_encoding)
         self.blocksize = self.sampling_rate
+        # the speaker and file expect LINEAR16, so decode mu-law output on the way in
+        self.audio_converter = StreamingAudioConverter(
+            input_sampling_rate=self.sampling_rate,
+            output_sampling_rate=self.sampling_rate,
+            input_encoding=self.audio_encoding,
+        )
         self.queue: Queue[np.ndarray] = Queue()
 
         wav = wave.open(file_path, "wb")
@@ -49,7 +56,7 @@ class FileOutputDevice(BaseOutputDevice):
         self.thread_worker.start()
 
     def consume_nonblocking(self, chunk):
-        chunk_arr = np.frombuffer(chunk, dtype=np.int16)
+        chunk_arr = np.frombuffer(self.audio_converter.convert(chunk), dtype=np.int16)
         for i in range(0, chunk_arr.shape[0], self.blocksize):
             block = np.zeros(self.blocksize, dtype=np.int16)
             size = min(self.blocksize, chunk_arr.shape[0] - i)
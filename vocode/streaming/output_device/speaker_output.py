@@ -5,6 +5,7 @@ import numpy as np
 
 from .base_output_device import BaseOutputDevice
 from vocode.streaming.models.audio_encoding import AudioEncoding
+from vocode.streaming.utils.audio_converter import StreamingAudioConverter
 
 
 class SpeakerOutput(BaseOutputDevice):
@@ -23,6 +24,12 @@ class SpeakerOutput(BaseOutputDevice):
         )
         super().__init__(sampling_rate, audio_encoding)
         self.blocksize = blocksize or self.sampling_rate
+        # the speaker and file expect LINEAR16, so decode mu-law output on the way in
+        self.audio_converter = StreamingAudioConverter(
+            input_sampling_rate=self.sampling_rate,
+            output_sampling_rate=self.sampling_rate,
+            input_encoding=self.audio_encoding,
+        )
         self.stream = sd.OutputStream(
             channels=1,
             samplerate=self.sampling_rate,
@@ -42,7 +49,7 @@ class SpeakerOutput(BaseOutputDevice):
         outdata[:, 0] = data
 
     def consume_nonblocking(self, chunk):
-        chunk_arr = np.frombuffer(chunk, dtype=np.int16)
+        chunk_arr = np.frombuffer(self.audio_converter.convert(chunk), dtype=np.int16)
         for i in range(0, chunk_arr.shape[0], self.blocksize):
             block = np.zeros(self.blocksize, dtype=np.int16)
             size = min(self.blocksize, chunk_arr.shape[0] - i)
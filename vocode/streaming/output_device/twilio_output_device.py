@@ -3,7 +3,8 @@ from __future__ import annotations
 import asyncio
 import json
 import base64
-from typing import Optional
+from collections import deque
+from typing import Deque, Optional, Tuple
 
 from fastapi import WebSocket
 
@@ -12,6 +13,9 @@ from vocode.streaming.telephony.constants import (
     DEFAULT_AUDIO_ENCODING,
     DEFAULT_SAMPLING_RATE,
 )
+from vocode.streaming.utils import get_chunk_size_per_second
+
+CHUNK_MARK_PREFIX = "chunk-"
 
 
 class TwilioOutputDevice(BaseOutputDevice):
@@ -25,6 +29,12 @@ class TwilioOutputDevice(BaseOutputDevice):
         self.stream_sid = stream_sid
         self.active = True
         self.queue: asyncio.Queue[str] = asyncio.Queue()
+        # every media chunk is followed by a mark, which Twilio echoes back once the chunk was played
+        self.num_chunks_sent = 0
+        self.sent_seconds = 0.0
+        self.played_seconds = 0.0
+        # (mark name, seconds sent up to the end of the chunk) of the marks not echoed back yet
+        self.pending_marks: Deque[Tuple[str, float]] = deque()
         self.process_task = asyncio.create_task(self.process())
 
     async def process(self):
@@ -39,6 +49,43 @@ class TwilioOutputDevice(BaseOutputDevice):
             "media": {"payload": base64.b64encode(chunk).decode("utf-8")},
         }
         self.queue.put_nowait(json.dumps(twilio_message))
+        self.sent_seconds += len(chunk) / get_chunk_size_per_second(
+            self.audio_encoding, self.sampling_rate
+        )
+        mark_name = f"{CHUNK_MARK_PREFIX}{self.num_chunks_sent}"
+        self.num_chunks_sent += 1
+        self.pending_marks.append((mark_name, self.sent_seconds))
+        self.queue.put_nowait(
+            json.dumps(
+                {
+                    "event": "mark",
+                    "streamSid": self.stream_sid,
+                    "mark": {"name": mark_name},
+                }
+            )
+        )
+
+    def handle_mark(self, mark_name: str):
+        if not any(name == mark_name for name, _ in self.pending_marks):
+            # marks of cleared audio, or not sent for a chunk
+            return
+        while self.pending_marks:
+            name, sent_seconds = self.pending_marks.popleft()
+            self.played_seconds = sent_seconds
+            if name == mark_name:
+                break
+
+    def get_playback_position(self) -> Optional[float]:
+        return self.played_seconds
+
+    def clear(self) -> bool:
+        self.queue.put_nowait(
+            json.dumps({"event": "clear", "streamSid": self.stream_sid})
+        )
+        # Twilio echoes the marks of the cleared audio right away, they're ignored
+        self.pending_marks.clear()
+        self.sent_seconds = self.played_seconds
+        return True
 
     def maybe_send_mark_nonblocking(self, message_sent):
         mark_message = {
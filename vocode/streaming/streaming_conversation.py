@@ -10,7 +10,6 @@ import typing
 from typing import Any, Awaitable, Callable, Generic, Optional, Tuple, TypeVar
 
 import numpy as np
-import torch
 
 from vocode.streaming.action.worker import ActionsWorker
 from vocode.streaming.agent.base_agent import (
@@ -23,12 +22,12 @@ from vocode.streaming.agent.base_agent import (
     TranscriptionAgentInput,
 )
 from vocode.streaming.agent.bot_sentiment_analyser import (
+    BotSentiment,
     BotSentimentAnalyser,
+    BotSentimentTracker,
 )
 from vocode.streaming.agent.chat_gpt_agent import ChatGPTAgent
-from vocode.streaming.audio_utils import int2float
 from vocode.streaming.constants import (
-    TEXT_TO_SPEECH_CHUNK_SIZE_SECONDS,
     PER_CHUNK_ALLOWANCE_SECONDS,
     ALLOWED_IDLE_TIME,
 )
@@ -54,7 +53,13 @@ from vocode.streaming.transcriber.base_transcriber import (
     Transcription,
     BaseTranscriber,
 )
-from vocode.streaming.utils import create_conversation_id, get_chunk_size_per_second
+from vocode.streaming.transcriber.local_endpointing import LocalEndpointingWorker
+from vocode.streaming.utils import (
+    create_conversation_id,
+    get_chunk_size,
+    get_chunk_size_per_second,
+)
+from vocode.streaming.utils.output_pacer import PacedOutputStream
 from vocode.streaming.utils.conversation_logger_adapter import wrap_logger
 from vocode.streaming.utils.events_manager import EventsManager
 from vocode.streaming.utils.state_manager import ConversationStateManager
@@ -65,7 +70,15 @@ from vocode.streaming.utils.worker import (
     InterruptibleEventFactory,
     InterruptibleAgentResponseEvent,
 )
-from vocode.streaming.vad_utils import CustomVADIterator, model
+from vocode.streaming.vad_utils import (
+    BatchedVADWorker,
+    SpeechEvent,
+    SpeechEventType,
+    VADIterator,
+    VADUplinkGate,
+    VADWorker,
+    get_vad_scheduler,
+)
 
 OutputDeviceType = TypeVar("OutputDeviceType", bound=BaseOutputDevice)
 
@@ -152,6 +165,10 @@ class StreamingConversation(Generic[OutputDeviceType]):
                     )
                 )
                 self.output_queue.put_nowait(event)
+            else:
+                self.conversation.agent.handle_interim_transcription(
+                    transcription, conversation_id=self.conversation.id
+                )
 
     class FillerAudioWorker(InterruptibleAgentResponseWorker):
         """
@@ -226,17 +243,21 @@ class StreamingConversation(Generic[OutputDeviceType]):
             super().__init__(
                 input_queue=input_queue,
                 output_queue=output_queue,
+                # look-ahead mode: synthesize several messages at once, but play them in order
+                max_concurrency=(
+                        conversation.agent.get_agent_config().synthesis_lookahead or 1
+                ),
+                ordered_output=True,
             )
             self.input_queue = input_queue
             self.output_queue = output_queue
             self.conversation = conversation
             self.interruptible_event_factory = interruptible_event_factory
-            self.chunk_size = (
-                    get_chunk_size_per_second(
-                        self.conversation.synthesizer.get_synthesizer_config().audio_encoding,
-                        self.conversation.synthesizer.get_synthesizer_config().sampling_rate,
-                    )
-                    * TEXT_TO_SPEECH_CHUNK_SIZE_SECONDS
+            synthesizer_config = self.conversation.synthesizer.get_synthesizer_config()
+            self.chunk_size = get_chunk_size(
+                synthesizer_config.audio_encoding,
+                synthesizer_config.sampling_rate,
+                synthesizer_config.output_chunk_size_seconds,
             )
 
         def send_filler_audio(self, agent_response_tracker: Optional[asyncio.Event]):
@@ -286,7 +307,7 @@ class StreamingConversation(Generic[OutputDeviceType]):
                         await self.conversation.filler_audio_worker.wait_for_filler_audio_to_finish()
 
                 self.conversation.logger.debug("Synthesizing speech for message")
-                synthesis_result = await self.conversation.synthesizer.create_speech(
+                synthesis_result = await self.conversation.synthesizer.create_speech_with_cache(
                     agent_response_message.message,
                     self.chunk_size,
                     bot_sentiment=self.conversation.bot_sentiment,
@@ -299,6 +320,39 @@ class StreamingConversation(Generic[OutputDeviceType]):
             except asyncio.CancelledError:
                 pass
 
+        def cancel_current_task(self):
+            cancelled = super().cancel_current_task()
+            self.close_interrupted_synthesis_results()
+            return cancelled
+
+        def close_interrupted_synthesis_results(self):
+            """Drops synthesis results that were interrupted before playback and closes them
+
+            In look-ahead mode, results can be held back until earlier messages finish synthesizing,
+            or wait in the output queue, and closing them releases their HTTP responses.
+            """
+            interrupted_events: typing.List[
+                InterruptibleAgentResponseEvent[Tuple[BaseMessage, SynthesisResult]]
+            ] = []
+            for slot in self.process_slots:
+                interrupted_events += [
+                    event for event in slot.outputs if event.is_interrupted()
+                ]
+                slot.outputs = [
+                    event for event in slot.outputs if not event.is_interrupted()
+                ]
+            queued_events = []
+            while not self.output_queue.empty():
+                queued_events.append(self.output_queue.get_nowait())
+            for event in queued_events:
+                if event.is_interrupted():
+                    interrupted_events.append(event)
+                else:
+                    self.output_queue.put_nowait(event)
+            for event in interrupted_events:
+                _, synthesis_result = event.payload
+                asyncio.create_task(synthesis_result.chunk_generator.aclose())
+
     class SynthesisResultsWorker(InterruptibleAgentResponseWorker):
         """Plays SynthesisResults from the output queue on the output device"""
 
@@ -333,7 +387,7 @@ class StreamingConversation(Generic[OutputDeviceType]):
                     message.text,
                     synthesis_result,
                     item.interruption_event,
-                    TEXT_TO_SPEECH_CHUNK_SIZE_SECONDS,
+                    self.conversation.synthesizer.get_synthesizer_config().output_chunk_size_seconds,
                     transcript_message=transcript_message,
                 )
                 # publish the transcript message now that it includes what was said during send_speech_to_output
@@ -398,8 +452,15 @@ class StreamingConversation(Generic[OutputDeviceType]):
             InterruptibleAgentResponseEvent[FillerAudio]
         ] = asyncio.Queue()
         self.state_manager = self.create_state_manager()
-        self.transcriptions_worker = self.TranscriptionsWorker(
+        # passes transcriptions through unless the endpointing config is local
+        self.endpointing_worker = LocalEndpointingWorker(
             input_queue=self.transcriber.output_queue,
+            output_queue=asyncio.Queue(),
+            transcriber=self.transcriber,
+            logger=self.logger,
+        )
+        self.transcriptions_worker = self.TranscriptionsWorker(
+            input_queue=self.endpointing_worker.output_queue,
             output_queue=self.agent.get_input_queue(),
             conversation=self,
             interruptible_event_factory=self.interruptible_event_factory,
@@ -433,9 +494,12 @@ class StreamingConversation(Generic[OutputDeviceType]):
         self.events_manager = events_manager or EventsManager()
         self.events_task: Optional[asyncio.Task] = None
         self.per_chunk_allowance_seconds = per_chunk_allowance_seconds
+        # chunks are sent per_chunk_allowance_seconds before the previous ones finish playing
+        self.output_stream = PacedOutputStream(lead_seconds=per_chunk_allowance_seconds)
         self.transcript = Transcript()
         self.transcript.attach_events_manager(self.events_manager)
-        self.bot_sentiment = None
+        self.bot_sentiment: Optional[BotSentiment] = None
+        self.bot_sentiment_tracker: Optional[BotSentimentTracker] = None
         if self.agent.get_agent_config().track_bot_sentiment:
             self.sentiment_config = (
                 self.synthesizer.get_synthesizer_config().sentiment_config
@@ -445,13 +509,18 @@ class StreamingConversation(Generic[OutputDeviceType]):
             self.bot_sentiment_analyser = BotSentimentAnalyser(
                 emotions=self.sentiment_config.emotions
             )
+            self.bot_sentiment_tracker = BotSentimentTracker(
+                self.bot_sentiment_analyser,
+                self.sentiment_config,
+                on_bot_sentiment=self.update_bot_sentiment,
+                logger=self.logger,
+            )
 
         self.is_human_speaking = False
         self.active = False
         self.mark_last_action_timestamp()
 
         self.check_for_idle_task: Optional[asyncio.Task] = None
-        self.track_bot_sentiment_task: Optional[asyncio.Task] = None
 
         self.current_transcription_is_interrupt: bool = False
 
@@ -460,14 +529,49 @@ class StreamingConversation(Generic[OutputDeviceType]):
         self.end_time: Optional[float] = None
 
         # vad
-        self.vad_iterator = CustomVADIterator(model=model, threshold=0.7, sampling_rate=8000,
-                                              min_silence_duration_ms=500, speech_pad_ms=30)
+        self.vad_iterator: Optional[VADIterator] = None
+        self.vad_worker: Optional[VADWorker] = None
+        self.speech_events_task: Optional[asyncio.Task] = None
+        self.uplink_gate: Optional[VADUplinkGate] = None
+        transcriber_config = self.transcriber.get_transcriber_config()
+        vad_config = transcriber_config.vad_config
+        if vad_config:
+            self.vad_iterator = VADIterator(
+                vad_config=vad_config,
+                sampling_rate=transcriber_config.sampling_rate
+                * (transcriber_config.downsampling or 1),
+                audio_encoding=transcriber_config.audio_encoding,
+            )
+            if vad_config.batching_window_ms is not None:
+                self.vad_worker = BatchedVADWorker(
+                    vad_iterator=self.vad_iterator,
+                    scheduler=get_vad_scheduler(vad_config),
+                    input_queue=asyncio.Queue(),
+                    output_queue=asyncio.Queue(),
+                )
+            else:
+                self.vad_worker = VADWorker(
+                    vad_iterator=self.vad_iterator,
+                    input_queue=asyncio.Queue(),
+                    output_queue=asyncio.Queue(),
+                )
+            if vad_config.gate_uplink:
+                self.uplink_gate = VADUplinkGate(
+                    transcriber=self.transcriber,
+                    vad_config=vad_config,
+                    bytes_per_second=get_chunk_size_per_second(
+                        transcriber_config.audio_encoding,
+                        transcriber_config.sampling_rate
+                        * (transcriber_config.downsampling or 1),
+                    ),
+                )
 
     def create_state_manager(self) -> ConversationStateManager:
         return ConversationStateManager(conversation=self)
 
     async def start(self, mark_ready: Optional[Callable[[], Awaitable[None]]] = None):
         self.transcriber.start()
+        self.endpointing_worker.start()
         self.transcriptions_worker.start()
         self.agent_responses_worker.start()
         self.synthesis_results_worker.start()
@@ -476,6 +580,9 @@ class StreamingConversation(Generic[OutputDeviceType]):
             self.filler_audio_worker.start()
         if self.actions_worker is not None:
             self.actions_worker.start()
+        if self.vad_worker is not None:
+            self.vad_worker.start()
+            self.speech_events_task = asyncio.create_task(self.handle_speech_events())
         is_ready = await self.transcriber.ready()
         if not is_ready:
             raise Exception("Transcriber startup failed")
@@ -497,13 +604,15 @@ class StreamingConversation(Generic[OutputDeviceType]):
         self.agent.attach_transcript(self.transcript)
         if mark_ready:
             await mark_ready()
-        if self.synthesizer.get_synthesizer_config().sentiment_config:
-            await self.update_bot_sentiment()
         self.active = True
-        if self.synthesizer.get_synthesizer_config().sentiment_config:
-            self.track_bot_sentiment_task = asyncio.create_task(
-                self.track_bot_sentiment()
+        if (
+            self.bot_sentiment_tracker is not None
+            and self.synthesizer.get_synthesizer_config().sentiment_config
+        ):
+            self.transcript.add_message_listener(
+                self.bot_sentiment_tracker.handle_message
             )
+            self.bot_sentiment_tracker.start()
         self.check_for_idle_task = asyncio.create_task(self.check_for_idle())
         if len(self.events_manager.subscriptions) > 0:
             self.events_task = asyncio.create_task(self.events_manager.start())
@@ -535,22 +644,9 @@ class StreamingConversation(Generic[OutputDeviceType]):
                 return
             await asyncio.sleep(15)
 
-    async def track_bot_sentiment(self):
-        """Updates self.bot_sentiment every second based on the current transcript"""
-        prev_transcript = None
-        while self.is_active():
-            await asyncio.sleep(1)
-            if self.transcript.to_string() != prev_transcript:
-                await self.update_bot_sentiment()
-                prev_transcript = self.transcript.to_string()
-
-    async def update_bot_sentiment(self):
-        new_bot_sentiment = await self.bot_sentiment_analyser.analyse(
-            self.transcript.to_string()
-        )
-        if new_bot_sentiment.emotion:
-            self.logger.debug("Bot sentiment: %s", new_bot_sentiment)
-            self.bot_sentiment = new_bot_sentiment
+    def update_bot_sentiment(self, new_bot_sentiment: BotSentiment):
+        self.logger.debug("Bot sentiment: %s", new_bot_sentiment)
+        self.bot_sentiment = new_bot_sentiment
 
     def receive_message(self, message: str):
         transcription = Transcription(
@@ -561,18 +657,31 @@ class StreamingConversation(Generic[OutputDeviceType]):
         self.transcriptions_worker.consume_nonblocking(transcription)
 
     def receive_audio(self, chunk: bytes):
-        # audio_np = np.frombuffer(chunk, dtype=np.int16)
-        # audio_float32 = int2float(audio_np)
-        # speech_detection = self.vad_iterator(
-        #     torch.from_numpy(audio_float32), return_seconds=True)
-        # if speech_detection is not None:
-        #     if 'start' in speech_detection:
-        #         self.logger.info("Speech started at: %s", speech_detection['start'])
-        #         self.broadcast_interrupt()
-        #     elif 'end' in speech_detection:
-        #         self.logger.info("Speech ended at: %s", speech_detection['end'])
-        #         self.vad_iterator.reset_states()
-        self.transcriber.send_audio(chunk)
+        if self.vad_worker:
+            self.vad_worker.consume_nonblocking(chunk)
+        if self.uplink_gate:
+            self.uplink_gate.send_audio(chunk)
+        else:
+            self.transcriber.send_audio(chunk)
+
+    async def handle_speech_events(self):
+        """Handles the speech events that the VAD worker produces"""
+        assert self.vad_worker is not None
+        while True:
+            speech_event = await self.vad_worker.output_queue.get()
+            self.handle_speech_event(speech_event)
+
+    def handle_speech_event(self, speech_event: SpeechEvent):
+        if self.uplink_gate:
+            self.uplink_gate.handle_speech_event(speech_event)
+        self.endpointing_worker.handle_speech_event(speech_event)
+        if speech_event.type == SpeechEventType.START:
+            self.logger.debug("Speech started at: %s", speech_event.timestamp_seconds)
+            vad_config = self.transcriber.get_transcriber_config().vad_config
+            if vad_config is not None and vad_config.interrupt_on_speech_start:
+                self.broadcast_interrupt()
+        else:
+            self.logger.debug("Speech ended at: %s", speech_event.timestamp_seconds)
 
     def warmup_synthesizer(self):
         self.synthesizer.ready_synthesizer()
@@ -604,12 +713,19 @@ class StreamingConversation(Generic[OutputDeviceType]):
                 self.transcriber.get_transcriber_config().min_interrupt_confidence or 0
         )
 
+    def get_playback_position(self) -> float:
+        """Seconds of output audio played so far, as reported by the output device if it can"""
+        playback_position = self.output_device.get_playback_position()
+        if playback_position is None:
+            return self.output_stream.get_playback_position()
+        return playback_position
+
     async def send_speech_to_output(
             self,
             message: str,
             synthesis_result: SynthesisResult,
             stop_event: threading.Event,
-            seconds_per_chunk: int,
+            seconds_per_chunk: float,
             transcript_message: Optional[Message] = None,
             started_event: Optional[threading.Event] = None,
     ):
@@ -620,8 +736,12 @@ class StreamingConversation(Generic[OutputDeviceType]):
         - Sets started_event when the first chunk is sent
 
         Importantly, we rate limit the chunks sent to the output. For interrupts to work properly,
-        the next chunk of audio can only be sent after the last chunk is played, so we send
-        a chunk of x seconds only after x seconds have passed since the last chunk was sent.
+        the next chunk of audio can only be sent after the last chunk is played, so chunks are
+        released by the conversation's PacedOutputStream, which tracks on a shared clock when the
+        audio sent so far will have been played.
+        Output devices that report playback, like Twilio's mark events, are the source of truth for
+        how much of the message has been heard, and on interrupt they drop the audio they still
+        have buffered.
 
         Returns the message that was sent up to, and a flag if the message was cut off
         """
@@ -635,19 +755,32 @@ class StreamingConversation(Generic[OutputDeviceType]):
             self.synthesizer.get_synthesizer_config().sampling_rate,
         )
         chunk_idx = 0
-        seconds_spoken = 0
+        # this message starts playing once everything that was sent before it has been played
+        message_start_position = self.output_stream.sent_seconds
         async for chunk_result in synthesis_result.chunk_generator:
-            start_time = time.time()
             speech_length_seconds = seconds_per_chunk * (
                     len(chunk_result.chunk) / chunk_size
             )
-            seconds_spoken = chunk_idx * seconds_per_chunk
+            await self.output_stream.wait_for_next_chunk()
+            seconds_spoken = max(self.get_playback_position() - message_start_position, 0)
+            if transcript_message:
+                self.transcript.update_message_text(
+                    transcript_message,
+                    synthesis_result.get_message_up_to(seconds_spoken),
+                )
             if stop_event.is_set():
                 self.logger.debug(
                     "Interrupted, stopping text to speech after {} chunks".format(
                         chunk_idx
                     )
                 )
+                if self.output_device.clear():
+                    self.output_stream.drop_buffered_audio(
+                        self.output_device.get_playback_position()
+                    )
+                    seconds_spoken = max(
+                        self.get_playback_position() - message_start_position, 0
+                    )
                 message_sent = f"{synthesis_result.get_message_up_to(seconds_spoken)}-"
                 cut_off = True
                 break
@@ -655,30 +788,20 @@ class StreamingConversation(Generic[OutputDeviceType]):
                 if started_event:
                     started_event.set()
             self.output_device.consume_nonblocking(chunk_result.chunk)
-            end_time = time.time()
-            await asyncio.sleep(
-                max(
-                    speech_length_seconds
-                    - (end_time - start_time)
-                    - self.per_chunk_allowance_seconds,
-                    0,
-                )
-            )
+            self.output_stream.mark_sent(speech_length_seconds)
             self.logger.debug(
                 "Sent chunk {} with size {}".format(chunk_idx, len(chunk_result.chunk))
             )
             self.mark_last_action_timestamp()
             chunk_idx += 1
-            seconds_spoken += seconds_per_chunk
-            if transcript_message:
-                transcript_message.text = synthesis_result.get_message_up_to(
-                    seconds_spoken
-                )
+        if not cut_off:
+            # wait for the last chunk to be played
+            await self.output_stream.wait_for_next_chunk()
         if self.transcriber.get_transcriber_config().mute_during_speech:
             self.logger.debug("Unmuting transcriber")
             self.transcriber.unmute()
         if transcript_message:
-            transcript_message.text = message_sent
+            self.transcript.update_message_text(transcript_message, message_sent)
         return message_sent, cut_off
 
     def mark_terminated(self):
@@ -693,9 +816,9 @@ class StreamingConversation(Generic[OutputDeviceType]):
         if self.check_for_idle_task:
             self.logger.debug("Terminating check_for_idle Task")
             self.check_for_idle_task.cancel()
-        if self.track_bot_sentiment_task:
-            self.logger.debug("Terminating track_bot_sentiment Task")
-            self.track_bot_sentiment_task.cancel()
+        if self.bot_sentiment_tracker:
+            self.logger.debug("Terminating bot sentiment tracker")
+            self.bot_sentiment_tracker.terminate()
         if self.events_manager and self.events_task:
             self.logger.debug("Terminating events Task")
             await self.events_manager.flush()
@@ -716,6 +839,8 @@ class StreamingConversation(Generic[OutputDeviceType]):
         self.output_device.terminate()
         self.logger.debug("Terminating speech transcriber")
         self.transcriber.terminate()
+        self.logger.debug("Terminating endpointing worker")
+        self.endpointing_worker.terminate()
         self.logger.debug("Terminating transcriptions worker")
         self.transcriptions_worker.terminate()
         self.logger.debug("Terminating final transcriptions worker")
@@ -728,6 +853,17 @@ class StreamingConversation(Generic[OutputDeviceType]):
         if self.actions_worker is not None:
             self.logger.debug("Terminating actions worker")
             self.actions_worker.terminate()
+        if self.vad_worker is not None:
+            self.logger.debug("Terminating VAD worker")
+            self.vad_worker.terminate()
+        if self.speech_events_task:
+            self.speech_events_task.cancel()
+        if self.uplink_gate is not None:
+            self.logger.debug(
+                "Uplink gate sent %s bytes and suppressed %s bytes",
+                self.uplink_gate.bytes_sent,
+                self.uplink_gate.bytes_suppressed,
+            )
         self.logger.debug("Successfully terminated")
 
     def is_active(self):
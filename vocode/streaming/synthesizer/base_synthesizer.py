@@ -25,6 +25,10 @@ from vocode.streaming.agent.bot_sentiment_analyser import BotSentiment
 from vocode.streaming.models.agent import FillerAudioConfig
 from vocode.streaming.models.message import BaseMessage
 from vocode.streaming.synthesizer.miniaudio_worker import MiniaudioWorker
+from vocode.streaming.synthesizer.synthesis_cache import (
+    SynthesisCache,
+    get_synthesis_cache,
+)
 from vocode.streaming.utils import convert_wav, get_chunk_size_per_second
 from vocode.streaming.models.audio_encoding import AudioEncoding
 from vocode.streaming.models.synthesizer import SynthesizerConfig
@@ -139,6 +143,9 @@ class BaseSynthesizer(Generic[SynthesizerConfigType]):
         else:
             self.aiohttp_session = aiohttp.ClientSession()
             self.should_close_session_on_tear_down = True
+        self.synthesis_cache: Optional[SynthesisCache] = None
+        if synthesizer_config.cache_config:
+            self.synthesis_cache = get_synthesis_cache(synthesizer_config.cache_config)
 
     async def empty_generator(self):
         yield SynthesisResult.ChunkResult(b"", True)
@@ -205,6 +212,36 @@ class BaseSynthesizer(Generic[SynthesizerConfigType]):
     ) -> SynthesisResult:
         raise NotImplementedError
 
+    # create_speech, but served from the synthesis cache when the synthesizer config has a cache_config
+    async def create_speech_with_cache(
+        self,
+        message: BaseMessage,
+        chunk_size: int,
+        bot_sentiment: Optional[BotSentiment] = None,
+    ) -> SynthesisResult:
+        if self.synthesis_cache is None:
+            return await self.create_speech(
+                message, chunk_size, bot_sentiment=bot_sentiment
+            )
+        cache_key = SynthesisCache.get_key(
+            self.synthesizer_config, message, bot_sentiment
+        )
+        cached_output_bytes = await self.synthesis_cache.get(cache_key)
+        if cached_output_bytes is not None:
+            return self.create_synthesis_result_from_bytes(
+                synthesizer_config=self.synthesizer_config,
+                output_bytes=cached_output_bytes,
+                message=message,
+                chunk_size=chunk_size,
+            )
+        synthesis_result = await self.create_speech(
+            message, chunk_size, bot_sentiment=bot_sentiment
+        )
+        synthesis_result.chunk_generator = self.synthesis_cache.record_chunks(
+            cache_key, synthesis_result.chunk_generator, self.synthesizer_config
+        )
+        return synthesis_result
+
     # @param file - a file-like object in wav format
     @staticmethod
     def create_synthesis_result_from_wav(
@@ -218,7 +255,18 @@ class BaseSynthesizer(Generic[SynthesizerConfigType]):
             output_sample_rate=synthesizer_config.sampling_rate,
             output_encoding=synthesizer_config.audio_encoding,
         )
+        return BaseSynthesizer.create_synthesis_result_from_bytes(
+            synthesizer_config, output_bytes, message, chunk_size
+        )
 
+    # @param output_bytes - raw audio already in the synthesizer config's encoding and sampling rate
+    @staticmethod
+    def create_synthesis_result_from_bytes(
+        synthesizer_config: SynthesizerConfig,
+        output_bytes: bytes,
+        message: BaseMessage,
+        chunk_size: int,
+    ) -> SynthesisResult:
         if synthesizer_config.should_encode_as_wav:
             chunk_transform = lambda chunk: encode_as_wav(chunk, synthesizer_config)
         else:
@@ -269,9 +317,8 @@ class BaseSynthesizer(Generic[SynthesizerConfigType]):
                 miniaudio_worker.consume_nonblocking(chunk)
             miniaudio_worker.consume_nonblocking(None)  # sentinel
 
+        send_chunks_task = asyncio.create_task(send_chunks())
         try:
-            asyncio.create_task(send_chunks())
-
             # Await the output queue of the MiniaudioWorker and yield the wav chunks in another loop
             while True:
                 # Get the wav chunk and the flag from the output queue of the MiniaudioWorker
@@ -287,6 +334,9 @@ class BaseSynthesizer(Generic[SynthesizerConfigType]):
         except asyncio.CancelledError:
             pass
         finally:
+            # stop downloading and hand the connection back to the pool if playback was cut short
+            send_chunks_task.cancel()
+            response.release()
             miniaudio_worker.terminate()
 
     async def tear_down(self):
@@ -5,11 +5,66 @@ from typing import Optional, Tuple, Union
 import asyncio
 import miniaudio
 
+from vocode.streaming.models.audio_encoding import AudioEncoding
 from vocode.streaming.models.synthesizer import SynthesizerConfig
-from vocode.streaming.utils import convert_wav
-from vocode.streaming.utils.mp3_helper import decode_mp3
+from vocode.streaming.utils.audio_converter import StreamingAudioConverter
 from vocode.streaming.utils.worker import ThreadAsyncWorker, logger
 
+# a few mp3 frames at common bitrates
+MIN_MP3_READ_SIZE = 2048
+
+
+class MP3ChunkSource(miniaudio.StreamableSource):
+    """Feeds mp3 chunks from the worker's input queue into a miniaudio decoder
+
+    miniaudio pulls bytes from this source as it needs them, so the decoder keeps
+    its frame boundary and resampler state across chunks and every mp3 byte is
+    decoded exactly once. A None chunk marks the end of the current utterance.
+    """
+
+    def __init__(self, worker: MiniaudioWorker):
+        self.worker = worker
+        self.buffer = bytearray()
+        self.exhausted = False
+
+    def _fill_buffer(self, num_bytes: int):
+        while len(self.buffer) < num_bytes and not self.exhausted:
+            mp3_chunk = self._wait_for_chunk()
+            if mp3_chunk is None:
+                self.exhausted = True
+            else:
+                self.buffer.extend(mp3_chunk)
+
+    def _wait_for_chunk(self) -> Optional[bytes]:
+        while not self.worker._ended:
+            try:
+                return self.worker.input_janus_queue.sync_q.get(timeout=1)
+            except queue.Empty:
+                continue
+        return None
+
+    def read(self, num_bytes: int) -> bytes:
+        # the decoder handles short reads, but needs about a frame's worth of data to sync
+        self._fill_buffer(min(num_bytes, MIN_MP3_READ_SIZE))
+        output = bytes(self.buffer[:num_bytes])
+        del self.buffer[:num_bytes]
+        return output
+
+    def seek(self, offset: int, origin: miniaudio.SeekOrigin) -> bool:
+        # the decoder only needs to skip forward, e.g. past ID3 tags
+        if origin != miniaudio.SeekOrigin.CURRENT or offset < 0:
+            return False
+        self._fill_buffer(offset)
+        del self.buffer[:offset]
+        return True
+
+    def drain(self):
+        """Discards the rest of the current utterance, e.g. after a decoding error"""
+        while not self.exhausted:
+            if self._wait_for_chunk() is None:
+                self.exhausted = True
+        self.buffer.clear()
+
 
 class MiniaudioWorker(ThreadAsyncWorker[Union[bytes, None]]):
     def __init__(
@@ -25,60 +80,63 @@ class MiniaudioWorker(ThreadAsyncWorker[Union[bytes, None]]):
         self.chunk_size = chunk_size
         self._ended = False
 
+    def _get_frames_per_chunk(self) -> int:
+        if self.synthesizer_config.audio_encoding == AudioEncoding.MULAW:
+            return self.chunk_size
+        return self.chunk_size // 2
+
     def _run_loop(self):
-        # tracks the mp3 so far
-        current_mp3_buffer = bytearray()
-        # tracks the wav so far
-        current_wav_buffer = bytearray()
-        # the leftover chunks of the wav that haven't been sent to the output queue yet
-        current_wav_output_buffer = bytearray()
+        # each iteration decodes one utterance, i.e. all chunks up until a None sentinel
         while not self._ended:
-            # Get a tuple of (mp3_chunk, is_last) from the input queue
-            try:
-                mp3_chunk = self.input_janus_queue.sync_q.get(timeout=1)
-            except queue.Empty:
-                continue
-            if mp3_chunk is None:
-                current_mp3_buffer.clear()
-                current_wav_buffer.clear()
-                self.output_janus_queue.sync_q.put(
-                    (bytes(current_wav_output_buffer), True)
-                )
-                current_wav_output_buffer.clear()
-                continue
+            source = MP3ChunkSource(self)
+            # the leftover chunks of the wav that haven't been sent to the output queue yet
+            current_wav_output_buffer = bytearray()
+            audio_converter = StreamingAudioConverter(
+                input_sampling_rate=self.synthesizer_config.sampling_rate,
+                output_sampling_rate=self.synthesizer_config.sampling_rate,
+                output_encoding=self.synthesizer_config.audio_encoding,
+            )
             try:
-                current_mp3_buffer.extend(mp3_chunk)
-                output_bytes = decode_mp3(bytes(current_mp3_buffer))
+                # miniaudio decodes straight to the output sampling rate, so the
+                # resampler state is carried across the whole utterance
+                for samples in miniaudio.stream_any(
+                    source,
+                    source_format=miniaudio.FileFormat.MP3,
+                    output_format=miniaudio.SampleFormat.SIGNED16,
+                    nchannels=1,
+                    sample_rate=self.synthesizer_config.sampling_rate,
+                    frames_to_read=self._get_frames_per_chunk(),
+                ):
+                    current_wav_output_buffer.extend(
+                        audio_converter.convert(samples.tobytes())
+                    )
+                    # chunk up the output in chunks of chunk_size bytes, but keep the last chunk (less than chunk size) in the wav output buffer
+                    output_buffer_idx = 0
+                    while (
+                        output_buffer_idx
+                        < len(current_wav_output_buffer) - self.chunk_size
+                    ):
+                        chunk = current_wav_output_buffer[
+                            output_buffer_idx : output_buffer_idx + self.chunk_size
+                        ]
+                        self.output_janus_queue.sync_q.put(
+                            (chunk, False)
+                        )  # don't need to use bytes() since we already sliced it (which is a copy)
+                        output_buffer_idx += self.chunk_size
+                    current_wav_output_buffer = current_wav_output_buffer[
+                        output_buffer_idx:
+                    ]
             except miniaudio.DecodeError as e:
+                if self._ended:
+                    return
                 # TODO: better logging
                 logger.exception("MiniaudioWorker error: " + str(e), exc_info=True)
-                self.output_janus_queue.sync_q.put(
-                    (bytes(current_wav_output_buffer), True)
-                )  # sentinel
-                continue
-            converted_output_bytes = convert_wav(
-                output_bytes,
-                output_sample_rate=self.synthesizer_config.sampling_rate,
-                output_encoding=self.synthesizer_config.audio_encoding,
-            )
-            # take the difference between the current_wav_buffer and the converted_output_bytes
-            # and put the difference in the output buffer
-            new_bytes = converted_output_bytes[len(current_wav_buffer) :]
-            current_wav_output_buffer.extend(new_bytes)
-
-            # chunk up new_bytes in chunks of chunk_size bytes, but keep the last chunk (less than chunk size) in the wav output buffer
-            output_buffer_idx = 0
-            while output_buffer_idx < len(current_wav_output_buffer) - self.chunk_size:
-                chunk = current_wav_output_buffer[
-                    output_buffer_idx : output_buffer_idx + self.chunk_size
-                ]
-                self.output_janus_queue.sync_q.put(
-                    (chunk, False)
-                )  # don't need to use bytes() since we already sliced it (which is a copy)
-                output_buffer_idx += self.chunk_size
-
-            current_wav_output_buffer = current_wav_output_buffer[output_buffer_idx:]
-            current_wav_buffer.extend(new_bytes)
+                source.drain()
+            if self._ended:
+                return
+            self.output_janus_queue.sync_q.put(
+                (bytes(current_wav_output_buffer), True)
+            )  # sentinel
 
     def terminate(self):
         self._ended = True
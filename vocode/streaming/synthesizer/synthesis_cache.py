@@ -0,0 +1,156 @@
+import asyncio
+import hashlib
+import io
+import json
+import logging
+import os
+import wave
+from collections import OrderedDict
+from typing import AsyncGenerator, Dict, Optional, Tuple
+
+from vocode.streaming.agent.bot_sentiment_analyser import BotSentiment
+from vocode.streaming.models.message import BaseMessage, SSMLMessage
+from vocode.streaming.models.synthesizer import SynthesisCacheConfig, SynthesizerConfig
+
+logger = logging.getLogger(__name__)
+
+# fields that don't change the synthesized audio and must not end up in cache keys
+NON_VOICE_SYNTHESIZER_CONFIG_FIELDS = {
+    "api_key",
+    "user_id",
+    "cache_config",
+    "sentiment_config",
+    "should_encode_as_wav",
+    "experimental_streaming",
+    "output_chunk_size_seconds",
+}
+
+
+class SynthesisCache:
+    """Content-addressed cache of synthesized audio
+
+    Stores the raw output audio (LINEAR16 or MULAW, at the synthesizer config's sampling rate)
+    in an in-memory LRU bounded by max_size_bytes, and optionally in cache_dir on disk.
+    The on-disk tier is not evicted from.
+    """
+
+    def __init__(self, max_size_bytes: int, cache_dir: Optional[str] = None):
+        self.max_size_bytes = max_size_bytes
+        self.cache_dir = cache_dir
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+        self.entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def get_key(
+        synthesizer_config: SynthesizerConfig,
+        message: BaseMessage,
+        bot_sentiment: Optional[BotSentiment] = None,
+    ) -> str:
+        key_data = {
+            "synthesizer_config": json.loads(
+                synthesizer_config.json(exclude=NON_VOICE_SYNTHESIZER_CONFIG_FIELDS)
+            ),
+            "text": message.text,
+            "ssml": message.ssml if isinstance(message, SSMLMessage) else None,
+            "bot_sentiment": bot_sentiment.dict()
+            if bot_sentiment and bot_sentiment.emotion
+            else None,
+        }
+        return hashlib.sha256(
+            json.dumps(key_data, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+
+    def _get_path(self, key: str) -> str:
+        assert self.cache_dir is not None
+        return os.path.join(self.cache_dir, f"{key}.audio")
+
+    def _read_from_disk(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._get_path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _write_to_disk(self, key: str, audio_data: bytes):
+        path = self._get_path(key)
+        # write to a temporary file first so that concurrent readers never see partial audio
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(audio_data)
+            os.replace(tmp_path, path)
+        except OSError:
+            logger.exception("Failed to write synthesis cache entry to disk")
+
+    def _set_in_memory(self, key: str, audio_data: bytes):
+        if len(audio_data) > self.max_size_bytes:
+            return
+        if key in self.entries:
+            self.size_bytes -= len(self.entries.pop(key))
+        self.entries[key] = audio_data
+        self.size_bytes += len(audio_data)
+        while self.size_bytes > self.max_size_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.size_bytes -= len(evicted)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        audio_data = self.entries.get(key)
+        if audio_data is not None:
+            self.entries.move_to_end(key)
+        elif self.cache_dir:
+            audio_data = await asyncio.get_running_loop().run_in_executor(
+                None, self._read_from_disk, key
+            )
+            if audio_data is not None:
+                self._set_in_memory(key, audio_data)
+        if audio_data is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return audio_data
+
+    def set(self, key: str, audio_data: bytes):
+        self._set_in_memory(key, audio_data)
+        if self.cache_dir:
+            asyncio.get_running_loop().run_in_executor(
+                None, self._write_to_disk, key, audio_data
+            )
+
+    async def record_chunks(
+        self,
+        key: str,
+        chunk_generator: AsyncGenerator,
+        synthesizer_config: SynthesizerConfig,
+    ) -> AsyncGenerator:
+        """Passes chunks through and caches the audio once the last chunk has been consumed
+
+        Interrupted results never reach their last chunk, so partial audio is never cached.
+        """
+        chunks = []
+        async for chunk_result in chunk_generator:
+            if synthesizer_config.should_encode_as_wav:
+                with wave.open(io.BytesIO(chunk_result.chunk), "rb") as wav:
+                    chunks.append(wav.readframes(wav.getnframes()))
+            else:
+                chunks.append(chunk_result.chunk)
+            if chunk_result.is_last_chunk:
+                self.set(key, b"".join(chunks))
+            yield chunk_result
+
+
+synthesis_caches: Dict[Tuple[int, Optional[str]], SynthesisCache] = {}
+
+
+def get_synthesis_cache(cache_config: SynthesisCacheConfig) -> SynthesisCache:
+    """Returns the process-wide cache for this config, so that it is shared across conversations"""
+    cache_id = (cache_config.max_size_bytes, cache_config.cache_dir)
+    if cache_id not in synthesis_caches:
+        synthesis_caches[cache_id] = SynthesisCache(
+            max_size_bytes=cache_config.max_size_bytes,
+            cache_dir=cache_config.cache_dir,
+        )
+    return synthesis_caches[cache_id]
@@ -154,6 +154,9 @@ class TwilioCall(Call[TwilioOutputDevice]):
                 self.receive_audio(b"\xff" * bytes_to_fill)
             self.latest_media_timestamp = int(media["timestamp"])
             self.receive_audio(chunk)
+        elif data["event"] == "mark":
+            assert isinstance(self.output_device, TwilioOutputDevice)
+            self.output_device.handle_mark(data["mark"]["name"])
         elif data["event"] == "stop":
             self.logger.debug(f"Media WS: Received event 'stop': {message}")
             self.logger.debug("Stopping...")
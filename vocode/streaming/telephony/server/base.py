@@ -36,7 +36,9 @@ from vocode.streaming.telephony.templater import Templater
 from vocode.streaming.transcriber.base_transcriber import BaseTranscriber
 from vocode.streaming.transcriber.factory import TranscriberFactory
 from vocode.streaming.utils import create_conversation_id
+from vocode.streaming.utils.embedding_service import save_embedding_caches
 from vocode.streaming.utils.events_manager import EventsManager
+from vocode.streaming.utils.openai_client import close_openai_clients
 
 
 class AbstractInboundCallConfig(BaseModel, abc.ABC):
@@ -101,7 +103,13 @@ class TelephonyServer:
 
         self.router.add_api_route("/recordings/{conversation_id}", self.recordings, methods=["GET", "POST"])
         self.logger.info(f"Set up recordings endpoint at https://{self.base_url}/recordings/{{conversation_id}}")
+        # runs when the app that includes the router shuts down
+        self.router.add_event_handler("shutdown", self.shutdown)
  
+    async def shutdown(self):
+        save_embedding_caches()
+        await close_openai_clients()
+
     def events(self, request: Request):
         return Response()
 
@@ -3,12 +3,14 @@ import json
 import logging
 from typing import Optional
 import websockets
-import audioop
 import numpy as np
 from urllib.parse import urlencode
 from vocode import getenv
 
-from vocode.streaming.models.transcriber import AssemblyAITranscriberConfig
+from vocode.streaming.models.transcriber import (
+    AssemblyAITranscriberConfig,
+    LocalEndpointingConfig,
+)
 from vocode.streaming.models.websocket import AudioMessage
 from vocode.streaming.transcriber.base_transcriber import (
     BaseAsyncTranscriber,
@@ -16,6 +18,7 @@ from vocode.streaming.transcriber.base_transcriber import (
     meter,
 )
 from vocode.streaming.models.audio_encoding import AudioEncoding
+from vocode.streaming.utils.audio_converter import mulaw_to_linear16
 
 
 ASSEMBLY_AI_URL = "wss://api.assemblyai.com/v2/realtime/ws"
@@ -54,7 +57,9 @@ class AssemblyAITranscriber(BaseAsyncTranscriber[AssemblyAITranscriberConfig]):
             )
         self._ended = False
         self.logger = logger or logging.getLogger(__name__)
-        if self.transcriber_config.endpointing_config:
+        if self.transcriber_config.endpointing_config and not isinstance(
+            self.transcriber_config.endpointing_config, LocalEndpointingConfig
+        ):
             raise Exception("Assembly AI endpointing config not supported yet")
 
         self.buffer = bytearray()
@@ -69,11 +74,10 @@ class AssemblyAITranscriber(BaseAsyncTranscriber[AssemblyAITranscriberConfig]):
 
     def send_audio(self, chunk):
         if self.transcriber_config.audio_encoding == AudioEncoding.MULAW:
-            sample_width = 1
             if isinstance(chunk, np.ndarray):
                 chunk = chunk.astype(np.int16)
                 chunk = chunk.tobytes()
-            chunk = audioop.ulaw2lin(chunk, sample_width)
+            chunk = mulaw_to_linear16(chunk)
 
         self.buffer.extend(chunk)
 
@@ -1,19 +1,20 @@
 from __future__ import annotations
 
 import asyncio
-import audioop
 from opentelemetry import trace, metrics
-from typing import Generic, TypeVar, Union
+from typing import Dict, Generic, TypeVar, Union
 from vocode.streaming.models.audio_encoding import AudioEncoding
 from vocode.streaming.models.model import BaseModel
 
 from vocode.streaming.models.transcriber import TranscriberConfig
+from vocode.streaming.utils.audio_converter import linear16_to_mulaw
 from vocode.streaming.utils.worker import AsyncWorker, ThreadAsyncWorker
 
 
 tracer = trace.get_tracer(__name__)
 meter = metrics.get_meter(__name__)
 
+
 class Transcription(BaseModel):
     message: str
     confidence: float
@@ -31,6 +32,7 @@ class AbstractTranscriber(Generic[TranscriberConfigType]):
     def __init__(self, transcriber_config: TranscriberConfigType):
         self.transcriber_config = transcriber_config
         self.is_muted = False
+        self.silent_chunks: Dict[int, bytes] = {}
 
     def mute(self):
         self.is_muted = True
@@ -44,12 +46,27 @@ class AbstractTranscriber(Generic[TranscriberConfigType]):
     async def ready(self):
         return True
 
+    def send_audio(self, chunk):
+        raise NotImplementedError
+
+    def send_keepalive(self):
+        """Keeps the connection open while no audio is being sent
+
+        Sends a chunk of silence, transcribers override this with their provider's keepalive message
+        """
+        self.send_audio(self.create_silent_chunk(self.transcriber_config.chunk_size))
+
     def create_silent_chunk(self, chunk_size, sample_width=2):
-        linear_audio = b"\0" * chunk_size
-        if self.get_transcriber_config().audio_encoding == AudioEncoding.LINEAR16:
-            return linear_audio
-        elif self.get_transcriber_config().audio_encoding == AudioEncoding.MULAW:
-            return audioop.lin2ulaw(linear_audio, sample_width)
+        # the chunks are all the same size, so only create each one once
+        if chunk_size not in self.silent_chunks:
+            if self.get_transcriber_config().audio_encoding == AudioEncoding.MULAW:
+                # one byte per sample
+                self.silent_chunks[chunk_size] = linear16_to_mulaw(
+                    b"\0" * chunk_size * 2
+                )
+            else:
+                self.silent_chunks[chunk_size] = b"\0" * chunk_size
+        return self.silent_chunks[chunk_size]
 
 
 class BaseAsyncTranscriber(AbstractTranscriber[TranscriberConfigType], AsyncWorker):
@@ -4,7 +4,6 @@ import logging
 from typing import Optional
 import websockets
 from websockets.client import WebSocketClientProtocol
-import audioop
 from urllib.parse import urlencode
 from vocode import getenv
 
@@ -17,10 +16,12 @@ from vocode.streaming.models.transcriber import (
     DeepgramTranscriberConfig,
     EndpointingConfig,
     EndpointingType,
+    LocalEndpointingConfig,
     PunctuationEndpointingConfig,
     TimeEndpointingConfig,
 )
 from vocode.streaming.models.audio_encoding import AudioEncoding
+from vocode.streaming.utils.audio_converter import StreamingAudioConverter
 
 
 PUNCTUATION_TERMINATORS = [".", "!", "?"]
@@ -62,6 +63,16 @@ class DeepgramTranscriber(BaseAsyncTranscriber[DeepgramTranscriberConfig]):
         self.is_ready = False
         self.logger = logger or logging.getLogger(__name__)
         self.audio_cursor = 0.0
+        self.downsampler: Optional[StreamingAudioConverter] = None
+        if (
+            self.transcriber_config.downsampling
+            and self.transcriber_config.audio_encoding == AudioEncoding.LINEAR16
+        ):
+            self.downsampler = StreamingAudioConverter(
+                input_sampling_rate=self.transcriber_config.sampling_rate
+                * self.transcriber_config.downsampling,
+                output_sampling_rate=self.transcriber_config.sampling_rate,
+            )
 
     async def _run_loop(self):
         restarts = 0
@@ -73,21 +84,13 @@ class DeepgramTranscriber(BaseAsyncTranscriber[DeepgramTranscriberConfig]):
             )
 
     def send_audio(self, chunk):
-        if (
-            self.transcriber_config.downsampling
-            and self.transcriber_config.audio_encoding == AudioEncoding.LINEAR16
-        ):
-            chunk, _ = audioop.ratecv(
-                chunk,
-                2,
-                1,
-                self.transcriber_config.sampling_rate
-                * self.transcriber_config.downsampling,
-                self.transcriber_config.sampling_rate,
-                None,
-            )
+        if self.downsampler:
+            chunk = self.downsampler.convert(chunk)
         super().send_audio(chunk)
 
+    def send_keepalive(self):
+        self.input_queue.put_nowait(json.dumps({"type": "KeepAlive"}))
+
     def terminate(self):
         terminate_msg = json.dumps({"type": "CloseStream"})
         self.input_queue.put_nowait(terminate_msg)
@@ -116,10 +119,9 @@ class DeepgramTranscriber(BaseAsyncTranscriber[DeepgramTranscriberConfig]):
             extra_params["version"] = self.transcriber_config.version
         if self.transcriber_config.keywords:
             extra_params["keywords"] = self.transcriber_config.keywords
-        if (
-            self.transcriber_config.endpointing_config
-            and self.transcriber_config.endpointing_config.type
-            == EndpointingType.PUNCTUATION_BASED
+        if self.transcriber_config.endpointing_config and (
+            self.transcriber_config.endpointing_config.type
+            in (EndpointingType.PUNCTUATION_BASED, EndpointingType.LOCAL)
         ):
             extra_params["punctuate"] = "true"
         url_params.update(extra_params)
@@ -131,7 +133,10 @@ class DeepgramTranscriber(BaseAsyncTranscriber[DeepgramTranscriberConfig]):
         transcript = deepgram_response["channel"]["alternatives"][0]["transcript"]
 
         # if it is not time based, then return true if speech is final and there is a transcript
-        if not self.transcriber_config.endpointing_config:
+        # local endpointing happens after the transcriber, deepgram's endpoint is the fallback
+        if not self.transcriber_config.endpointing_config or isinstance(
+            self.transcriber_config.endpointing_config, LocalEndpointingConfig
+        ):
             return transcript and deepgram_response["speech_final"]
         elif isinstance(
             self.transcriber_config.endpointing_config, TimeEndpointingConfig
@@ -181,13 +186,15 @@ class DeepgramTranscriber(BaseAsyncTranscriber[DeepgramTranscriberConfig]):
                         data = await asyncio.wait_for(self.input_queue.get(), 5)
                     except asyncio.exceptions.TimeoutError:
                         break
-                    num_channels = 1
-                    sample_width = 2
-                    self.audio_cursor += len(data) / (
-                        self.transcriber_config.sampling_rate
-                        * num_channels
-                        * sample_width
-                    )
+                    # control messages like KeepAlive don't carry audio
+                    if isinstance(data, bytes):
+                        num_channels = 1
+                        sample_width = 2
+                        self.audio_cursor += len(data) / (
+                            self.transcriber_config.sampling_rate
+                            * num_channels
+                            * sample_width
+                        )
                     await ws.send(data)
                 self.logger.debug("Terminating Deepgram transcriber sender")
 
@@ -250,9 +257,15 @@ class DeepgramTranscriber(BaseAsyncTranscriber[DeepgramTranscriberConfig]):
                         num_buffer_utterances = 1
                         time_silent = 0
                     elif top_choice["transcript"] and confidence > 0.0:
+                        # include the words that aren't final yet, so that the interim
+                        # transcription keeps up with the speech
                         self.output_queue.put_nowait(
                             Transcription(
-                                message=buffer,
+                                message=buffer
+                                if is_final
+                                else " ".join(
+                                    filter(None, [buffer, top_choice["transcript"]])
+                                ),
                                 confidence=confidence,
                                 is_final=False,
                             )
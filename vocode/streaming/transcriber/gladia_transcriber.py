@@ -4,18 +4,21 @@ import base64
 import logging
 from typing import Optional
 import websockets
-import audioop
 import numpy as np
 from urllib.parse import urlencode
 from vocode import getenv
 
-from vocode.streaming.models.transcriber import GladiaTranscriberConfig
+from vocode.streaming.models.transcriber import (
+    GladiaTranscriberConfig,
+    LocalEndpointingConfig,
+)
 from vocode.streaming.models.websocket import AudioMessage
 from vocode.streaming.transcriber.base_transcriber import (
     BaseAsyncTranscriber,
     Transcription,
 )
 from vocode.streaming.models.audio_encoding import AudioEncoding
+from vocode.streaming.utils.audio_converter import mulaw_to_linear16
 
 
 GLADIA_URL = "wss://api.gladia.io/audio/text/audio-transcription"
@@ -36,7 +39,9 @@ class GladiaTranscriber(BaseAsyncTranscriber[GladiaTranscriberConfig]):
             )
         self._ended = False
         self.logger = logger or logging.getLogger(__name__)
-        if self.transcriber_config.endpointing_config:
+        if self.transcriber_config.endpointing_config and not isinstance(
+            self.transcriber_config.endpointing_config, LocalEndpointingConfig
+        ):
             raise Exception("Gladia endpointing config not supported yet")
 
         self.buffer = bytearray()
@@ -49,11 +54,10 @@ class GladiaTranscriber(BaseAsyncTranscriber[GladiaTranscriberConfig]):
 
     def send_audio(self, chunk):
         if self.transcriber_config.audio_encoding == AudioEncoding.MULAW:
-            sample_width = 1
             if isinstance(chunk, np.ndarray):
                 chunk = chunk.astype(np.int16)
                 chunk = chunk.tobytes()
-            chunk = audioop.ulaw2lin(chunk, sample_width)
+            chunk = mulaw_to_linear16(chunk)
 
         self.buffer.extend(chunk)
 
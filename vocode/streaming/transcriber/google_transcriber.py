@@ -12,7 +12,10 @@ from vocode.streaming.transcriber.base_transcriber import (
     BaseThreadAsyncTranscriber,
     Transcription,
 )
-from vocode.streaming.models.transcriber import GoogleTranscriberConfig
+from vocode.streaming.models.transcriber import (
+    GoogleTranscriberConfig,
+    LocalEndpointingConfig,
+)
 from vocode.streaming.utils import create_loop_in_thread
 
 
@@ -35,7 +38,9 @@ class GoogleTranscriber(BaseThreadAsyncTranscriber[GoogleTranscriberConfig]):
         self.google_streaming_config = self.create_google_streaming_config()
         self.client = self.speech.SpeechClient()
         self.is_ready = False
-        if self.transcriber_config.endpointing_config:
+        if self.transcriber_config.endpointing_config and not isinstance(
+            self.transcriber_config.endpointing_config, LocalEndpointingConfig
+        ):
             raise Exception("Google endpointing config not supported yet")
 
     def create_google_streaming_config(self):
@@ -0,0 +1,214 @@
+import asyncio
+import logging
+import time
+from typing import List, Optional
+
+from opentelemetry import metrics
+
+from vocode.streaming.models.transcriber import LocalEndpointingConfig
+from vocode.streaming.transcriber.base_transcriber import (
+    BaseTranscriber,
+    Transcription,
+)
+from vocode.streaming.transcriber.deepgram_transcriber import PUNCTUATION_TERMINATORS
+from vocode.streaming.utils.worker import AsyncQueueWorker
+from vocode.streaming.vad_utils import SpeechEvent, SpeechEventType
+
+# bounds of the factor that the cutoffs are scaled by for slow or fast callers
+MIN_SPEAKING_RATE_SCALE = 0.5
+MAX_SPEAKING_RATE_SCALE = 2.0
+# weight of the latest turn in the caller's average speaking rate
+SPEAKING_RATE_SMOOTHING = 0.3
+# turns shorter than this don't say much about the speaking rate
+MIN_SPEAKING_RATE_TURN_SECONDS = 0.5
+
+meter = metrics.get_meter(__name__)
+local_finals_counter = meter.create_counter(
+    name="transcriber.endpointing.local_finals",
+    unit="transcriptions",
+)
+latency_saved_histogram = meter.create_histogram(
+    name="transcriber.endpointing.latency_saved",
+    unit="seconds",
+)
+
+
+class LocalEndpointingWorker(AsyncQueueWorker):
+    """Sits between a transcriber and the TranscriptionsWorker and ends turns locally
+
+    While the transcriber config has a LocalEndpointingConfig, a final transcription is
+    emitted as soon as the human has been silent for long enough, which is shorter if the
+    interim transcription ends in terminal punctuation and longer for slow speakers. The
+    provider's final transcription then only carries the words the local one didn't have.
+    Otherwise transcriptions are passed through unchanged.
+    """
+
+    def __init__(
+        self,
+        input_queue: asyncio.Queue[Transcription],
+        output_queue: asyncio.Queue[Transcription],
+        transcriber: BaseTranscriber,
+        logger: Optional[logging.Logger] = None,
+    ):
+        super().__init__(input_queue, output_queue)
+        self.transcriber = transcriber
+        self.logger = logger or logging.getLogger(__name__)
+        # words that were emitted locally since the provider's last final transcription
+        self.emitted_words: List[str] = []
+        self.local_final_time: Optional[float] = None
+        # the current turn, without the emitted words
+        self.turn_words: List[str] = []
+        self.turn_confidence = 0.0
+        self.turn_start_time = 0.0
+        self.turn_start_num_words = 0
+        self.last_text_change_time = 0.0
+        # None until the first VAD event, silence is then measured from the transcriptions
+        self.is_speaking: Optional[bool] = None
+        self.silence_start_time: Optional[float] = None
+        self.endpoint_task: Optional[asyncio.Task] = None
+        self.words_per_second: Optional[float] = None
+
+    def get_endpointing_config(self) -> Optional[LocalEndpointingConfig]:
+        # read on every use, so that it can be changed during the conversation
+        endpointing_config = (
+            self.transcriber.get_transcriber_config().endpointing_config
+        )
+        if isinstance(endpointing_config, LocalEndpointingConfig):
+            return endpointing_config
+        return None
+
+    async def process(self, transcription: Transcription):
+        if self.get_endpointing_config() is None and not self.emitted_words:
+            self.produce_nonblocking(transcription)
+            return
+        if transcription.is_final:
+            self.handle_provider_final(transcription)
+        else:
+            self.handle_interim(transcription)
+
+    def handle_interim(self, transcription: Transcription):
+        words = transcription.message.split()[len(self.emitted_words) :]
+        if not words:
+            return
+        now = time.time()
+        if words != self.turn_words:
+            if not self.turn_words:
+                self.turn_start_time = now
+                self.turn_start_num_words = len(words)
+            self.turn_words = words
+            self.last_text_change_time = now
+            if self.is_speaking is None:
+                self.silence_start_time = now
+        self.turn_confidence = transcription.confidence
+        self.produce_nonblocking(
+            Transcription(
+                message=" ".join(words),
+                confidence=transcription.confidence,
+                is_final=False,
+            )
+        )
+        self.schedule_endpoint()
+
+    def handle_provider_final(self, transcription: Transcription):
+        self.cancel_endpoint()
+        words = transcription.message.split()[len(self.emitted_words) :]
+        if self.local_final_time is not None:
+            latency_saved_histogram.record(time.time() - self.local_final_time)
+        if words:
+            self.produce_nonblocking(
+                Transcription(
+                    message=" ".join(words),
+                    confidence=transcription.confidence,
+                    is_final=True,
+                )
+            )
+        self.emitted_words = []
+        self.local_final_time = None
+        self.turn_words = []
+
+    def handle_speech_event(self, speech_event: SpeechEvent):
+        if speech_event.type == SpeechEventType.START:
+            self.is_speaking = True
+            self.silence_start_time = None
+            self.cancel_endpoint()
+            return
+        self.is_speaking = False
+        # the VAD reports the end of speech once it has seen min_silence_duration_ms of silence
+        vad_config = self.transcriber.get_transcriber_config().vad_config
+        silence_seconds = vad_config.min_silence_duration_ms / 1000 if vad_config else 0
+        self.silence_start_time = time.time() - silence_seconds
+        self.schedule_endpoint()
+
+    def get_time_cutoff_seconds(self, endpointing_config: LocalEndpointingConfig):
+        if self.turn_words[-1][-1] in PUNCTUATION_TERMINATORS:
+            time_cutoff_seconds = endpointing_config.punctuation_time_cutoff_seconds
+        else:
+            time_cutoff_seconds = endpointing_config.time_cutoff_seconds
+        if (
+            endpointing_config.reference_words_per_second is None
+            or self.words_per_second is None
+        ):
+            return time_cutoff_seconds
+        speaking_rate_scale = (
+            endpointing_config.reference_words_per_second / self.words_per_second
+        )
+        return time_cutoff_seconds * min(
+            max(speaking_rate_scale, MIN_SPEAKING_RATE_SCALE), MAX_SPEAKING_RATE_SCALE
+        )
+
+    def schedule_endpoint(self):
+        self.cancel_endpoint()
+        endpointing_config = self.get_endpointing_config()
+        if (
+            endpointing_config is None
+            or not self.turn_words
+            or self.is_speaking
+            or self.silence_start_time is None
+        ):
+            return
+        endpoint_time = self.silence_start_time + self.get_time_cutoff_seconds(
+            endpointing_config
+        )
+        self.endpoint_task = asyncio.create_task(
+            self.emit_local_final_at(endpoint_time)
+        )
+
+    def cancel_endpoint(self):
+        if self.endpoint_task is not None:
+            self.endpoint_task.cancel()
+            self.endpoint_task = None
+
+    async def emit_local_final_at(self, endpoint_time: float):
+        await asyncio.sleep(max(endpoint_time - time.time(), 0))
+        self.endpoint_task = None
+        self.logger.debug(f"Local endpoint after: {' '.join(self.turn_words)}")
+        self.produce_nonblocking(
+            Transcription(
+                message=" ".join(self.turn_words),
+                confidence=self.turn_confidence,
+                is_final=True,
+            )
+        )
+        local_finals_counter.add(1)
+        self.update_words_per_second()
+        self.emitted_words += self.turn_words
+        self.local_final_time = time.time()
+        self.turn_words = []
+
+    def update_words_per_second(self):
+        turn_seconds = self.last_text_change_time - self.turn_start_time
+        if turn_seconds < MIN_SPEAKING_RATE_TURN_SECONDS:
+            return
+        turn_words_per_second = (
+            len(self.turn_words) - self.turn_start_num_words
+        ) / turn_seconds
+        if self.words_per_second is None:
+            self.words_per_second = turn_words_per_second
+        else:
+            self.words_per_second += SPEAKING_RATE_SMOOTHING * (
+                turn_words_per_second - self.words_per_second
+            )
+
+    def terminate(self):
+        self.cancel_endpoint()
+        return super().terminate()
@@ -1,11 +1,11 @@
 import asyncio
-import audioop
 import secrets
 from typing import Any
 import wave
 from string import ascii_letters, digits
 
 from ..models.audio_encoding import AudioEncoding
+from .audio_converter import StreamingAudioConverter
 
 custom_alphabet = ascii_letters + digits + ".-_"
 
@@ -24,16 +24,13 @@ def convert_linear_audio(
     output_encoding=AudioEncoding.LINEAR16,
     output_sample_width=2,
 ):
-    # downsample
-    if input_sample_rate != output_sample_rate:
-        raw_wav, _ = audioop.ratecv(
-            raw_wav, 2, 1, input_sample_rate, output_sample_rate, None
-        )
-
-    if output_encoding == AudioEncoding.LINEAR16:
-        return raw_wav
-    elif output_encoding == AudioEncoding.MULAW:
-        return audioop.lin2ulaw(raw_wav, output_sample_width)
+    # a one-off conversion, so the whole input is the stream and it ends here
+    audio_converter = StreamingAudioConverter(
+        input_sampling_rate=input_sample_rate,
+        output_sampling_rate=output_sample_rate,
+        output_encoding=output_encoding,
+    )
+    return audio_converter.convert(raw_wav) + audio_converter.flush()
 
 
 def convert_wav(
@@ -61,6 +58,14 @@ def get_chunk_size_per_second(audio_encoding: AudioEncoding, sampling_rate: int)
         raise Exception("Unsupported audio encoding")
 
 
+def get_chunk_size(
+    audio_encoding: AudioEncoding, sampling_rate: int, seconds: float
+) -> int:
+    # whole samples only, so that a LINEAR16 chunk never splits a sample
+    bytes_per_sample = get_chunk_size_per_second(audio_encoding, 1)
+    return bytes_per_sample * int(sampling_rate * seconds)
+
+
 def create_conversation_id() -> str:
     return secrets.token_urlsafe(16)
 
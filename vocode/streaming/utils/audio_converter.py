@@ -0,0 +1,135 @@
+import math
+
+import numpy as np
+
+from vocode.streaming.models.audio_encoding import AudioEncoding
+
+# G.711 mu-law constants, as used by audioop
+MULAW_BIAS = 0x84
+MULAW_CLIP = 8159
+MULAW_SEGMENT_ENDS = np.array(
+    [0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF], dtype=np.int32
+)
+
+
+def _create_mulaw_decoding_table() -> np.ndarray:
+    inverted = ~np.arange(256, dtype=np.int32) & 0xFF
+    magnitude = (((inverted & 0x0F) << 3) + MULAW_BIAS) << ((inverted & 0x70) >> 4)
+    return np.where(
+        inverted & 0x80, MULAW_BIAS - magnitude, magnitude - MULAW_BIAS
+    ).astype(np.int16)
+
+
+def _create_mulaw_encoding_table() -> np.ndarray:
+    # indexed by the int16 sample reinterpreted as uint16
+    pcm = np.arange(65536, dtype=np.uint16).view(np.int16).astype(np.int32) >> 2
+    mask = np.where(pcm < 0, 0x7F, 0xFF)
+    magnitude = np.minimum(np.abs(pcm), MULAW_CLIP) + (MULAW_BIAS >> 2)
+    segment = np.searchsorted(MULAW_SEGMENT_ENDS, magnitude)
+    encoded = np.where(
+        segment >= 8,
+        0x7F,
+        (segment << 4) | ((magnitude >> (np.minimum(segment, 7) + 1)) & 0x0F),
+    )
+    return (encoded ^ mask).astype(np.uint8)
+
+
+MULAW_DECODING_TABLE = _create_mulaw_decoding_table()
+MULAW_ENCODING_TABLE = _create_mulaw_encoding_table()
+
+
+def mulaw_to_linear16(chunk: bytes) -> bytes:
+    return MULAW_DECODING_TABLE[np.frombuffer(chunk, dtype=np.uint8)].tobytes()
+
+
+def linear16_to_mulaw(chunk: bytes) -> bytes:
+    return MULAW_ENCODING_TABLE[np.frombuffer(chunk, dtype=np.uint16)].tobytes()
+
+
+class StreamingAudioConverter:
+    """Converts a stream of mono audio chunks between sampling rates and encodings
+
+    Create one per stream: the resampler carries its position and the last input sample
+    over from one chunk to the next, so chunk boundaries don't introduce artifacts and
+    the output length doesn't drift. Resampling is linear interpolation, like audioop.ratecv.
+    """
+
+    def __init__(
+        self,
+        input_sampling_rate: int,
+        output_sampling_rate: int,
+        input_encoding: AudioEncoding = AudioEncoding.LINEAR16,
+        output_encoding: AudioEncoding = AudioEncoding.LINEAR16,
+    ):
+        self.input_sampling_rate = input_sampling_rate
+        self.output_sampling_rate = output_sampling_rate
+        self.input_encoding = input_encoding
+        self.output_encoding = output_encoding
+        # positions are counted in ticks: an input sample lasts input_step ticks and
+        # an output sample output_step ticks, so that they are exact integers
+        divisor = math.gcd(input_sampling_rate, output_sampling_rate)
+        self.input_step = output_sampling_rate // divisor
+        self.output_step = input_sampling_rate // divisor
+        self.reset()
+
+    def reset(self):
+        self.previous_sample: np.ndarray = np.zeros(0, dtype=np.float32)
+        # position of the next output sample, relative to the first buffered input sample
+        self.next_output_position = 0
+
+    def _resample(self, samples: np.ndarray) -> np.ndarray:
+        buffered = np.concatenate([self.previous_sample, samples.astype(np.float32)])
+        if len(buffered) < 2:
+            self.previous_sample = buffered
+            return np.zeros(0, dtype=np.int16)
+        # an output sample needs the input samples on both sides of it
+        last_position = (len(buffered) - 1) * self.input_step
+        num_outputs = max(
+            0,
+            -(-(last_position - self.next_output_position) // self.output_step),
+        )
+        positions = (
+            self.next_output_position
+            + np.arange(num_outputs, dtype=np.int64) * self.output_step
+        )
+        indices = positions // self.input_step
+        fractions = (positions % self.input_step).astype(np.float32) / self.input_step
+        resampled = buffered[indices] + fractions * (
+            buffered[indices + 1] - buffered[indices]
+        )
+        self.next_output_position += num_outputs * self.output_step - last_position
+        self.previous_sample = buffered[-1:]
+        return np.clip(np.round(resampled), -32768, 32767).astype(np.int16)
+
+    def _encode(self, samples: np.ndarray) -> bytes:
+        if self.output_encoding == AudioEncoding.MULAW:
+            return MULAW_ENCODING_TABLE[samples.view(np.uint16)].tobytes()
+        return samples.tobytes()
+
+    def convert(self, chunk: bytes) -> bytes:
+        if self.input_encoding == AudioEncoding.MULAW:
+            samples = MULAW_DECODING_TABLE[np.frombuffer(chunk, dtype=np.uint8)]
+        else:
+            samples = np.frombuffer(chunk, dtype=np.int16)
+        if self.input_sampling_rate != self.output_sampling_rate:
+            samples = self._resample(samples)
+        return self._encode(samples)
+
+    def flush(self) -> bytes:
+        """Returns the output after the last input sample, at the end of the stream, and resets
+
+        The resampler holds back the output samples past the last input sample, since they
+        depend on the next chunk. At the end of the stream, they hold the last sample's value.
+        """
+        samples = np.zeros(0, dtype=np.int16)
+        if len(self.previous_sample) > 0:
+            # the last input sample lasts until input_step ticks after it
+            num_outputs = max(
+                0,
+                -(-(self.input_step - self.next_output_position) // self.output_step),
+            )
+            samples = np.full(
+                num_outputs, np.round(self.previous_sample[0]), dtype=np.int16
+            )
+        self.reset()
+        return self._encode(samples)
@@ -0,0 +1,288 @@
+import asyncio
+import logging
+import os
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple, Union
+
+import numpy as np
+from opentelemetry import metrics
+
+from vocode import getenv
+from vocode.streaming.utils.openai_client import (
+    OpenAIClient,
+    get_embedding_openai_client,
+    get_embedding_params,
+)
+
+# shared by every conversation, short utterances like "okay" repeat across all of them
+DEFAULT_MAX_CACHED_EMBEDDINGS = 8192
+# texts requested within this window of each other are embedded with one request
+DEFAULT_BATCH_WINDOW_SECONDS = 0.005
+DEFAULT_MAX_BATCH_SIZE = 100
+# new embeddings are written to disk at most this often
+SAVE_DELAY_SECONDS = 30.0
+
+logger = logging.getLogger(__name__)
+
+meter = metrics.get_meter(__name__)
+embedding_cache_hits_counter = meter.create_counter(
+    name="embedding_service.cache.hits",
+    unit="embeddings",
+)
+embedding_cache_misses_counter = meter.create_counter(
+    name="embedding_service.cache.misses",
+    unit="embeddings",
+)
+embedding_coalesced_counter = meter.create_counter(
+    name="embedding_service.coalesced",
+    unit="embeddings",
+)
+embedding_batch_size_histogram = meter.create_histogram(
+    name="embedding_service.batch_size",
+    unit="embeddings",
+)
+
+EmbeddingKey = Tuple[str, str]
+
+
+def normalize_embedding_text(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def get_embedding_model(embedding_params: Dict[str, str]) -> str:
+    return embedding_params.get("engine") or embedding_params["model"]
+
+
+class EmbeddingCache:
+    """LRU of float32 embeddings by model and normalized text, optionally persisted to a .npz file"""
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_CACHED_EMBEDDINGS,
+        path: Optional[str] = None,
+    ):
+        self.max_entries = max_entries
+        self.path = path
+        self.embeddings: "OrderedDict[EmbeddingKey, np.ndarray]" = OrderedDict()
+        self.save_task: Optional[asyncio.Task] = None
+        if path is not None and os.path.exists(path):
+            self.load()
+
+    def get(self, key: EmbeddingKey) -> Optional[np.ndarray]:
+        embedding = self.embeddings.get(key)
+        if embedding is not None:
+            self.embeddings.move_to_end(key)
+        return embedding
+
+    def put(self, key: EmbeddingKey, embedding: np.ndarray):
+        self.embeddings[key] = embedding
+        self.embeddings.move_to_end(key)
+        while len(self.embeddings) > self.max_entries:
+            self.embeddings.popitem(last=False)
+        if self.path is not None and (self.save_task is None or self.save_task.done()):
+            self.save_task = asyncio.create_task(self.save_later())
+
+    def load(self):
+        assert self.path is not None
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                for key, embedding in zip(data["keys"], data["embeddings"]):
+                    model, text = str(key).split("\n", 1)
+                    self.embeddings[(model, text)] = embedding.astype(np.float32)
+        except Exception as e:
+            logger.warning(f"Could not load embeddings from {self.path}: {e}")
+            return
+        while len(self.embeddings) > self.max_entries:
+            self.embeddings.popitem(last=False)
+
+    async def save_later(self):
+        await asyncio.sleep(SAVE_DELAY_SECONDS)
+        # snapshotted in the loop, so the cache can change while the file is written
+        items = list(self.embeddings.items())
+        await asyncio.get_running_loop().run_in_executor(None, self.write, items)
+
+    def save(self):
+        self.write(list(self.embeddings.items()))
+
+    def write(self, items: List[Tuple[EmbeddingKey, np.ndarray]]):
+        assert self.path is not None
+        if not items:
+            return
+        # np.savez appends .npz to paths without it
+        temp_path = f"{self.path}.{os.getpid()}.tmp.npz"
+        np.savez(
+            temp_path,
+            keys=np.array([f"{model}\n{text}" for (model, text), _ in items]),
+            embeddings=np.stack([embedding for _, embedding in items]),
+        )
+        os.replace(temp_path, self.path)
+
+
+class EmbeddingService:
+    """Creates embeddings through one OpenAI client, with caching, coalescing and batching
+
+    Embeddings are looked up in the shared EmbeddingCache first. A text that is already being
+    embedded waits for that request instead of making its own, and texts requested within
+    batch_window_seconds of each other are sent in one multi-input request. Texts are only
+    normalized for the cache key, the API gets the text of the first caller as it was passed.
+    """
+
+    def __init__(
+        self,
+        openai_client: OpenAIClient,
+        embedding_cache: EmbeddingCache,
+        batch_window_seconds: float = DEFAULT_BATCH_WINDOW_SECONDS,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+    ):
+        self.openai_client = openai_client
+        self.embedding_cache = embedding_cache
+        self.batch_window_seconds = batch_window_seconds
+        self.max_batch_size = max_batch_size
+        # futures belong to the loop that created them, so they are dropped when it changes
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.in_flight: Dict[EmbeddingKey, asyncio.Future] = {}
+        self.pending_batches: Dict[
+            Tuple[Tuple[str, str], ...], List[Tuple[EmbeddingKey, str, asyncio.Future]]
+        ] = {}
+        self.flush_handles: Dict[Tuple[Tuple[str, str], ...], asyncio.TimerHandle] = {}
+        self.batch_tasks: Set[asyncio.Task] = set()
+
+    def get_loop(self) -> asyncio.AbstractEventLoop:
+        loop = asyncio.get_running_loop()
+        if loop is not self.loop:
+            self.loop = loop
+            self.in_flight = {}
+            self.pending_batches = {}
+            self.flush_handles = {}
+        return loop
+
+    async def create_embedding(self, text: str, **embedding_params: str) -> np.ndarray:
+        return (await self.create_embeddings([text], **embedding_params))[0]
+
+    async def create_embeddings(
+        self, texts: List[str], **embedding_params: str
+    ) -> List[np.ndarray]:
+        """Returns one embedding per text, by default with the model from get_embedding_params"""
+        embedding_params = embedding_params or get_embedding_params()
+        model = get_embedding_model(embedding_params)
+        loop = self.get_loop()
+        results: List[Union[np.ndarray, asyncio.Future]] = []
+        for text in texts:
+            key = (model, normalize_embedding_text(text))
+            embedding = self.embedding_cache.get(key)
+            if embedding is not None:
+                embedding_cache_hits_counter.add(1)
+                results.append(embedding)
+                continue
+            future = self.in_flight.get(key)
+            if future is None:
+                embedding_cache_misses_counter.add(1)
+                future = self.enqueue(loop, key, text, embedding_params)
+            else:
+                embedding_coalesced_counter.add(1)
+            results.append(future)
+        # futures may be shared with other callers, so they must not be cancelled with this one
+        return [
+            result if isinstance(result, np.ndarray) else await asyncio.shield(result)
+            for result in results
+        ]
+
+    def enqueue(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        key: EmbeddingKey,
+        text: str,
+        embedding_params: Dict[str, str],
+    ) -> asyncio.Future:
+        future = loop.create_future()
+        self.in_flight[key] = future
+        batch_key = tuple(sorted(embedding_params.items()))
+        batch = self.pending_batches.setdefault(batch_key, [])
+        batch.append((key, text, future))
+        if len(batch) >= self.max_batch_size:
+            self.flush(batch_key, embedding_params)
+        elif batch_key not in self.flush_handles:
+            self.flush_handles[batch_key] = loop.call_later(
+                self.batch_window_seconds, self.flush, batch_key, embedding_params
+            )
+        return future
+
+    def flush(
+        self,
+        batch_key: Tuple[Tuple[str, str], ...],
+        embedding_params: Dict[str, str],
+    ):
+        flush_handle = self.flush_handles.pop(batch_key, None)
+        if flush_handle is not None:
+            flush_handle.cancel()
+        batch = self.pending_batches.pop(batch_key, [])
+        if not batch:
+            return
+        task = asyncio.create_task(self.create_batch(batch, embedding_params))
+        self.batch_tasks.add(task)
+        task.add_done_callback(self.batch_tasks.discard)
+
+    async def create_batch(
+        self,
+        batch: List[Tuple[EmbeddingKey, str, asyncio.Future]],
+        embedding_params: Dict[str, str],
+    ):
+        embedding_batch_size_histogram.record(len(batch))
+        try:
+            response = await self.openai_client.create_embedding(
+                input=[text for _, text, _ in batch], **embedding_params
+            )
+            embeddings: List[Optional[np.ndarray]] = [None] * len(batch)
+            for data in response["data"]:
+                embeddings[data["index"]] = np.array(
+                    data["embedding"], dtype=np.float32
+                )
+        except asyncio.CancelledError:
+            for key, _, future in batch:
+                self.in_flight.pop(key, None)
+                future.cancel()
+            raise
+        except Exception as e:
+            for key, _, future in batch:
+                self.in_flight.pop(key, None)
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (key, text, future), embedding in zip(batch, embeddings):
+            self.in_flight.pop(key, None)
+            if embedding is None:
+                future.set_exception(ValueError(f"No embedding returned for {text}"))
+                continue
+            self.embedding_cache.put(key, embedding)
+            if not future.done():
+                future.set_result(embedding)
+
+
+embedding_caches: Dict[Optional[str], EmbeddingCache] = {}
+embedding_services: Dict[OpenAIClient, EmbeddingService] = {}
+
+
+def get_embedding_cache(path: Optional[str] = None) -> EmbeddingCache:
+    """Returns the process-wide cache, persisted to EMBEDDING_CACHE_PATH if it is set"""
+    path = path or getenv("EMBEDDING_CACHE_PATH")
+    if path not in embedding_caches:
+        embedding_caches[path] = EmbeddingCache(path=path)
+    return embedding_caches[path]
+
+
+def get_embedding_service(
+    openai_client: Optional[OpenAIClient] = None,
+) -> EmbeddingService:
+    """Returns the process-wide service for a client, by default the embedding client"""
+    openai_client = openai_client or get_embedding_openai_client()
+    if openai_client not in embedding_services:
+        embedding_services[openai_client] = EmbeddingService(
+            openai_client, get_embedding_cache()
+        )
+    return embedding_services[openai_client]
+
+
+def save_embedding_caches():
+    for embedding_cache in embedding_caches.values():
+        if embedding_cache.path is not None:
+            embedding_cache.save()
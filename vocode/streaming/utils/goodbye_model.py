@@ -1,11 +1,16 @@
 import os
+import re
 import asyncio
-from typing import Optional
-import openai
+import difflib
+from typing import List, Optional
 import numpy as np
 import requests
 
-from vocode import getenv
+from vocode.streaming.utils.embedding_service import get_embedding_service
+from vocode.streaming.utils.openai_client import (
+    OpenAIClient,
+    get_embedding_openai_client,
+)
 
 SIMILARITY_THRESHOLD = 0.9
 EMBEDDING_SIZE = 1536
@@ -19,6 +24,47 @@ GOODBYE_PHRASES = [
     "have a good day",
     "have a good night",
 ]
+# the local model has no notion of meaning, so it is given more ways to say goodbye
+LOCAL_GOODBYE_PHRASES = GOODBYE_PHRASES + [
+    "have a nice day",
+    "have a great day",
+    "have a good one",
+    "take care",
+    "talk soon",
+    "catch you later",
+    "good night",
+    "that's all for now",
+    "that's all i needed",
+    "see you soon",
+    "see you tomorrow",
+    "talk to you tomorrow",
+    "have a good weekend",
+    "have a nice evening",
+]
+# how similar a word must be to a goodbye phrase's word, to tolerate transcription errors
+LOCAL_WORD_SIMILARITY_THRESHOLD = 0.75
+# words that a goodbye clause may start or end with, other words make it something else
+LOCAL_FILLER_WORDS = {
+    "okay",
+    "ok",
+    "alright",
+    "all",
+    "right",
+    "well",
+    "so",
+    "and",
+    "then",
+    "now",
+    "too",
+    "again",
+    "guys",
+}
+# spoken variants that transcribers write out
+LOCAL_WORD_VARIANTS = {"ya": "you", "u": "you", "nite": "night"}
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(re.sub(r"[^\w\s']", " ", text.lower()).split())
 
 
 class GoodbyeModel:
@@ -28,10 +74,13 @@ class GoodbyeModel:
             os.path.dirname(__file__), "goodbye_embeddings"
         ),
         openai_api_key: Optional[str] = None,
+        openai_client: Optional[OpenAIClient] = None,
     ):
-        openai.api_key = openai_api_key or getenv("OPENAI_API_KEY")
-        if not openai.api_key:
-            raise ValueError("OPENAI_API_KEY must be set in environment or passed in")
+        self.openai_client = openai_client or get_embedding_openai_client(
+            openai_api_key
+        )
+        # shared across conversations, goodbyes are phrased the same way by every caller
+        self.embedding_service = get_embedding_service(self.openai_client)
         self.embeddings_cache_path = embeddings_cache_path
         self.goodbye_embeddings: Optional[np.ndarray] = None
 
@@ -50,11 +99,9 @@ class GoodbyeModel:
 
     async def create_embeddings(self):
         print("Creating embeddings...")
-        size = EMBEDDING_SIZE
-        embeddings = np.empty((size, len(GOODBYE_PHRASES)))
-        for i, goodbye_phrase in enumerate(GOODBYE_PHRASES):
-            embeddings[:, i] = await self.create_embedding(goodbye_phrase)
-        return embeddings
+        return np.stack(
+            await self.embedding_service.create_embeddings(GOODBYE_PHRASES)
+        ).T
 
     async def is_goodbye(self, text: str) -> bool:
         assert self.goodbye_embeddings is not None, "Embeddings not initialized"
@@ -65,18 +112,60 @@ class GoodbyeModel:
         return np.max(similarity_results) > SIMILARITY_THRESHOLD
 
     async def create_embedding(self, text) -> np.ndarray:
-        params = {
-            "input": text,
-        }
+        return await self.embedding_service.create_embedding(text)
 
-        engine = getenv("AZURE_OPENAI_TEXT_EMBEDDING_ENGINE")
-        if engine:
-            params["engine"] = engine
-        else:
-            params["model"] = "text-embedding-ada-002"
 
-        return np.array(
-            (await openai.Embedding.acreate(**params))["data"][0]["embedding"]
+class LocalGoodbyeModel:
+    """Detects goodbyes without network requests, by matching clauses word by word
+
+    A clause of a message is a goodbye if it contains a known goodbye phrase, with each word
+    allowed small transcription errors, and any other words are fillers like "okay" or "now".
+    So "talk to ya later" and "okay take care now" are goodbyes, but "take care of it" and
+    "see you there" aren't. It takes microseconds, so it always finishes within the time that
+    the conversation waits for goodbye detection.
+    """
+
+    def __init__(self, goodbye_phrases: List[str] = LOCAL_GOODBYE_PHRASES):
+        self.goodbye_phrase_words = [
+            self.get_words(goodbye_phrase) for goodbye_phrase in goodbye_phrases
+        ]
+
+    async def initialize_embeddings(self):
+        pass
+
+    @staticmethod
+    def get_words(text: str) -> List[str]:
+        return [
+            LOCAL_WORD_VARIANTS.get(word, word) for word in normalize_text(text).split()
+        ]
+
+    @staticmethod
+    def words_match(word: str, goodbye_word: str) -> bool:
+        return (
+            word == goodbye_word
+            or difflib.SequenceMatcher(None, word, goodbye_word).ratio()
+            >= LOCAL_WORD_SIMILARITY_THRESHOLD
+        )
+
+    def is_goodbye_clause(self, words: List[str]) -> bool:
+        for goodbye_words in self.goodbye_phrase_words:
+            for start in range(len(words) - len(goodbye_words) + 1):
+                end = start + len(goodbye_words)
+                if all(
+                    word in LOCAL_FILLER_WORDS for word in words[:start] + words[end:]
+                ) and all(
+                    self.words_match(word, goodbye_word)
+                    for word, goodbye_word in zip(words[start:end], goodbye_words)
+                ):
+                    return True
+        return False
+
+    async def is_goodbye(self, text: str) -> bool:
+        if "bye" in text.lower():
+            return True
+        return any(
+            self.is_goodbye_clause(self.get_words(clause))
+            for clause in re.split(r"[.!?,;]", text)
         )
 
 
@@ -0,0 +1,164 @@
+import asyncio
+from typing import Any, Dict, Optional, Tuple
+
+import aiohttp
+import openai
+
+from vocode import getenv
+
+OPENAI_API_BASE = "https://api.openai.com/v1"
+OPENAI_API_TYPE = "open_ai"
+AZURE_OPENAI_API_TYPE = "azure"
+AZURE_OPENAI_DEFAULT_API_VERSION = "2023-03-15-preview"
+OPENAI_DEFAULT_EMBEDDING_MODEL = "text-embedding-ada-002"
+# connections per client, shared by every conversation that uses the same endpoint
+OPENAI_CLIENT_DEFAULT_MAX_CONNECTIONS = 200
+OPENAI_CLIENT_DEFAULT_KEEPALIVE_TIMEOUT_SECONDS = 30
+
+
+class OpenAIClient:
+    """Calls one OpenAI or Azure OpenAI endpoint with its own credentials and connection pool
+
+    Requests pass the credentials explicitly instead of reading the global openai module
+    settings, so clients for different endpoints can be used concurrently in one process.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        api_base: str = OPENAI_API_BASE,
+        api_type: str = OPENAI_API_TYPE,
+        api_version: Optional[str] = None,
+        max_connections: int = OPENAI_CLIENT_DEFAULT_MAX_CONNECTIONS,
+        keepalive_timeout_seconds: float = OPENAI_CLIENT_DEFAULT_KEEPALIVE_TIMEOUT_SECONDS,
+    ):
+        self.api_key = api_key
+        self.api_base = api_base
+        self.api_type = api_type
+        self.api_version = api_version
+        self.max_connections = max_connections
+        self.keepalive_timeout_seconds = keepalive_timeout_seconds
+        # created on first use, in the event loop that uses it
+        self.aiohttp_session: Optional[aiohttp.ClientSession] = None
+        self.aiohttp_session_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def is_azure(self) -> bool:
+        return self.api_type == AZURE_OPENAI_API_TYPE
+
+    def get_credentials(self) -> Dict[str, Any]:
+        return {
+            "api_key": self.api_key,
+            "api_base": self.api_base,
+            "api_type": self.api_type,
+            "api_version": self.api_version,
+        }
+
+    def get_aiohttp_session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if (
+            self.aiohttp_session is None
+            or self.aiohttp_session.closed
+            or self.aiohttp_session_loop is not loop
+        ):
+            self.aiohttp_session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.max_connections,
+                    keepalive_timeout=self.keepalive_timeout_seconds,
+                )
+            )
+            self.aiohttp_session_loop = loop
+        return self.aiohttp_session
+
+    async def _acreate(self, api_resource, **params):
+        # the openai module takes the session from a context variable, set it for this call only
+        token = openai.aiosession.set(self.get_aiohttp_session())
+        try:
+            return await api_resource.acreate(**self.get_credentials(), **params)
+        finally:
+            openai.aiosession.reset(token)
+
+    async def create_chat_completion(self, **params):
+        return await self._acreate(openai.ChatCompletion, **params)
+
+    async def create_completion(self, **params):
+        return await self._acreate(openai.Completion, **params)
+
+    async def create_embedding(self, **params):
+        return await self._acreate(openai.Embedding, **params)
+
+    async def close(self):
+        if self.aiohttp_session is not None and not self.aiohttp_session.closed:
+            await self.aiohttp_session.close()
+
+
+OpenAIClientKey = Tuple[str, str, str, Optional[str]]
+openai_clients: Dict[OpenAIClientKey, OpenAIClient] = {}
+
+
+def get_openai_client(
+    api_key: str,
+    api_base: str = OPENAI_API_BASE,
+    api_type: str = OPENAI_API_TYPE,
+    api_version: Optional[str] = None,
+    max_connections: int = OPENAI_CLIENT_DEFAULT_MAX_CONNECTIONS,
+    keepalive_timeout_seconds: float = OPENAI_CLIENT_DEFAULT_KEEPALIVE_TIMEOUT_SECONDS,
+) -> OpenAIClient:
+    """Returns the process-wide client for an endpoint and credentials
+
+    The connection limits only apply when the client is created by the first call.
+    """
+    key = (api_type, api_base, api_key, api_version)
+    if key not in openai_clients:
+        openai_clients[key] = OpenAIClient(
+            api_key=api_key,
+            api_base=api_base,
+            api_type=api_type,
+            api_version=api_version,
+            max_connections=max_connections,
+            keepalive_timeout_seconds=keepalive_timeout_seconds,
+        )
+    return openai_clients[key]
+
+
+def get_default_openai_client(openai_api_key: Optional[str] = None) -> OpenAIClient:
+    api_key = openai_api_key or getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise ValueError("OPENAI_API_KEY must be set in environment or passed in")
+    return get_openai_client(api_key=api_key)
+
+
+def get_azure_openai_client(
+    api_type: str = AZURE_OPENAI_API_TYPE,
+    api_version: Optional[str] = AZURE_OPENAI_DEFAULT_API_VERSION,
+) -> OpenAIClient:
+    api_base = getenv("AZURE_OPENAI_API_BASE")
+    api_key = getenv("AZURE_OPENAI_API_KEY")
+    if not api_base or not api_key:
+        raise ValueError(
+            "AZURE_OPENAI_API_BASE and AZURE_OPENAI_API_KEY must be set in environment"
+        )
+    return get_openai_client(
+        api_key=api_key, api_base=api_base, api_type=api_type, api_version=api_version
+    )
+
+
+def get_embedding_openai_client(
+    openai_api_key: Optional[str] = None,
+) -> OpenAIClient:
+    """The client for embeddings, Azure if AZURE_OPENAI_TEXT_EMBEDDING_ENGINE is set"""
+    if getenv("AZURE_OPENAI_TEXT_EMBEDDING_ENGINE"):
+        return get_azure_openai_client()
+    return get_default_openai_client(openai_api_key)
+
+
+def get_embedding_params() -> Dict[str, str]:
+    engine = getenv("AZURE_OPENAI_TEXT_EMBEDDING_ENGINE")
+    if engine:
+        return {"engine": engine}
+    return {"model": OPENAI_DEFAULT_EMBEDDING_MODEL}
+
+
+async def close_openai_clients():
+    for openai_client in openai_clients.values():
+        await openai_client.close()
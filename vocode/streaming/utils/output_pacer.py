@@ -0,0 +1,123 @@
+import asyncio
+import heapq
+import itertools
+import math
+import weakref
+from typing import List, Optional, Tuple
+
+DEFAULT_OUTPUT_PACER_TICK_SECONDS = 0.005
+
+
+class OutputPacer:
+    """Releases the output audio of every conversation on one shared monotonic clock
+
+    Waiters are woken by a single timer instead of one asyncio.sleep per chunk per
+    conversation. Deadlines are rounded down to a tick, so that all the streams that are due
+    around the same time are released in the same event loop iteration, at most a tick early.
+    """
+
+    def __init__(self, tick_seconds: float = DEFAULT_OUTPUT_PACER_TICK_SECONDS):
+        self.tick_seconds = tick_seconds
+        self.loop = asyncio.get_running_loop()
+        self.waiters: List[Tuple[float, int, asyncio.Future]] = []
+        self.waiter_ids = itertools.count()
+        self.wakeup_handle: Optional[asyncio.TimerHandle] = None
+        self.wakeup_time: Optional[float] = None
+
+    def time(self) -> float:
+        return self.loop.time()
+
+    async def wait_until(self, deadline: float):
+        deadline = math.floor(deadline / self.tick_seconds) * self.tick_seconds
+        if deadline <= self.time():
+            return
+        future = self.loop.create_future()
+        heapq.heappush(self.waiters, (deadline, next(self.waiter_ids), future))
+        if self.wakeup_time is None or deadline < self.wakeup_time:
+            self._schedule_wakeup(deadline)
+        await future
+
+    def _schedule_wakeup(self, wakeup_time: float):
+        if self.wakeup_handle is not None:
+            self.wakeup_handle.cancel()
+        self.wakeup_time = wakeup_time
+        self.wakeup_handle = self.loop.call_at(wakeup_time, self._wake_up)
+
+    def _wake_up(self):
+        self.wakeup_handle = None
+        self.wakeup_time = None
+        now = self.time()
+        while self.waiters and self.waiters[0][0] <= now:
+            _, _, future = heapq.heappop(self.waiters)
+            # the waiting conversation may have been cancelled in the meantime
+            if not future.done():
+                future.set_result(None)
+        if self.waiters:
+            self._schedule_wakeup(self.waiters[0][0])
+
+
+output_pacers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, OutputPacer]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_output_pacer() -> OutputPacer:
+    """Returns the process-wide pacer for the running event loop"""
+    loop = asyncio.get_running_loop()
+    if loop not in output_pacers:
+        output_pacers[loop] = OutputPacer()
+    return output_pacers[loop]
+
+
+class PacedOutputStream:
+    """Tracks when the audio sent to one output device will have been played out
+
+    The schedule is kept in absolute clock time, so a late wakeup doesn't add up over
+    the course of a conversation. If the output ran dry, the schedule restarts from now
+    instead of trying to catch up.
+    """
+
+    def __init__(self, lead_seconds: float, pacer: Optional[OutputPacer] = None):
+        self.lead_seconds = lead_seconds
+        self._pacer = pacer
+        # clock time at which all the audio sent so far will have been played
+        self.playout_end_time: Optional[float] = None
+        self.sent_seconds = 0.0
+
+    @property
+    def pacer(self) -> OutputPacer:
+        if self._pacer is None:
+            self._pacer = get_output_pacer()
+        return self._pacer
+
+    def get_buffered_seconds(self) -> float:
+        """Seconds of audio that have been sent but not played yet"""
+        if self.playout_end_time is None:
+            return 0.0
+        return max(0.0, self.playout_end_time - self.pacer.time())
+
+    def get_playback_position(self) -> float:
+        """Seconds of audio that have been played since the stream was created"""
+        return self.sent_seconds - self.get_buffered_seconds()
+
+    async def wait_for_next_chunk(self):
+        """Returns once at most lead_seconds of the audio that was sent are left to play"""
+        if self.playout_end_time is not None:
+            await self.pacer.wait_until(self.playout_end_time - self.lead_seconds)
+
+    def mark_sent(self, seconds: float):
+        now = self.pacer.time()
+        if self.playout_end_time is None or self.playout_end_time < now:
+            self.playout_end_time = now
+        self.playout_end_time += seconds
+        self.sent_seconds += seconds
+
+    def drop_buffered_audio(self, playback_position: Optional[float] = None):
+        """Forgets the audio that was sent but not played, e.g. once the output device cleared it
+
+        playback_position is the position reported by the output device, if it knows it.
+        """
+        if playback_position is None:
+            playback_position = self.get_playback_position()
+        self.sent_seconds = playback_position
+        self.playout_end_time = self.pacer.time()
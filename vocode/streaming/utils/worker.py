@@ -1,9 +1,11 @@
 from __future__ import annotations
 
 import asyncio
+import contextvars
 import threading
 import janus
-from typing import Any, Optional
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
 from typing import TypeVar, Generic
 import logging
 
@@ -166,20 +168,57 @@ class InterruptibleEventFactory:
 InterruptibleEventType = TypeVar("InterruptibleEventType", bound=InterruptibleEvent)
 
 
+class ProcessSlot:
+    """Tracks one in-flight InterruptibleWorker.process call and the outputs it holds back
+
+    In ordered mode, a slot's outputs are only released once every earlier slot has finished.
+    """
+
+    def __init__(self, worker: "InterruptibleWorker"):
+        self.worker = worker
+        self.outputs: List[Any] = []
+        self.done = False
+
+
+current_process_slot: contextvars.ContextVar[
+    Optional[ProcessSlot]
+] = contextvars.ContextVar("current_process_slot", default=None)
+
+
 class InterruptibleWorker(AsyncWorker[InterruptibleEventType]):
     def __init__(
         self,
         input_queue: asyncio.Queue[InterruptibleEventType],
         output_queue: asyncio.Queue = asyncio.Queue(),
         interruptible_event_factory: InterruptibleEventFactory = InterruptibleEventFactory(),
-        max_concurrency=2,
+        max_concurrency: int = 1,
+        ordered_output: bool = True,
     ) -> None:
         super().__init__(input_queue, output_queue)
         self.input_queue = input_queue
         self.max_concurrency = max_concurrency
+        # if True, outputs are produced in input order even if later items finish processing first
+        self.ordered_output = ordered_output
         self.interruptible_event_factory = interruptible_event_factory
+        # the most recently started task and its event
         self.current_task = None
         self.interruptible_event = None
+        # every in-flight task, one per concurrency slot
+        self.current_tasks: Dict[asyncio.Task, InterruptibleEventType] = {}
+        self.process_slots: Deque[ProcessSlot] = deque()
+
+    def produce_nonblocking(self, item):
+        slot = current_process_slot.get()
+        if (
+            slot is not None
+            and slot.worker is self
+            and self.process_slots
+            and self.process_slots[0] is not slot
+        ):
+            # an earlier item is still processing, hold this output back until it finishes
+            slot.outputs.append(item)
+            return
+        super().produce_nonblocking(item)
 
     def produce_interruptible_event_nonblocking(
         self, item: Any, is_interruptible: bool = True
@@ -189,7 +228,7 @@ class InterruptibleWorker(AsyncWorker[InterruptibleEventType]):
                 item, is_interruptible=is_interruptible
             )
         )
-        return super().produce_nonblocking(interruptible_event)
+        return self.produce_nonblocking(interruptible_event)
 
     def produce_interruptible_agent_response_event_nonblocking(
         self,
@@ -204,24 +243,68 @@ class InterruptibleWorker(AsyncWorker[InterruptibleEventType]):
                 agent_response_tracker=agent_response_tracker or asyncio.Event(),
             )
         )
-        return super().produce_nonblocking(interruptible_utterance_event)
-
-    async def _run_loop(self):
-        # TODO Implement concurrency with max_nb_of_thread
-        while True:
-            item = await self.input_queue.get()
-            if item.is_interrupted():
-                continue
-            self.interruptible_event = item
-            self.current_task = asyncio.create_task(self.process(item))
-            try:
-                await self.current_task
-            except asyncio.CancelledError:
+        return self.produce_nonblocking(interruptible_utterance_event)
+
+    async def _process_in_slot(self, item: InterruptibleEventType, slot: ProcessSlot):
+        current_process_slot.set(slot)
+        await self.process(item)
+
+    def _release_ordered_outputs(self):
+        while self.process_slots:
+            head = self.process_slots[0]
+            for output in head.outputs:
+                super().produce_nonblocking(output)
+            head.outputs.clear()
+            if not head.done:
+                # the head slot now produces directly
                 return
-            except Exception as e:
-                logger.exception("InterruptibleWorker", exc_info=True)
-            self.interruptible_event.is_interruptible = False
+            self.process_slots.popleft()
+
+    def _on_task_done(
+        self,
+        task: asyncio.Task,
+        slot: Optional[ProcessSlot],
+        concurrency_semaphore: asyncio.Semaphore,
+    ):
+        interruptible_event = self.current_tasks.pop(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("InterruptibleWorker", exc_info=task.exception())
+        interruptible_event.is_interruptible = False
+        if self.current_task is task:
             self.current_task = None
+        if slot is not None:
+            slot.done = True
+            self._release_ordered_outputs()
+        concurrency_semaphore.release()
+
+    async def _run_loop(self):
+        concurrency_semaphore = asyncio.Semaphore(self.max_concurrency)
+        try:
+            while True:
+                await concurrency_semaphore.acquire()
+                item = await self.input_queue.get()
+                if item.is_interrupted():
+                    concurrency_semaphore.release()
+                    continue
+                self.interruptible_event = item
+                slot = None
+                if self.ordered_output and self.max_concurrency > 1:
+                    slot = ProcessSlot(self)
+                    self.process_slots.append(slot)
+                    task = asyncio.create_task(self._process_in_slot(item, slot))
+                else:
+                    task = asyncio.create_task(self.process(item))
+                self.current_task = task
+                self.current_tasks[task] = item
+                task.add_done_callback(
+                    lambda task, slot=slot: self._on_task_done(
+                        task, slot, concurrency_semaphore
+                    )
+                )
+        except asyncio.CancelledError:
+            for task in list(self.current_tasks):
+                task.cancel()
+            return
 
     async def process(self, item: InterruptibleEventType):
         """
@@ -235,15 +318,14 @@ class InterruptibleWorker(AsyncWorker[InterruptibleEventType]):
         - threads tasks won't be able to be interrupted. Hopefully not too much of a big deal
             Threads will also get a reference to the interruptible event
         - asyncio tasks will still have to handle CancelledError and clean up resources
-        """
-        if (
-            self.current_task
-            and not self.current_task.done()
-            and self.interruptible_event.is_interruptible
-        ):
-            return self.current_task.cancel()
 
-        return False
+        Cancels every in-flight task that is still interruptible.
+        """
+        cancelled = False
+        for task, interruptible_event in list(self.current_tasks.items()):
+            if not task.done() and interruptible_event.is_interruptible:
+                cancelled = task.cancel() or cancelled
+        return cancelled
 
 
 class InterruptibleAgentResponseWorker(
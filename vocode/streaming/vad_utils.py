@@ -1,64 +1,502 @@
-import torch
+import asyncio
+import threading
+import time
+from collections import defaultdict, deque
+from enum import Enum
+from typing import Any, Deque, Dict, Iterator, List, Optional, Set, Tuple
 
-model, utils = torch.hub.load(repo_or_dir='snakers4/silero-vad',
-                              model='silero_vad',
-                              force_reload=True)
+import numpy as np
+from opentelemetry import metrics
 
+from vocode import getenv
+from vocode.streaming.audio_utils import int2float
+from vocode.streaming.models.audio_encoding import AudioEncoding
+from vocode.streaming.models.model import BaseModel
+from vocode.streaming.models.transcriber import VADConfig
+from vocode.streaming.transcriber.base_transcriber import BaseTranscriber
+from vocode.streaming.utils.audio_converter import StreamingAudioConverter
+from vocode.streaming.utils.worker import AsyncQueueWorker
 
-class CustomVADIterator(utils[3]):
+SILERO_VAD_MODEL_PATH_ENV = "SILERO_VAD_MODEL_PATH"
+SILERO_VAD_SAMPLING_RATES = (8000, 16000)
+SILERO_VAD_WINDOW_SIZES = {8000: 256, 16000: 512}
+# the recurrent state that the silero JIT model keeps as attributes (v4: _h and _c, v5: _state and _context)
+SILERO_VAD_STATE_ATTRIBUTES = (
+    "_h",
+    "_c",
+    "_state",
+    "_context",
+    "_last_sr",
+    "_last_batch_size",
+)
+# the batch dimension of each recurrent state tensor
+SILERO_VAD_STATE_BATCH_DIMS = {"_h": 1, "_c": 1, "_state": 1, "_context": 0}
+
+meter = metrics.get_meter(__name__)
+uplink_bytes_sent_counter = meter.create_counter(
+    name="transcriber.uplink.bytes_sent",
+    unit="bytes",
+)
+uplink_bytes_suppressed_counter = meter.create_counter(
+    name="transcriber.uplink.bytes_suppressed",
+    unit="bytes",
+)
+
+
+class SileroVADModel:
+    """A silero VAD model loaded from a local file, shared by every stream in the process
+
+    The model keeps its recurrent state in attributes, so each call swaps the calling
+    stream's state in and back out again.
+    """
+
+    def __init__(self, model_path: str):
+        # torch is only imported once VAD is actually used
+        import torch
+
+        self.torch = torch
+        self.model = torch.jit.load(model_path, map_location="cpu")
+        self.model.eval()
+        self.lock = threading.Lock()
+
+    def _get_state(self) -> Dict[str, Any]:
+        # go through the underlying script object: the module itself has its own _c attribute
+        script_object = self.model._c
+        return {
+            name: script_object.getattr(name)
+            for name in SILERO_VAD_STATE_ATTRIBUTES
+            if script_object.hasattr(name)
+        }
+
+    def create_state(self) -> Dict[str, Any]:
+        with self.lock:
+            self.model.reset_states()
+            return self._get_state()
+
+    def get_speech_probability(
+        self, window: np.ndarray, sampling_rate: int, state: Dict[str, Any]
+    ) -> float:
+        with self.lock, self.torch.no_grad():
+            for name, value in state.items():
+                self.model._c.setattr(name, value)
+            speech_probability = self.model(
+                self.torch.from_numpy(window), sampling_rate
+            ).item()
+            state.update(self._get_state())
+        return speech_probability
+
+    def _is_batchable(self, state: Dict[str, Any]) -> bool:
+        # a fresh state is only sized for a batch once the model has run on it
+        return state.get("_last_batch_size") == 1 and all(
+            value.dim() > SILERO_VAD_STATE_BATCH_DIMS[name]
+            and value.size(SILERO_VAD_STATE_BATCH_DIMS[name]) == 1
+            for name, value in state.items()
+            if name in SILERO_VAD_STATE_BATCH_DIMS
+        )
+
+    def get_speech_probabilities(
+        self,
+        windows: List[np.ndarray],
+        sampling_rate: int,
+        states: List[Dict[str, Any]],
+    ) -> List[float]:
+        """Runs one window for each of several streams in a single batched inference"""
+        speech_probabilities: List[Optional[float]] = [None] * len(windows)
+        batch = []
+        for i, (window, state) in enumerate(zip(windows, states)):
+            if self._is_batchable(state):
+                batch.append(i)
+            else:
+                speech_probabilities[i] = self.get_speech_probability(
+                    window, sampling_rate, state
+                )
+        if batch:
+            with self.lock, self.torch.no_grad():
+                batched_state = {
+                    name: self.torch.cat([states[i][name] for i in batch], dim=dim)
+                    for name, dim in SILERO_VAD_STATE_BATCH_DIMS.items()
+                    if name in states[batch[0]]
+                }
+                for name, value in batched_state.items():
+                    self.model._c.setattr(name, value)
+                self.model._c.setattr("_last_sr", sampling_rate)
+                self.model._c.setattr("_last_batch_size", len(batch))
+                output = self.model(
+                    self.torch.from_numpy(np.stack([windows[i] for i in batch])),
+                    sampling_rate,
+                )
+                for j, speech_probability in enumerate(output.reshape(-1).tolist()):
+                    speech_probabilities[batch[j]] = speech_probability
+                for name, dim in SILERO_VAD_STATE_BATCH_DIMS.items():
+                    if name not in batched_state:
+                        continue
+                    for i, value in zip(
+                        batch, self.model._c.getattr(name).split(1, dim=dim)
+                    ):
+                        states[i][name] = value
+                for i in batch:
+                    states[i]["_last_sr"] = sampling_rate
+        return speech_probabilities  # type: ignore
+
+
+silero_vad_models: Dict[str, SileroVADModel] = {}
+
+
+def get_silero_vad_model(model_path: Optional[str] = None) -> SileroVADModel:
+    """Loads the model on first use and returns the same instance afterwards; never downloads anything"""
+    model_path = model_path or getenv(SILERO_VAD_MODEL_PATH_ENV)
+    if not model_path:
+        raise ValueError(
+            f"Set vad_config.model_path or the {SILERO_VAD_MODEL_PATH_ENV} environment variable to a local silero_vad.jit file"
+        )
+    if model_path not in silero_vad_models:
+        silero_vad_models[model_path] = SileroVADModel(model_path)
+    return silero_vad_models[model_path]
+
+
+class SpeechEventType(str, Enum):
+    START = "start"
+    END = "end"
+
+
+class SpeechEvent(BaseModel):
+    type: SpeechEventType
+    timestamp_seconds: float
+
+
+class VADIterator:
+    """Per-stream VAD state on top of a shared model
+
+    Takes raw input audio chunks of any size, cuts them into model-sized windows and
+    reports when speech starts and ends, with the same hysteresis as silero's VADIterator.
+    """
+
+    def __init__(
+        self,
+        vad_config: VADConfig,
+        sampling_rate: int,
+        audio_encoding: AudioEncoding,
+        model: Optional[SileroVADModel] = None,
+    ):
+        self.vad_config = vad_config
+        self.model = model or get_silero_vad_model(vad_config.model_path)
+        if sampling_rate in SILERO_VAD_SAMPLING_RATES:
+            self.sampling_rate = sampling_rate
+        else:
+            self.sampling_rate = 16000 if sampling_rate > 8000 else 8000
+        self.audio_converter = StreamingAudioConverter(
+            input_sampling_rate=sampling_rate,
+            output_sampling_rate=self.sampling_rate,
+            input_encoding=audio_encoding,
+        )
+        window_size_samples = SILERO_VAD_WINDOW_SIZES[self.sampling_rate]
+        if vad_config.window_size_samples not in (None, window_size_samples):
+            raise ValueError(
+                f"window_size_samples must be {window_size_samples} at {self.sampling_rate}Hz"
+            )
+        self.window = np.zeros(window_size_samples, dtype=np.float32)
+        self.min_silence_samples = (
+            self.sampling_rate * vad_config.min_silence_duration_ms // 1000
+        )
+        self.speech_pad_samples = self.sampling_rate * vad_config.speech_pad_ms // 1000
+        self.reset_states()
 
     def reset_states(self):
-        self.model.reset_states()
+        self.model_state = self.model.create_state()
+        self.audio_converter.reset()
+        self.window_fill = 0
         self.triggered = False
         self.temp_end = 0
         self.current_sample = 0
-        self.collected_chunks = []
 
-    def __call__(self, x, return_seconds=False):
-        """
-        x: torch.Tensor
-            audio chunk (see examples in repo)
+    def get_windows(self, chunk: bytes) -> Iterator[np.ndarray]:
+        """Yields every window that the chunk completes
 
-        return_seconds: bool (default - False)
-            whether return timestamps in seconds (default - samples)
+        The same buffer is reused for each window, so copy it to keep it around
         """
+        samples = np.frombuffer(self.audio_converter.convert(chunk), dtype=np.int16)
+        while len(samples) > 0:
+            num_samples = min(len(samples), len(self.window) - self.window_fill)
+            int2float(
+                samples[:num_samples],
+                out=self.window[self.window_fill : self.window_fill + num_samples],
+            )
+            self.window_fill += num_samples
+            samples = samples[num_samples:]
+            if self.window_fill == len(self.window):
+                self.window_fill = 0
+                yield self.window
 
-        if not torch.is_tensor(x):
-            try:
-                x = torch.Tensor(x)
-            except:
-                raise TypeError("Audio cannot be casted to tensor. Cast it manually")
+    def process(self, chunk: bytes) -> List[SpeechEvent]:
+        speech_events = []
+        for window in self.get_windows(chunk):
+            speech_event = self.handle_speech_probability(
+                self.model.get_speech_probability(
+                    window, self.sampling_rate, self.model_state
+                )
+            )
+            if speech_event:
+                speech_events.append(speech_event)
+        return speech_events
 
-        window_size_samples = len(x[0]) if x.dim() == 2 else len(x)
+    def handle_speech_probability(
+        self, speech_probability: float
+    ) -> Optional[SpeechEvent]:
+        window_size_samples = len(self.window)
         self.current_sample += window_size_samples
+        threshold = self.vad_config.threshold
 
-        speech_prob = self.model(x, self.sampling_rate).item()
-
-        if self.triggered:
-            self.collected_chunks.append(x)
-
-        if (speech_prob >= self.threshold) and self.temp_end:
+        if speech_probability >= threshold and self.temp_end:
             self.temp_end = 0
 
-        if (speech_prob >= self.threshold) and not self.triggered:
+        if speech_probability >= threshold and not self.triggered:
             self.triggered = True
-            speech_start = self.current_sample - self.speech_pad_samples - window_size_samples
-            return {
-                'start': int(speech_start) if not return_seconds else round(speech_start / self.sampling_rate, 1)}, None
+            speech_start = max(
+                0, self.current_sample - self.speech_pad_samples - window_size_samples
+            )
+            return SpeechEvent(
+                type=SpeechEventType.START,
+                timestamp_seconds=speech_start / self.sampling_rate,
+            )
 
-        if (speech_prob < self.threshold - 0.15) and self.triggered:
+        if speech_probability < threshold - 0.15 and self.triggered:
             if not self.temp_end:
                 self.temp_end = self.current_sample
-            if self.current_sample - self.temp_end < self.min_silence_samples:
-                return None, None
-            else:
-                speech_end = self.temp_end + self.speech_pad_samples - window_size_samples
+            if self.current_sample - self.temp_end >= self.min_silence_samples:
+                speech_end = (
+                    self.temp_end + self.speech_pad_samples - window_size_samples
+                )
                 self.temp_end = 0
                 self.triggered = False
-                combined_chunk = torch.cat(self.collected_chunks)
-                combined_chunk = combined_chunk.detach().cpu().numpy().tobytes()
-                self.collected_chunks = []
-                return {'end': int(speech_end) if not return_seconds else round(speech_end / self.sampling_rate,
-                                                                                1)}, combined_chunk
+                return SpeechEvent(
+                    type=SpeechEventType.END,
+                    timestamp_seconds=speech_end / self.sampling_rate,
+                )
+
+        return None
+
+
+# a window, the stream's model state and the future to resolve with its speech probability
+PendingWindow = Tuple[np.ndarray, Dict[str, Any], asyncio.Future]
+
+
+class VADScheduler:
+    """Batches the VAD windows of every conversation in the process into shared inferences
+
+    Windows that arrive within batching_window_seconds of the first pending one are run as
+    one batch, in a thread so that the event loop isn't blocked. A stream must wait for the
+    result of its window before sending the next one, since the next one needs its state.
+    """
+
+    def __init__(
+        self,
+        model: SileroVADModel,
+        batching_window_seconds: float,
+        max_batch_size: int,
+    ):
+        self.model = model
+        self.batching_window_seconds = batching_window_seconds
+        self.max_batch_size = max_batch_size
+        self.pending_windows: Dict[Tuple[int, int], List[PendingWindow]] = defaultdict(
+            list
+        )
+        self.flush_task: Optional[asyncio.Task] = None
+        # keep references, so that running inferences aren't garbage collected
+        self.inference_tasks: Set[asyncio.Task] = set()
+        self.num_windows = 0
+        self.num_batches = 0
+
+    async def get_speech_probability(
+        self, window: np.ndarray, sampling_rate: int, state: Dict[str, Any]
+    ) -> float:
+        future = asyncio.get_running_loop().create_future()
+        # only windows with the same sampling rate and size can be stacked
+        batch_key = (sampling_rate, len(window))
+        self.pending_windows[batch_key].append((window, state, future))
+        if len(self.pending_windows[batch_key]) >= self.max_batch_size:
+            self._run_batch(batch_key)
+        elif self.flush_task is None:
+            self.flush_task = asyncio.create_task(self._flush_after_batching_window())
+        return await future
+
+    async def _flush_after_batching_window(self):
+        await asyncio.sleep(self.batching_window_seconds)
+        self.flush_task = None
+        for batch_key in list(self.pending_windows):
+            self._run_batch(batch_key)
+
+    def _run_batch(self, batch_key: Tuple[int, int]):
+        batch = self.pending_windows.pop(batch_key, [])
+        if batch:
+            inference_task = asyncio.create_task(self._infer(batch_key[0], batch))
+            self.inference_tasks.add(inference_task)
+            inference_task.add_done_callback(self.inference_tasks.discard)
+
+    async def _infer(self, sampling_rate: int, batch: List[PendingWindow]):
+        self.num_windows += len(batch)
+        self.num_batches += 1
+        try:
+            speech_probabilities = await asyncio.get_running_loop().run_in_executor(
+                None,
+                self.model.get_speech_probabilities,
+                [window for window, _, _ in batch],
+                sampling_rate,
+                [state for _, state, _ in batch],
+            )
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, _, future), speech_probability in zip(batch, speech_probabilities):
+            # the stream may have been terminated while waiting
+            if not future.done():
+                future.set_result(speech_probability)
+
+
+vad_schedulers: Dict[Tuple[int, float, int], VADScheduler] = {}
+
+
+def get_vad_scheduler(vad_config: VADConfig) -> VADScheduler:
+    """Returns the process-wide scheduler for this config, so that it is shared across conversations"""
+    assert vad_config.batching_window_ms is not None
+    model = get_silero_vad_model(vad_config.model_path)
+    scheduler_id = (
+        id(model),
+        vad_config.batching_window_ms,
+        vad_config.max_batch_size,
+    )
+    if scheduler_id not in vad_schedulers:
+        vad_schedulers[scheduler_id] = VADScheduler(
+            model=model,
+            batching_window_seconds=vad_config.batching_window_ms / 1000,
+            max_batch_size=vad_config.max_batch_size,
+        )
+    return vad_schedulers[scheduler_id]
+
+
+class VADWorker(AsyncQueueWorker):
+    """Runs a VADIterator in a thread, so that inference doesn't block the event loop
+
+    Takes raw input audio chunks and puts SpeechEvents on the output queue.
+    """
+
+    def __init__(
+        self,
+        vad_iterator: VADIterator,
+        input_queue: "asyncio.Queue[bytes]",
+        output_queue: "asyncio.Queue[SpeechEvent]",
+    ):
+        super().__init__(input_queue, output_queue)
+        self.vad_iterator = vad_iterator
+
+    async def process(self, item: bytes):
+        speech_events = await asyncio.get_running_loop().run_in_executor(
+            None, self.vad_iterator.process, item
+        )
+        for speech_event in speech_events:
+            self.produce_nonblocking(speech_event)
+
+
+class BatchedVADWorker(VADWorker):
+    """Runs a VADIterator through the shared VADScheduler"""
+
+    def __init__(
+        self,
+        vad_iterator: VADIterator,
+        scheduler: VADScheduler,
+        input_queue: "asyncio.Queue[bytes]",
+        output_queue: "asyncio.Queue[SpeechEvent]",
+    ):
+        super().__init__(vad_iterator, input_queue, output_queue)
+        self.scheduler = scheduler
+
+    async def process(self, item: bytes):
+        windows = [window.copy() for window in self.vad_iterator.get_windows(item)]
+        for window in windows:
+            speech_probability = await self.scheduler.get_speech_probability(
+                window, self.vad_iterator.sampling_rate, self.vad_iterator.model_state
+            )
+            speech_event = self.vad_iterator.handle_speech_probability(
+                speech_probability
+            )
+            if speech_event:
+                self.produce_nonblocking(speech_event)
+
+
+class VADUplinkGate:
+    """Only streams audio to the transcriber while the VAD detects speech
+
+    Keeps the last pre-padding of audio around, since the VAD reports the start of speech
+    at least a window late, and keeps streaming for the post-padding after speech ends.
+    Instead of the suppressed audio, the transcriber gets a keepalive every so often.
+    """
+
+    def __init__(
+        self,
+        transcriber: BaseTranscriber,
+        vad_config: VADConfig,
+        bytes_per_second: int,
+    ):
+        self.transcriber = transcriber
+        self.pre_padding_bytes = (
+            bytes_per_second * vad_config.uplink_pre_padding_ms // 1000
+        )
+        self.post_padding_bytes = (
+            bytes_per_second * vad_config.uplink_post_padding_ms // 1000
+        )
+        self.keepalive_interval_seconds = vad_config.uplink_keepalive_interval_seconds
+        self.buffered_chunks: Deque[bytes] = deque()
+        self.buffered_bytes = 0
+        self.is_speaking = False
+        self.remaining_post_padding_bytes = 0
+        self.last_sent_time = time.monotonic()
+        self.bytes_sent = 0
+        self.bytes_suppressed = 0
+
+    def handle_speech_event(self, speech_event: SpeechEvent):
+        if speech_event.type == SpeechEventType.START:
+            self.is_speaking = True
+            while self.buffered_chunks:
+                self._send(self.buffered_chunks.popleft())
+            self.buffered_bytes = 0
+        else:
+            self.is_speaking = False
+            self.remaining_post_padding_bytes = self.post_padding_bytes
+
+    def send_audio(self, chunk: bytes):
+        if self.transcriber.is_muted:
+            # the transcriber would only get silence anyway
+            while self.buffered_chunks:
+                self._suppress(self.buffered_chunks.popleft())
+            self.buffered_bytes = 0
+            self._suppress(chunk)
+            self._maybe_send_keepalive()
+        elif self.is_speaking:
+            self._send(chunk)
+        elif self.remaining_post_padding_bytes > 0:
+            self.remaining_post_padding_bytes -= len(chunk)
+            self._send(chunk)
+        else:
+            self.buffered_chunks.append(chunk)
+            self.buffered_bytes += len(chunk)
+            while self.buffered_bytes > self.pre_padding_bytes:
+                evicted_chunk = self.buffered_chunks.popleft()
+                self.buffered_bytes -= len(evicted_chunk)
+                self._suppress(evicted_chunk)
+            self._maybe_send_keepalive()
+
+    def _maybe_send_keepalive(self):
+        if time.monotonic() - self.last_sent_time >= self.keepalive_interval_seconds:
+            self.transcriber.send_keepalive()
+            self.last_sent_time = time.monotonic()
+
+    def _send(self, chunk: bytes):
+        self.transcriber.send_audio(chunk)
+        self.last_sent_time = time.monotonic()
+        self.bytes_sent += len(chunk)
+        uplink_bytes_sent_counter.add(len(chunk))
 
-        return None, None
+    def _suppress(self, chunk: bytes):
+        self.bytes_suppressed += len(chunk)
+        uplink_bytes_suppressed_counter.add(len(chunk))
@@ -1,16 +1,84 @@
-import os
-from typing import Iterable, List, Optional, Tuple
+import asyncio
+import logging
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Iterable, List, Optional, Tuple, TypeVar
 import aiohttp
 import openai
 from langchain.docstore.document import Document
 
+from vocode.streaming.utils.embedding_service import (
+    EmbeddingService,
+    get_embedding_service,
+)
+from vocode.streaming.utils.openai_client import (
+    OpenAIClient,
+    get_embedding_openai_client,
+    get_embedding_params,
+)
+
 DEFAULT_OPENAI_EMBEDDING_MODEL = "text-embedding-ada-002"
+RATE_LIMIT_MAX_RETRIES = 6
+RATE_LIMIT_INITIAL_BACKOFF_SECONDS = 1.0
+RATE_LIMIT_MAX_BACKOFF_SECONDS = 60.0
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class RateLimitError(Exception):
+    """Raised by requests to a vector DB that responded with 429 Too Many Requests"""
+
+    def __init__(self, retry_after_seconds: Optional[float] = None):
+        super().__init__(f"Rate limited, retry after {retry_after_seconds}s")
+        self.retry_after_seconds = retry_after_seconds
+
+
+def parse_retry_after(retry_after: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header, which is either seconds or an HTTP date
+
+    Returns None if the header is missing or malformed, so that the backoff is used instead.
+    """
+    if not retry_after:
+        return None
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+async def retry_on_rate_limit(
+    request: Callable[[], Awaitable[T]],
+    max_retries: int = RATE_LIMIT_MAX_RETRIES,
+    initial_backoff_seconds: float = RATE_LIMIT_INITIAL_BACKOFF_SECONDS,
+) -> T:
+    """Makes the request, retrying with jittered exponential backoff while rate limited"""
+    attempt = 0
+    while True:
+        try:
+            return await request()
+        except (RateLimitError, openai.error.RateLimitError) as e:
+            if attempt >= max_retries:
+                raise
+            backoff_seconds = getattr(e, "retry_after_seconds", None) or min(
+                initial_backoff_seconds * 2**attempt, RATE_LIMIT_MAX_BACKOFF_SECONDS
+            ) * random.uniform(0.5, 1)
+            logger.debug(f"Rate limited, retrying in {backoff_seconds:.2f}s")
+            await asyncio.sleep(backoff_seconds)
+            attempt += 1
 
 
 class VectorDB:
     def __init__(
         self,
         aiohttp_session: Optional[aiohttp.ClientSession] = None,
+        openai_client: Optional[OpenAIClient] = None,
     ):
         if aiohttp_session:
             # the caller is responsible for closing the session
@@ -19,21 +87,46 @@ class VectorDB:
         else:
             self.aiohttp_session = aiohttp.ClientSession()
             self.should_close_session_on_tear_down = True
+        # borrowed from the process-wide registry on first use, it is never closed here
+        self._openai_client = openai_client
+
+    @property
+    def openai_client(self) -> OpenAIClient:
+        if self._openai_client is None:
+            self._openai_client = get_embedding_openai_client()
+        return self._openai_client
+
+    @property
+    def embedding_service(self) -> EmbeddingService:
+        return get_embedding_service(self.openai_client)
 
     async def create_openai_embedding(
         self, text, model=DEFAULT_OPENAI_EMBEDDING_MODEL
     ) -> List[float]:
-        params = {
-            "input": text,
-        }
-
-        engine = os.getenv("AZURE_OPENAI_TEXT_EMBEDDING_ENGINE")
-        if engine:
-            params["engine"] = engine
-        else:
+        """Embeds a query through the shared embedding service, so repeated queries are cached"""
+        params = get_embedding_params()
+        if "model" in params:
             params["model"] = model
+        return (await self.embedding_service.create_embedding(text, **params)).tolist()
 
-        return list((await openai.Embedding.acreate(**params))["data"][0]["embedding"])
+    async def create_openai_embeddings(
+        self, texts: List[str], model=DEFAULT_OPENAI_EMBEDDING_MODEL
+    ) -> List[List[float]]:
+        """Embeds all texts with one request, retrying while rate limited
+
+        Documents are embedded directly rather than through the embedding service, they are
+        rarely embedded twice and would only push queries out of its cache.
+        """
+        params = get_embedding_params()
+        if "model" in params:
+            params["model"] = model
+        response = await retry_on_rate_limit(
+            lambda: self.openai_client.create_embedding(input=texts, **params)
+        )
+        return [
+            list(data["embedding"])
+            for data in sorted(response["data"], key=lambda data: data["index"])
+        ]
 
     async def add_texts(
         self,
@@ -0,0 +1,360 @@
+import asyncio
+import json
+import os
+import uuid
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain.docstore.document import Document
+
+from vocode.streaming.models.vector_db import LocalVectorDBConfig, LocalVectorDBDType
+from vocode.streaming.vector_db.base_vector_db import VectorDB
+
+DEFAULT_EMBEDDING_BATCH_SIZE = 100
+# rows that are converted to float32 at a time while searching quantized vectors, small
+# enough for the converted block to stay in the CPU cache
+SEARCH_BLOCK_ROWS = 2048
+INT8_MAX = 127
+MANIFEST_FILENAME = "manifest.json"
+
+FILTER_OPERATORS: Dict[str, Callable[[Any, Any], bool]] = {
+    "$eq": lambda value, operand: value == operand,
+    "$ne": lambda value, operand: value != operand,
+    "$in": lambda value, operand: value in operand,
+    "$nin": lambda value, operand: value not in operand,
+    "$gt": lambda value, operand: value is not None and value > operand,
+    "$gte": lambda value, operand: value is not None and value >= operand,
+    "$lt": lambda value, operand: value is not None and value < operand,
+    "$lte": lambda value, operand: value is not None and value <= operand,
+}
+
+
+def matches_filter(metadata: dict, filter: dict) -> bool:
+    """Evaluates a Pinecone style metadata filter, e.g. {"genre": {"$in": ["a", "b"]}}"""
+    for key, condition in filter.items():
+        if key == "$and":
+            if not all(matches_filter(metadata, f) for f in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_filter(metadata, f) for f in condition):
+                return False
+        else:
+            if not isinstance(condition, dict):
+                condition = {"$eq": condition}
+            value = metadata.get(key)
+            for operator, operand in condition.items():
+                if not FILTER_OPERATORS[operator](value, operand):
+                    return False
+    return True
+
+
+def encode_vectors(
+    vectors: np.ndarray, dtype: LocalVectorDBDType
+) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Returns the normalized vectors in dtype, and for int8 the scale of each row"""
+    vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    if dtype != LocalVectorDBDType.INT8:
+        return vectors.astype(dtype.value), None
+    scales = np.abs(vectors).max(axis=1) / INT8_MAX
+    scales[scales == 0] = 1
+    return (
+        np.round(vectors / scales[:, None]).astype(np.int8),
+        scales.astype(np.float32),
+    )
+
+
+def decode_vectors(vectors: np.ndarray, scales: Optional[np.ndarray]) -> np.ndarray:
+    decoded = vectors.astype(np.float32)
+    if scales is not None:
+        decoded *= scales[:, None]
+    return decoded
+
+
+class StoredVectors:
+    """One generation of the store's files, replaced as a whole when texts are added"""
+
+    def __init__(
+        self,
+        generation: int,
+        vectors: Optional[np.ndarray],
+        scales: Optional[np.ndarray],
+        documents: List[dict],
+    ):
+        self.generation = generation
+        self.vectors = vectors
+        self.scales = scales
+        self.documents = documents
+        self.namespaces: Dict[str, int] = {}
+        namespace_ids = [
+            self.namespaces.setdefault(document["namespace"], len(self.namespaces))
+            for document in documents
+        ]
+        self.namespace_ids = np.array(namespace_ids, dtype=np.int32)
+        self.rows_by_id = {
+            (document["namespace"], document["id"]): row
+            for row, document in enumerate(documents)
+        }
+
+
+class LocalVectorStore:
+    """Embeddings and documents stored in a directory, searched by brute force
+
+    The vectors are memory-mapped read-only, so processes that search the same directory
+    share their pages. Adding texts writes a new generation of the files and then the
+    manifest that points to it, other processes pick it up on their next search. There must
+    only be one writer at a time.
+    """
+
+    def __init__(self, path: str, dtype: LocalVectorDBDType):
+        self.path = path
+        self.dtype = dtype
+        os.makedirs(self.path, exist_ok=True)
+        self.stored_vectors = StoredVectors(0, None, None, [])
+        self.manifest_mtime_ns: Optional[int] = None
+        self.write_lock = asyncio.Lock()
+        self.maybe_reload()
+
+    def get_file_path(self, name: str, generation: int) -> str:
+        return os.path.join(self.path, f"{generation}-{name}")
+
+    def maybe_reload(self, force: bool = False) -> StoredVectors:
+        manifest_path = os.path.join(self.path, MANIFEST_FILENAME)
+        try:
+            manifest_mtime_ns = os.stat(manifest_path).st_mtime_ns
+            if manifest_mtime_ns == self.manifest_mtime_ns and not force:
+                return self.stored_vectors
+            with open(manifest_path) as f:
+                generation = json.load(f)["generation"]
+            vectors = np.load(
+                self.get_file_path("vectors.npy", generation), mmap_mode="r"
+            )
+            scales_path = self.get_file_path("scales.npy", generation)
+            scales = np.load(scales_path) if os.path.exists(scales_path) else None
+            with open(self.get_file_path("documents.jsonl", generation)) as f:
+                documents = [json.loads(line) for line in f]
+        except FileNotFoundError:
+            # nothing was written yet, or a writer replaced the generation that was just
+            # read from the manifest, which is picked up on the next call
+            return self.stored_vectors
+        self.stored_vectors = StoredVectors(generation, vectors, scales, documents)
+        self.manifest_mtime_ns = manifest_mtime_ns
+        return self.stored_vectors
+
+    def search(
+        self,
+        embedding: np.ndarray,
+        top_k: int,
+        namespace: str,
+        filter: Optional[dict] = None,
+    ) -> List[Tuple[dict, float]]:
+        stored_vectors = self.maybe_reload()
+        namespace_id = stored_vectors.namespaces.get(namespace)
+        if stored_vectors.vectors is None or namespace_id is None:
+            return []
+        query = (embedding / np.linalg.norm(embedding)).astype(np.float32)
+        num_rows = len(stored_vectors.documents)
+        if stored_vectors.vectors.dtype == np.float32:
+            scores = np.asarray(stored_vectors.vectors @ query)
+        else:
+            scores = np.empty(num_rows, dtype=np.float32)
+            block_buffer = np.empty((SEARCH_BLOCK_ROWS, len(query)), dtype=np.float32)
+            for start in range(0, num_rows, SEARCH_BLOCK_ROWS):
+                block = stored_vectors.vectors[start : start + SEARCH_BLOCK_ROWS]
+                np.copyto(block_buffer[: len(block)], block, casting="unsafe")
+                scores[start : start + len(block)] = block_buffer[: len(block)] @ query
+        if stored_vectors.scales is not None:
+            scores *= stored_vectors.scales
+        mask = stored_vectors.namespace_ids == namespace_id
+        if filter:
+            mask &= np.fromiter(
+                (
+                    matches_filter(document["metadata"], filter)
+                    for document in stored_vectors.documents
+                ),
+                dtype=bool,
+                count=num_rows,
+            )
+        num_results = min(top_k, int(mask.sum()))
+        if num_results == 0:
+            return []
+        scores[~mask] = -np.inf
+        top_rows = np.argpartition(-scores, num_results - 1)[:num_results]
+        top_rows = top_rows[np.argsort(-scores[top_rows])]
+        return [(stored_vectors.documents[row], float(scores[row])) for row in top_rows]
+
+    async def add(
+        self,
+        ids: List[str],
+        namespace: str,
+        texts: List[str],
+        metadatas: List[dict],
+        embeddings: np.ndarray,
+    ):
+        async with self.write_lock:
+            await asyncio.get_running_loop().run_in_executor(
+                None, self.write, ids, namespace, texts, metadatas, embeddings
+            )
+
+    def write(
+        self,
+        ids: List[str],
+        namespace: str,
+        texts: List[str],
+        metadatas: List[dict],
+        embeddings: np.ndarray,
+    ):
+        stored_vectors = self.maybe_reload()
+        old_vectors = stored_vectors.vectors
+        if old_vectors is not None and old_vectors.shape[1] != embeddings.shape[1]:
+            raise ValueError(
+                f"Embeddings have {embeddings.shape[1]} dimensions, the store has {old_vectors.shape[1]}"
+            )
+        documents = list(stored_vectors.documents)
+        # texts with an id that is already stored replace it, like a Pinecone upsert
+        rows = []
+        for id, text, metadata in zip(ids, texts, metadatas):
+            row = stored_vectors.rows_by_id.get((namespace, id))
+            document = {
+                "id": id,
+                "namespace": namespace,
+                "text": text,
+                "metadata": metadata,
+            }
+            if row is None:
+                row = len(documents)
+                documents.append(document)
+            else:
+                documents[row] = document
+            rows.append(row)
+
+        generation = stored_vectors.generation + 1
+        vectors = np.lib.format.open_memmap(
+            self.get_file_path("vectors.npy", generation),
+            mode="w+",
+            dtype=np.dtype(self.dtype.value),
+            shape=(len(documents), embeddings.shape[1]),
+        )
+        scales = (
+            np.ones(len(documents), dtype=np.float32)
+            if self.dtype == LocalVectorDBDType.INT8
+            else None
+        )
+        if old_vectors is not None:
+            for start in range(0, len(old_vectors), SEARCH_BLOCK_ROWS):
+                end = min(start + SEARCH_BLOCK_ROWS, len(old_vectors))
+                block = old_vectors[start:end]
+                block_scales = (
+                    stored_vectors.scales[start:end]
+                    if stored_vectors.scales is not None
+                    else None
+                )
+                if block.dtype == vectors.dtype:
+                    vectors[start:end] = block
+                    if scales is not None and block_scales is not None:
+                        scales[start:end] = block_scales
+                else:
+                    vectors[start:end], encoded_scales = encode_vectors(
+                        decode_vectors(block, block_scales), self.dtype
+                    )
+                    if scales is not None and encoded_scales is not None:
+                        scales[start:end] = encoded_scales
+        encoded_vectors, encoded_scales = encode_vectors(embeddings, self.dtype)
+        vectors[rows] = encoded_vectors
+        if scales is not None and encoded_scales is not None:
+            scales[rows] = encoded_scales
+        vectors.flush()
+        del vectors
+        if scales is not None:
+            np.save(self.get_file_path("scales.npy", generation), scales)
+        with open(self.get_file_path("documents.jsonl", generation), "w") as f:
+            for document in documents:
+                f.write(json.dumps(document) + "\n")
+
+        manifest_path = os.path.join(self.path, MANIFEST_FILENAME)
+        with open(f"{manifest_path}.tmp", "w") as f:
+            json.dump({"generation": generation}, f)
+        os.replace(f"{manifest_path}.tmp", manifest_path)
+        self.maybe_reload(force=True)
+        # processes that still map the previous generation keep their pages until they reload
+        for name in ("vectors.npy", "scales.npy", "documents.jsonl"):
+            try:
+                os.remove(self.get_file_path(name, stored_vectors.generation))
+            except OSError:
+                pass
+
+
+local_vector_stores: Dict[str, LocalVectorStore] = {}
+
+
+def get_local_vector_store(path: str, dtype: LocalVectorDBDType) -> LocalVectorStore:
+    """Returns the process-wide store for this directory, so that it is loaded only once"""
+    path = os.path.abspath(path)
+    if path not in local_vector_stores:
+        local_vector_stores[path] = LocalVectorStore(path, dtype)
+    return local_vector_stores[path]
+
+
+class LocalVectorDB(VectorDB):
+    def __init__(self, config: LocalVectorDBConfig, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.config = config
+        self.store = get_local_vector_store(self.config.path, self.config.dtype)
+
+    async def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        namespace: Optional[str] = None,
+        embedding_batch_size: int = DEFAULT_EMBEDDING_BATCH_SIZE,
+    ) -> List[str]:
+        """Embeds the texts and adds them to the store, replacing texts with the same ids
+
+        Every call rewrites the store's files, so texts should be added in bulk.
+        """
+        texts = list(texts)
+        ids = ids or [str(uuid.uuid4()) for _ in texts]
+        embeddings: List[List[float]] = []
+        for start in range(0, len(texts), embedding_batch_size):
+            embeddings += await self.create_openai_embeddings(
+                texts[start : start + embedding_batch_size],
+                model=self.config.embeddings_model,
+            )
+        await self.store.add(
+            ids,
+            namespace or "",
+            texts,
+            metadatas or [{} for _ in texts],
+            np.array(embeddings, dtype=np.float32),
+        )
+        return ids
+
+    async def similarity_search_with_score(
+        self,
+        query: str,
+        filter: Optional[dict] = None,
+        namespace: Optional[str] = None,
+    ) -> List[Tuple[Document, float]]:
+        embedding = np.array(
+            await self.create_openai_embedding(
+                query, model=self.config.embeddings_model
+            ),
+            dtype=np.float32,
+        )
+        results = await asyncio.get_running_loop().run_in_executor(
+            None,
+            self.store.search,
+            embedding,
+            self.config.top_k,
+            namespace or "",
+            filter,
+        )
+        return [
+            (
+                Document(
+                    page_content=document["text"], metadata=dict(document["metadata"])
+                ),
+                score,
+            )
+            for document, score in results
+        ]
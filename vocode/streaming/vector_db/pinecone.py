@@ -1,13 +1,24 @@
+import asyncio
 import logging
-from typing import Iterable, List, Optional, Tuple
+from typing import Callable, Iterable, List, Optional, Tuple
 import uuid
 from langchain.docstore.document import Document
 from vocode import getenv
 from vocode.streaming.models.vector_db import PineconeConfig
-from vocode.streaming.vector_db.base_vector_db import VectorDB
+from vocode.streaming.vector_db.base_vector_db import (
+    RateLimitError,
+    VectorDB,
+    parse_retry_after,
+    retry_on_rate_limit,
+)
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_EMBEDDING_BATCH_SIZE = 100
+# Pinecone recommends upserting at most 100 vectors per request
+DEFAULT_UPSERT_BATCH_SIZE = 100
+DEFAULT_MAX_CONCURRENCY = 4
+
 
 class PineconeDB(VectorDB):
     def __init__(self, config: PineconeConfig, *args, **kwargs) -> None:
@@ -30,30 +41,84 @@ class PineconeDB(VectorDB):
         metadatas: Optional[List[dict]] = None,
         ids: Optional[List[str]] = None,
         namespace: Optional[str] = None,
+        embedding_batch_size: int = DEFAULT_EMBEDDING_BATCH_SIZE,
+        upsert_batch_size: int = DEFAULT_UPSERT_BATCH_SIZE,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        on_progress: Optional[Callable[[int, int], None]] = None,
     ) -> List[str]:
         """Run more texts through the embeddings and add to the vectorstore.
 
+        Texts are embedded in batches, and the vectors are upserted in chunks as soon as
+        they are embedded, so embedding and upserting overlap. Requests that are rate limited
+        are retried with backoff.
+
         Args:
             texts: Iterable of strings to add to the vectorstore.
             metadatas: Optional list of metadatas associated with the texts.
             ids: Optional list of ids to associate with the texts.
             namespace: Optional pinecone namespace to add the texts to.
+            embedding_batch_size: Number of texts embedded per request.
+            upsert_batch_size: Number of vectors upserted per request.
+            max_concurrency: Maximum number of concurrent embedding requests, and of
+                concurrent upsert requests.
+            on_progress: Optional callback, called with the number of texts upserted so far
+                and the total number of texts after every upsert.
 
         Returns:
             List of ids from adding the texts into the vectorstore.
         """
         # Adapted from: langchain/vectorstores/pinecone.py. Made langchain implementation async.
-        if namespace is None:
-            namespace = ""
-        # Embed and create the documents
-        docs = []
-        ids = ids or [str(uuid.uuid4()) for _ in texts]
-        for i, text in enumerate(texts):
-            embedding = await self.create_openai_embedding(text)
-            metadata = metadatas[i] if metadatas else {}
-            metadata[self._text_key] = text
-            docs.append({"id": ids[i], "values": embedding, "metadata": metadata})
-        # upsert to Pinecone
+        upsert_namespace: str = namespace or ""
+        text_list: List[str] = list(texts)
+        doc_ids: List[str] = ids or [str(uuid.uuid4()) for _ in text_list]
+        embedding_semaphore = asyncio.Semaphore(max_concurrency)
+        upsert_semaphore = asyncio.Semaphore(max_concurrency)
+        # embedded documents that don't fill an upsert chunk yet
+        pending_docs: List[dict] = []
+        embed_tasks: List[asyncio.Task] = []
+        upsert_tasks: List[asyncio.Task] = []
+        num_upserted = 0
+
+        async def upsert_chunk(docs: List[dict]):
+            nonlocal num_upserted
+            async with upsert_semaphore:
+                await retry_on_rate_limit(lambda: self.upsert(docs, upsert_namespace))
+            num_upserted += len(docs)
+            if on_progress is not None:
+                on_progress(num_upserted, len(text_list))
+
+        async def embed_batch(start: int):
+            async with embedding_semaphore:
+                embeddings = await self.create_openai_embeddings(
+                    text_list[start : start + embedding_batch_size]
+                )
+            for i, embedding in enumerate(embeddings, start):
+                metadata = metadatas[i] if metadatas else {}
+                metadata[self._text_key] = text_list[i]
+                pending_docs.append(
+                    {"id": doc_ids[i], "values": embedding, "metadata": metadata}
+                )
+            while len(pending_docs) >= upsert_batch_size:
+                upsert_tasks.append(
+                    asyncio.create_task(upsert_chunk(pending_docs[:upsert_batch_size]))
+                )
+                del pending_docs[:upsert_batch_size]
+
+        try:
+            for start in range(0, len(text_list), embedding_batch_size):
+                embed_tasks.append(asyncio.create_task(embed_batch(start)))
+            await asyncio.gather(*embed_tasks)
+            if pending_docs:
+                upsert_tasks.append(asyncio.create_task(upsert_chunk(pending_docs)))
+            await asyncio.gather(*upsert_tasks)
+        finally:
+            # if anything failed, stop the embeddings too, so they don't start more upserts
+            for task in embed_tasks + upsert_tasks:
+                task.cancel()
+
+        return doc_ids
+
+    async def upsert(self, docs: List[dict], namespace: str):
         async with self.aiohttp_session.post(
             f"{self.pinecone_url}/vectors/upsert",
             headers={"Api-Key": self.pinecone_api_key},
@@ -62,12 +127,14 @@ class PineconeDB(VectorDB):
                 "namespace": namespace,
             },
         ) as response:
+            if response.status == 429:
+                raise RateLimitError(
+                    parse_retry_after(response.headers.get("Retry-After"))
+                )
             response_json = await response.json()
             if "message" in response_json:
                 logger.error(f"Error upserting vectors: {response_json}")
 
-        return ids
-
     async def similarity_search_with_score(
         self,
         query: str,